@@ -9,6 +9,9 @@ from aws_cdk import (
     aws_dynamodb as dynamodb,
     RemovalPolicy,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
+    aws_applicationautoscaling as appscaling,
+    TimeZone,
     aws_s3_notifications as s3n,
     aws_iam as iam,
     CfnOutput,
@@ -45,6 +48,95 @@ def build_agent_collaborator_property(agent_alias_arn, instruction, name, relay_
     )
     return agent_collaborator_property
 
+def build_function_schema(functions):
+    """
+    Builds an action group function schema from its JSON definition.
+
+    Args:
+        functions: List of function definitions from the function schemas file
+
+    Returns:
+        Function schema property for the action group
+    """
+    return bedrock.CfnAgent.FunctionSchemaProperty(
+        functions=[bedrock.CfnAgent.FunctionProperty(
+            name=function['name'],
+            description=function['description'],
+            parameters={
+                name: bedrock.CfnAgent.ParameterDetailProperty(
+                    type=parameter['type'],
+                    description=parameter['description'],
+                    required=parameter['required']
+                ) for name, parameter in function['parameters'].items()
+            }
+        ) for function in functions]
+    )
+
+def function_settings(config, name):
+    """
+    Performance settings of an action group function: the defaults overridden by its own entry.
+
+    Args:
+        config: The stack configuration
+        name: reservation, hr, shortlet, ticket or executor
+
+    Returns:
+        Dictionary of memorySize, architecture, timeoutSeconds, provisionedConcurrency and scheduledScaling
+    """
+    settings = config['actionGroupFunctionSettings']
+    return dict(settings['default'], **settings.get(name, {}))
+
+
+def build_action_group_function(scope, construct_id, handler, environment, settings, time_zone):
+    """
+    Builds an action group function and the published alias the action group invokes.
+
+    Provisioned concurrency is set on the alias, and each scheduled scaling window
+    changes it with an Application Auto Scaling scheduled action.
+
+    Args:
+        scope: The stack
+        construct_id: Construct ID of the function
+        handler: Handler of the function in the lambdas/actiongroup asset
+        environment: Environment variables of the function
+        settings: Performance settings, see function_settings
+        time_zone: IANA time zone of the scaling schedules
+
+    Returns:
+        Tuple of the function and its alias
+    """
+    function = lambda_.Function(
+        scope, construct_id,
+        runtime=lambda_.Runtime.PYTHON_3_12,
+        architecture=lambda_.Architecture.ARM_64 if settings['architecture'] == 'arm64' else lambda_.Architecture.X86_64,
+        memory_size=settings['memorySize'],
+        code=lambda_.Code.from_asset(
+            'lambdas/actiongroup'),
+        handler=handler,
+        timeout=Duration.seconds(settings['timeoutSeconds']),
+        environment=environment
+    )
+    alias = lambda_.Alias(
+        scope, f"{construct_id}Alias",
+        alias_name='live',
+        version=function.current_version,
+        provisioned_concurrent_executions=settings['provisionedConcurrency'] or None
+    )
+    windows = settings['scheduledScaling']
+    if windows:
+        scaling = alias.add_auto_scaling(
+            min_capacity=settings['provisionedConcurrency'],
+            max_capacity=max(max(window['maxCapacity'] for window in windows), settings['provisionedConcurrency'], 1))
+        for window in windows:
+            scaling.scale_on_schedule(
+                window['name'],
+                schedule=appscaling.Schedule.cron(**window['cron']),
+                min_capacity=window['minCapacity'],
+                max_capacity=window['maxCapacity'],
+                time_zone=TimeZone.of(time_zone))
+    return function, alias
+
+
 class AgentStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -57,6 +149,10 @@ class AgentStack(Stack):
         with open('./agents_python/config.json', 'r') as config_file:
             config = json.load(config_file)
 
+        # Load the action group function schemas, shared with the action group Lambdas
+        with open(config['functionSchemasPath'], 'r') as schemas_file:
+            function_schemas = json.load(schemas_file)
+
         # Define parameters
         reservation_agent_name = config['reservationAgentName']
         reservation_agent_alias_name = config['reservationAgentAliasName']
@@ -112,6 +208,8 @@ class AgentStack(Stack):
         # Supervisor Agent
         supervisor_agent_description = config['supervisorAgentDescription']
         supervisor_agent_instruction = config['supervisorAgentInstruction']
+        supervisor_agent_action_group_description = config['supervisorAgentActionGroupDescription']
+        supervisor_agent_action_group_name = config['supervisorAgentActionGroupName']
 
         table_name = config['dynamodbTableName']
         default_database_name = config['auroraDatabaseName']
@@ -339,7 +437,8 @@ class AgentStack(Stack):
             timeout=Duration.seconds(300),
             role=kb_lambda_role,
             environment={'KNOWLEDGE_BASE_ID': knowledge_base.attr_knowledge_base_id,
-                         'DATA_SOURCE_ID': datasource.attr_data_source_id}
+                         'DATA_SOURCE_ID': datasource.attr_data_source_id,
+                         'LOG_LEVEL': config['logLevel']}
         )
 
         # Adds an event trigger to resync KB and Datasource when Datasource contents is updated
@@ -361,6 +460,78 @@ class AgentStack(Stack):
         ),
             table_name=table_name,
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            # Bookings expire past their retention; the stream hands them to the archiver
+            time_to_live_attribute='expires_at',
+            stream=dynamodb.StreamViewType.OLD_IMAGE,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Customer-scoped lookups, sorted by booking type then booking ID. Keyed on the
+        # case folded, whitespace collapsed copy of the name, so 'ada' finds 'Ada'
+        dynamodbable.add_global_secondary_index(
+            index_name=config['dynamodbNameIndexName'],
+            partition_key=dynamodb.Attribute(name='name_key', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name='type_booking_id', type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL
+        )
+
+        # Staff-scoped lookups for time off bookings, keyed on the normalised staff name too
+        dynamodbable.add_global_secondary_index(
+            index_name=config['dynamodbStaffNameIndexName'],
+            partition_key=dynamodb.Attribute(name='staff_name_key', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name=config['dynamodbPartitionKeyId'], type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL
+        )
+
+        # Booking IDs are time ordered, so this index serves recent bookings of a type
+        dynamodbable.add_global_secondary_index(
+            index_name=config['dynamodbBookingTypeIndexName'],
+            partition_key=dynamodb.Attribute(name='booking_type', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name=config['dynamodbPartitionKeyId'], type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.KEYS_ONLY
+        )
+
+        # Per-slot availability counters, updated in the same transaction as the bookings
+        availability_table = dynamodb.Table(self, config['availabilityTableId'],
+                                            partition_key=dynamodb.Attribute(
+            name=config['availabilityPartitionKeyId'],
+            type=dynamodb.AttributeType.STRING
+        ),
+            table_name=config['availabilityTableName'],
+            time_to_live_attribute='expires_at',
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Per-staff, per-day time off ledger; the day index answers who is off on a date
+        time_off_ledger_table = dynamodb.Table(self, config['timeOffLedgerTableId'],
+                                               partition_key=dynamodb.Attribute(
+            name='staff_key',
+            type=dynamodb.AttributeType.STRING
+        ),
+            sort_key=dynamodb.Attribute(name='day', type=dynamodb.AttributeType.STRING),
+            table_name=config['timeOffLedgerTableName'],
+            time_to_live_attribute='expires_at',
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+        time_off_ledger_table.add_global_secondary_index(
+            index_name=config['timeOffLedgerDayIndexName'],
+            partition_key=dynamodb.Attribute(name='day', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name='staff_key', type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=['staff_name', 'booking_id', 'reason']
+        )
+
+        # Records of create calls already made, so agent retries do not book twice
+        idempotency_table = dynamodb.Table(self, config['idempotencyTableId'],
+                                           partition_key=dynamodb.Attribute(
+            name='idempotency_key',
+            type=dynamodb.AttributeType.STRING
+        ),
+            table_name=config['idempotencyTableName'],
+            time_to_live_attribute='expires_at',
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY
         )
 
@@ -447,57 +618,118 @@ class AgentStack(Stack):
             )
         )
 
-        reservation_action_group_function = lambda_.Function(
-            self, "BedrockReservationAgentActionGroupExecutor",
-            runtime=lambda_.Runtime.PYTHON_3_12,
-            code=lambda_.Code.from_asset(
-                'lambdas/actiongroup'),
-            handler='reservation_lambda_function.lambda_handler',
-            timeout=Duration.seconds(300)
-        )
-
-        hr_action_group_function = lambda_.Function(
-            self, "BedrockHrAgentActionGroupExecutor",
+        # Expired bookings, archived from the table stream as gzipped JSON lines
+        archive_bucket = s3.Bucket(
+            self, 'BookingArchiveBucket',
+            removal_policy=RemovalPolicy.RETAIN,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            enforce_ssl=True)
+        archive_lambda = lambda_.Function(
+            self, 'BookingArchiver',
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             code=lambda_.Code.from_asset(
-                'lambdas/actiongroup'),
-            handler='hr_lambda_function.lambda_handler',
-            timeout=Duration.seconds(300)
-        )
-
-        shortlet_action_group_function = lambda_.Function(
-            self, "BedrockShortletAgentActionGroupExecutor",
-            runtime=lambda_.Runtime.PYTHON_3_12,
-            code=lambda_.Code.from_asset(
-                'lambdas/actiongroup'),
-            handler='shortlet_lambda_function.lambda_handler',
-            timeout=Duration.seconds(300)
-        )
-
-        ticket_action_group_function = lambda_.Function(
-            self, "BedrockTicketAgentActionGroupExecutor",
-            runtime=lambda_.Runtime.PYTHON_3_12,
-            code=lambda_.Code.from_asset(
-                'lambdas/actiongroup'),
-            handler='ticket_lambda_function.lambda_handler',
-            timeout=Duration.seconds(300)
+                'lambdas/archive'),
+            handler='lambda_function.handler',
+            timeout=Duration.seconds(60),
+            environment={'ARCHIVE_BUCKET': archive_bucket.bucket_name,
+                         'ARCHIVE_PREFIX': config['archivePrefix']}
         )
+        archive_bucket.grant_put(archive_lambda)
+        archive_lambda.add_event_source(lambda_event_sources.DynamoEventSource(
+            dynamodbable,
+            starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+            batch_size=config['archiveBatchSize'],
+            max_batching_window=Duration.seconds(config['archiveBatchingWindowSeconds']),
+            bisect_batch_on_error=True,
+            retry_attempts=10,
+            # Only deletions made by TTL, not the ones asked for by customers
+            filters=[lambda_.FilterCriteria.filter({
+                'eventName': lambda_.FilterRule.is_equal('REMOVE'),
+                'userIdentity': {'type': lambda_.FilterRule.is_equal('Service'),
+                                 'principalId': lambda_.FilterRule.is_equal('dynamodb.amazonaws.com')},
+            })]))
+
+        # Environment shared by the action group functions
+        action_group_environment = {
+            'TABLE_NAME': dynamodbable.table_name,
+            'NAME_INDEX': config['dynamodbNameIndexName'],
+            'STAFF_NAME_INDEX': config['dynamodbStaffNameIndexName'],
+            'BOOKING_TYPE_INDEX': config['dynamodbBookingTypeIndexName'],
+            'AVAILABILITY_TABLE_NAME': availability_table.table_name,
+            'RESERVATION_SLOT_MINUTES': str(config['reservationSlotMinutes']),
+            'RESERVATION_SLOT_CAPACITY': str(config['reservationSlotCapacity']),
+            'SHORTLET_DEFAULT_UNITS': str(config['shortletDefaultUnits']),
+            'SHORTLET_UNITS_BY_TYPE': json.dumps(config['shortletUnitsByType']),
+            'LEDGER_TABLE_NAME': time_off_ledger_table.table_name,
+            'LEDGER_DAY_INDEX': config['timeOffLedgerDayIndexName'],
+            'IDEMPOTENCY_TABLE_NAME': idempotency_table.table_name,
+            'IDEMPOTENCY_TTL_SECONDS': str(config['idempotencyTtlSeconds']),
+            'LOG_LEVEL': config['logLevel'],
+            'LOG_SAMPLE_RATE': str(config['logSampleRate']),
+            'LOG_SAMPLE_RATES': json.dumps(config['logSampleRates']),
+            'METRICS_NAMESPACE': config['metricsNamespace'],
+            'BOOKING_RETENTION_DAYS': json.dumps(config['bookingRetentionDays']),
+            'RESERVATION_ACTION_GROUP_NAME': reservation_agent_action_group_name,
+            'HR_ACTION_GROUP_NAME': hr_agent_action_group_name,
+            'SHORTLET_ACTION_GROUP_NAME': shortlet_agent_action_group_name,
+            'TICKET_ACTION_GROUP_NAME': ticket_agent_action_group_name,
+            'OPERATIONS_ACTION_GROUP_NAME': supervisor_agent_action_group_name,
+        }
+
+        time_zone = config['scheduledScalingTimeZone']
+        if config['consolidatedActionGroupExecutor']:
+            # One executor routing on actionGroup, so all four agents share its warm containers
+            action_group_function, action_group_alias = build_action_group_function(
+                self, "BedrockActionGroupExecutor", 'executor_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'executor'), time_zone)
+            reservation_action_group_function, reservation_action_group_alias = action_group_function, action_group_alias
+            hr_action_group_function, hr_action_group_alias = action_group_function, action_group_alias
+            shortlet_action_group_function, shortlet_action_group_alias = action_group_function, action_group_alias
+            ticket_action_group_function, ticket_action_group_alias = action_group_function, action_group_alias
+            operations_action_group_function, operations_action_group_alias = action_group_function, action_group_alias
+        else:
+            reservation_action_group_function, reservation_action_group_alias = build_action_group_function(
+                self, "BedrockReservationAgentActionGroupExecutor", 'reservation_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'reservation'), time_zone)
+
+            hr_action_group_function, hr_action_group_alias = build_action_group_function(
+                self, "BedrockHrAgentActionGroupExecutor", 'hr_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'hr'), time_zone)
+
+            shortlet_action_group_function, shortlet_action_group_alias = build_action_group_function(
+                self, "BedrockShortletAgentActionGroupExecutor", 'shortlet_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'shortlet'), time_zone)
+
+            ticket_action_group_function, ticket_action_group_alias = build_action_group_function(
+                self, "BedrockTicketAgentActionGroupExecutor", 'ticket_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'ticket'), time_zone)
+
+            operations_action_group_function, operations_action_group_alias = build_action_group_function(
+                self, "BedrockSupervisorAgentActionGroupExecutor", 'operations_lambda_function.lambda_handler',
+                action_group_environment, function_settings(config, 'operations'), time_zone)
 
         # Define the common policy statement
         dynamodb_policy = iam.PolicyStatement(
             sid="UpdateDynamoDB",
             effect=iam.Effect.ALLOW,
-            resources=[dynamodbable.table_arn],
-            actions=['dynamodb:GetItem', 'dynamodb:PutItem', 'dynamodb:DeleteItem']
+            resources=[dynamodbable.table_arn, f"{dynamodbable.table_arn}/index/*",
+                       availability_table.table_arn,
+                       time_off_ledger_table.table_arn, f"{time_off_ledger_table.table_arn}/index/*",
+                       idempotency_table.table_arn],
+            actions=['dynamodb:GetItem', 'dynamodb:BatchGetItem', 'dynamodb:PutItem', 'dynamodb:DeleteItem',
+                     'dynamodb:UpdateItem', 'dynamodb:ConditionCheckItem', 'dynamodb:Query']
         )
 
-        # List of functions to attach the policy to
-        functions = [
+        # List of functions to attach the policy to, once each when they are consolidated
+        functions = list(dict.fromkeys([
             reservation_action_group_function,
             hr_action_group_function,
             shortlet_action_group_function,
             ticket_action_group_function,
-        ]
+            operations_action_group_function,
+        ]))
 
         # Attach the policy to each function
         for fn in functions:
@@ -522,68 +754,10 @@ class AgentStack(Stack):
 
                 # the properties below are optional
                 action_group_executor=bedrock.CfnAgent.ActionGroupExecutorProperty(
-                    lambda_=reservation_action_group_function.function_arn
+                    lambda_=reservation_action_group_alias.function_arn
                 ),
 
-                function_schema=bedrock.CfnAgent.FunctionSchemaProperty(
-                    functions=[bedrock.CfnAgent.FunctionProperty(
-                        name=config['reservation_func_getbooking_name'],
-                        # the properties below are optional
-                        description=config['reservation_func_getbooking_description'],
-                        parameters={
-                            config['reservation_func_getbooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-
-                                # the properties below are optional
-                                description="The ID of the booking to retrieve",
-                                required=True
-                            )
-                        }
-                    ),
-                        # create_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['reservation_func_createbooking_name'],
-                        description=config['reservation_func_createbooking_description'],
-                        parameters={
-                            config['reservation_func_createbooking_date']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The date of the booking",
-                                required=True
-                            ),
-                            config['reservation_func_createbooking_person_name']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The name of the customer placing a booking",
-                                required=True
-                            ),
-                            config['reservation_func_createbooking_time']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The time of the booking",
-                                required=True
-                            ),
-                            config['reservation_func_createbooking_num_guests']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="integer",
-                                description="The number of guests in the booking",
-                                required=True
-                            ),
-                            config['reservation_func_createbooking_food']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The desired food",
-                                required=False
-                            )}
-                    ),
-                        # delete_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['reservation_func_deletebooking_name'],
-                        description=config['reservation_func_deletebooking_description'],
-                        parameters={
-                            config['reservation_func_deletebooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to delete",
-                                required=True
-                            )
-                        })
-                    ]
-                ),
+                function_schema=build_function_schema(function_schemas['reservation']),
             )])
 
         cfn_reservation_agent_alias = bedrock.CfnAgentAlias(
@@ -610,65 +784,10 @@ class AgentStack(Stack):
 
                 # the properties below are optional
                 action_group_executor=bedrock.CfnAgent.ActionGroupExecutorProperty(
-                    lambda_=hr_action_group_function.function_arn
+                    lambda_=hr_action_group_alias.function_arn
                 ),
 
-                function_schema=bedrock.CfnAgent.FunctionSchemaProperty(
-                    functions=[bedrock.CfnAgent.FunctionProperty(
-                        name=config['hr_func_getbooking_name'],
-                        description=config['hr_func_getbooking_description'],
-                        parameters={
-                            config['hr_func_getbooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to retrieve",
-                                required=True
-                            )
-                        }
-                    ),
-                        # create_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['hr_func_createbooking_name'],
-                        description=config['hr_func_createbooking_description'],
-                        parameters={
-                            config['hr_func_createbooking_staff_name']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The name of staff",
-                                required=True
-                            ),
-                            config['hr_func_createbooking_start_date']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The start date of the time off",
-                                required=True
-                            ),
-                            config['hr_func_createbooking_end_date']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The end date of the time off",
-                                required=True
-                            ),
-                            config['hr_func_createbooking_reason']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The reason of the time off",
-                                required=True
-                            ),
-                            config['hr_func_createbooking_detailed_comment']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="Detailed comment for taking time off",
-                                required=False
-                            )}
-                    ),
-                        # delete_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['hr_func_deletebooking_name'],
-                        description=config['hr_func_deletebooking_description'],
-                        parameters={
-                            config['hr_func_deletebooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to delete",
-                                required=True
-                            )
-                        })
-                    ]
-                ),
+                function_schema=build_function_schema(function_schemas['hr']),
             )])
 
         cfn_hr_agent_alias = bedrock.CfnAgentAlias(
@@ -695,66 +814,10 @@ class AgentStack(Stack):
 
                 # the properties below are optional
                 action_group_executor=bedrock.CfnAgent.ActionGroupExecutorProperty(
-                    lambda_=shortlet_action_group_function.function_arn
+                    lambda_=shortlet_action_group_alias.function_arn
                 ),
 
-                function_schema=bedrock.CfnAgent.FunctionSchemaProperty(
-                    functions=[bedrock.CfnAgent.FunctionProperty(
-                        name=config['shortlet_func_getbooking_name'],
-                        # the properties below are optional
-                        description=config['shortlet_func_getbooking_description'],
-                        parameters={
-                            config['shortlet_func_getbooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to retrieve",
-                                required=True
-                            )
-                        }
-                    ),
-                        # create_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['shortlet_func_createbooking_name'],
-                        description=config['shortlet_func_createbooking_description'],
-                        parameters={
-                            config['shortlet_func_createbooking_date']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The date of the booking",
-                                required=True
-                            ),
-                            config['shortlet_func_createbooking_person_name']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The name of the customer placing a booking",
-                                required=True
-                            ),
-                            config['shortlet_func_createbooking_shortlet_type']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="Shortlet type",
-                                required=True
-                            ),
-                            config['shortlet_func_createbooking_number_days']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="integer",
-                                description="Number of intended days to stay",
-                                required=False
-                            ),
-                            config['shortlet_func_createbooking_num_guests']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="integer",
-                                description="The number of guests in the booking",
-                                required=True
-                            )}
-                    ),
-                        # delete_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['shortlet_func_deletebooking_name'],
-                        description=config['shortlet_func_deletebooking_description'],
-                        parameters={
-                            config['shortlet_func_deletebooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to delete",
-                                required=True
-                            )
-                        })
-                    ]
-                ),
+                function_schema=build_function_schema(function_schemas['shortlet']),
             )])
 
         cfn_shortlet_agent_alias = bedrock.CfnAgentAlias(
@@ -781,55 +844,10 @@ class AgentStack(Stack):
 
                 # the properties below are optional
                 action_group_executor=bedrock.CfnAgent.ActionGroupExecutorProperty(
-                    lambda_=ticket_action_group_function.function_arn
+                    lambda_=ticket_action_group_alias.function_arn
                 ),
 
-                function_schema=bedrock.CfnAgent.FunctionSchemaProperty(
-                    functions=[bedrock.CfnAgent.FunctionProperty(
-                        name=config['ticket_func_getbooking_name'],
-                        description=config['ticket_func_getbooking_description'],
-                        parameters={
-                            config['ticket_func_getbooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to retrieve",
-                                required=True
-                            )
-                        }
-                    ),
-                        # create_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['ticket_func_createbooking_name'],
-                        description=config['ticket_func_createbooking_description'],
-                        parameters={
-                            config['ticket_func_createbooking_person_name']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The name of customer creating a ticket",
-                                required=True
-                            ),
-                            config['ticket_func_createbooking_incident_date']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="Date of incident",
-                                required=True
-                            ),
-                            config['ticket_func_createbooking_reason']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="Reason for creating ticket",
-                                required=True
-                            )}
-                    ),
-                        # delete_booking
-                        bedrock.CfnAgent.FunctionProperty(
-                        name=config['ticket_func_deletebooking_name'],
-                        description=config['ticket_func_deletebooking_description'],
-                        parameters={
-                            config['ticket_func_deletebooking_id']: bedrock.CfnAgent.ParameterDetailProperty(
-                                type="string",
-                                description="The ID of the booking to delete",
-                                required=True
-                            )
-                        })
-                    ]
-                ),
+                function_schema=build_function_schema(function_schemas['ticket']),
             )])
 
         cfn_ticket_agent_alias = bedrock.CfnAgentAlias(
@@ -873,6 +891,15 @@ class AgentStack(Stack):
                                                 idle_session_ttl_in_seconds=1800,
                                                 agent_collaboration="SUPERVISOR",
                                                 agent_collaborators=agent_collaborators,
+                                                action_groups=[bedrock.CfnAgent.AgentActionGroupProperty(
+                                                    action_group_name=supervisor_agent_action_group_name,
+                                                    description=supervisor_agent_action_group_description,
+                                                    action_group_executor=bedrock.CfnAgent.ActionGroupExecutorProperty(
+                                                        lambda_=operations_action_group_alias.function_arn
+                                                    ),
+                                                    function_schema=build_function_schema(
+                                                        function_schemas['operations']),
+                                                )],
                                                 )
       
         cfn_supervisor_agent_alias = bedrock.CfnAgentAlias(
@@ -894,7 +921,7 @@ class AgentStack(Stack):
             self,
             "BedrockInvocationPermissionReservation",
             action="lambda:InvokeFunction",
-            function_name=reservation_action_group_function.function_name,
+            function_name=reservation_action_group_alias.function_arn,
             principal="bedrock.amazonaws.com",
             source_arn=cfn_reservation_agent.attr_agent_arn
         )
@@ -902,7 +929,7 @@ class AgentStack(Stack):
             self,
             "BedrockInvocationPermissionHr",
             action="lambda:InvokeFunction",
-            function_name=hr_action_group_function.function_name,
+            function_name=hr_action_group_alias.function_arn,
             principal="bedrock.amazonaws.com",
             source_arn=cfn_hr_agent.attr_agent_arn
         )
@@ -910,7 +937,7 @@ class AgentStack(Stack):
             self,
             "BedrockInvocationPermissionShortlet",
             action="lambda:InvokeFunction",
-            function_name=shortlet_action_group_function.function_name,
+            function_name=shortlet_action_group_alias.function_arn,
             principal="bedrock.amazonaws.com",
             source_arn=cfn_shortlet_agent.attr_agent_arn
         )
@@ -918,10 +945,18 @@ class AgentStack(Stack):
             self,
             "BedrockInvocationPermissionTicket",
             action="lambda:InvokeFunction",
-            function_name=ticket_action_group_function.function_name,
+            function_name=ticket_action_group_alias.function_arn,
             principal="bedrock.amazonaws.com",
             source_arn=cfn_ticket_agent.attr_agent_arn
         )
+        lambda_.CfnPermission(
+            self,
+            "BedrockInvocationPermissionOperations",
+            action="lambda:InvokeFunction",
+            function_name=operations_action_group_alias.function_arn,
+            principal="bedrock.amazonaws.com",
+            source_arn=cfn_supervisor_agent.attr_agent_arn
+        )
 
         # Declare the stack outputs
         CfnOutput(scope=self, id='S3_bucket', value=s3Bucket.bucket_name)
@@ -45,6 +45,8 @@ class StreamlitStack(Stack):
                   "STREAMLIT_THEME_BASE": "light",
                   "BEDROCK_AGENT_ID": bedrock_agent_id,
                   "BEDROCK_AGENT_ALIAS_ID": bedrock_agent_alias_id,
+                  # Set to "false" to stop requesting agent traces when the debug panel is not used
+                  "BEDROCK_AGENT_TRACE": "true",
                   "AWS_REGION": self.region,
                   "AWS_ACCOUNT_ID": self.account,
               }
@@ -0,0 +1,70 @@
+"""
+Cold-start benchmark of the action group Lambdas.
+
+Each sample runs in a fresh interpreter and measures the time to import a
+handler module and initialise its DynamoDB access, the work a new Lambda
+container does before serving its first call. No request is sent to AWS.
+
+    legacy:  boto3.resource('dynamodb').Table(...) in the handler module and
+             again in helper.py, both at import time
+    current: handler import plus the first connection.get_client() call
+
+Usage:
+    python benchmarks/bench_cold_start.py [--samples 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ACTIONGROUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambdas', 'actiongroup')
+
+LEGACY = """
+import time
+start = time.perf_counter()
+import boto3
+table = boto3.resource('dynamodb').Table('steakhouse_bookings')
+helper_table = boto3.resource('dynamodb').Table('steakhouse_bookings')
+imported = time.perf_counter()
+print(imported - start, 0.0)
+"""
+
+CURRENT = """
+import time
+start = time.perf_counter()
+import reservation_lambda_function
+imported = time.perf_counter()
+import connection
+connection.get_client()
+initialised = time.perf_counter()
+print(imported - start, initialised - imported)
+"""
+
+
+def sample(code):
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+    output = subprocess.run([sys.executable, '-c', code], cwd=ACTIONGROUP_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.split()]
+
+
+def report(label, samples):
+    imports = [s[0] * 1000 for s in samples]
+    inits = [s[1] * 1000 for s in samples]
+    totals = [a + b for a, b in zip(imports, inits)]
+    print(f"{label:8} import {statistics.median(imports):7.1f} ms | "
+          f"client init {statistics.median(inits):7.1f} ms | total {statistics.median(totals):7.1f} ms (median)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=15)
+    args = parser.parse_args()
+
+    report('legacy', [sample(LEGACY) for _ in range(args.samples)])
+    report('current', [sample(CURRENT) for _ in range(args.samples)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark of the per-invocation overhead of the action group handlers.
+
+Compares the previous if/elif handler (one `get_named_parameter` scan per
+parameter and a hand-built envelope) with the shared table-driven dispatcher.
+DynamoDB access is stubbed out so only routing, parameter lookup and envelope
+building are measured.
+
+Usage:
+    python benchmarks/bench_dispatcher.py [--number 20000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'actiongroup'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import reservation_lambda_function as reservation  # noqa: E402
+
+
+def get_named_parameter(event, name):
+    """
+    Get a parameter from the lambda event, as the handlers did before the dispatcher
+    """
+    return next((item['value'] for item in event.get('parameters', []) if item['name'] == name), None)
+
+
+def stub_create(date, name, time, num_guests, desired_food=None):
+    return {'booking_id': 'abcd1234'}
+
+
+def legacy_handler(event, context):
+    actionGroup = event.get('actionGroup', '')
+    function = event.get('function', '')
+
+    if function == 'get_reservation_booking_details':
+        booking_id = get_named_parameter(event, "booking_id")
+        if booking_id:
+            response = str({'booking_id': booking_id})
+            responseBody = {'TEXT': {'body': json.dumps(response)}}
+        else:
+            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
+
+    elif function == 'create_reservation_booking':
+        date = get_named_parameter(event, "date")
+        name = get_named_parameter(event, "name")
+        time = get_named_parameter(event, "time")
+        num_guests = get_named_parameter(event, "num_guests")
+        desired_food = get_named_parameter(event, "desired_food") or ""
+
+        if date and name and time and num_guests:
+            response = str(stub_create(date, name, time, num_guests, desired_food))
+            responseBody = {'TEXT': {'body': json.dumps(response)}}
+        else:
+            responseBody = {'TEXT': {'body': 'Missing required parameters'}}
+
+    else:
+        responseBody = {'TEXT': {'body': 'Invalid function'}}
+
+    action_response = {
+        'actionGroup': actionGroup,
+        'function': function,
+        'functionResponse': {
+            'responseBody': responseBody
+        }
+    }
+
+    function_response = {'response': action_response,
+                         'messageVersion': event.get('messageVersion', '1.0')}
+    print("Response: {}".format(function_response))
+
+    return function_response
+
+
+def make_event():
+    return {
+        'messageVersion': '1.0',
+        'actionGroup': reservation.ACTION_GROUP,
+        'function': 'create_reservation_booking',
+        'parameters': [
+            {'name': 'date', 'type': 'string', 'value': '2025-03-14'},
+            {'name': 'name', 'type': 'string', 'value': 'Ada'},
+            {'name': 'time', 'type': 'string', 'value': '19:30'},
+            {'name': 'num_guests', 'type': 'integer', 'value': '4'},
+            {'name': 'desired_food', 'type': 'string', 'value': 'Ribeye'},
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    reservation.create_reservation_booking = stub_create
+    event = make_event()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = min(timeit.repeat(lambda: legacy_handler(event, None), number=args.number, repeat=5))
+        current = min(timeit.repeat(lambda: reservation.lambda_handler(event, None), number=args.number, repeat=5))
+
+    print(f"if/elif handler:    {legacy / args.number * 1e6:8.2f} us/invocation")
+    print(f"dispatcher handler: {current / args.number * 1e6:8.2f} us/invocation")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Load replay of the action group handlers against a local DynamoDB stand-in.
+
+Generates Bedrock action group events for every function in function_schemas.json,
+with realistic values drawn from each parameter's name, type and bounds, and replays
+them concurrently through the consolidated executor. Every action group is served by
+it, exactly as the per-domain functions would serve their own.
+
+DynamoDB is moto's in-process mock by default. Moto's backend is not thread safe, so it
+serves one request at a time, like a single-threaded server: latencies include the wait
+for it. Pass `--endpoint-url` to run against DynamoDB Local instead; the tables are
+created if they do not exist.
+
+Reports, per function, the calls, the calls answered with an error (capacity and
+overlap rejections included), throughput and p50/p95/p99 latency.
+
+Usage:
+    python benchmarks/load_replay.py [--calls 2000] [--concurrency 8] [--seed 7]
+    python benchmarks/load_replay.py --endpoint-url http://localhost:8000
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'actiongroup'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+SCHEMAS_PATH = os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'actiongroup', 'function_schemas.json')
+
+NAMES = ['Ada Lovelace', 'Grace Hopper', 'Alan Turing', 'Edsger Dijkstra', 'Barbara Liskov', 'Donald Knuth',
+         'Margaret Hamilton', 'Ken Thompson', 'Frances Allen', 'John Backus', 'Radia Perlman', 'Niklaus Wirth']
+FOODS = ['Ribeye', 'T-bone', 'Filet mignon', 'Tomahawk', 'Cheesecake', 'Weekly special']
+SHORTLET_TYPES = ['Studio', 'One Bedroom', 'Two Bedroom']
+REASONS = ['Vacation', 'Sick leave', 'Family event', 'The steak was cold', 'Wrong order', 'Late table']
+# Relative call frequency by function kind; lookups dominate agent traffic
+WEIGHTS = {'get': 4, 'list': 2, 'check': 3, 'create': 3, 'update': 1, 'delete': 1, 'apply': 1}
+SEED_BOOKINGS = 20
+
+
+def load_functions():
+    with open(SCHEMAS_PATH) as schemas_file:
+        return [(domain, function) for domain, functions in json.load(schemas_file).items() for function in functions]
+
+
+class EventFactory:
+    """
+    Builds action group events, keeping track of the bookings each domain has created
+    """
+
+    def __init__(self, action_groups, rng):
+        self.action_groups = action_groups
+        self.rng = rng
+        self.bookings = defaultdict(list)
+        self.lock = threading.Lock()
+        self.today = date.today()
+
+    def day(self, start=1, end=60):
+        return self.today + timedelta(days=self.rng.randint(start, end))
+
+    def date_text(self, day):
+        # The agent sends ISO dates most of the time, sometimes what the user typed
+        return day.isoformat() if self.rng.random() < 0.8 else day.strftime('%d/%m/%Y')
+
+    def booking_id(self, domain):
+        with self.lock:
+            pool = self.bookings[domain]
+            return self.rng.choice(pool) if pool else '0' * 14
+
+    def value(self, domain, name, spec, values):
+        rng = self.rng
+        if name == 'booking_id':
+            return self.booking_id(domain)
+        if name == 'operations':
+            # Move a table to another day and raise a ticket about it
+            return json.dumps([
+                {'action': 'delete', 'booking_type': 'reservation', 'booking_id': self.booking_id('reservation')},
+                {'action': 'create', 'booking_type': 'reservation', 'date': self.day().isoformat(),
+                 'name': rng.choice(NAMES), 'time': '19:30', 'num_guests': rng.randint(1, 6)},
+                {'action': 'create', 'booking_type': 'ticket', 'name': rng.choice(NAMES),
+                 'incident_date': self.day(-14, -1).isoformat(), 'reason': rng.choice(REASONS)}])
+        if name == 'booking_ids':
+            return json.dumps([self.booking_id(domain) for _ in range(rng.randint(1, 5))])
+        if name in ('name', 'staff_name'):
+            return rng.choice(NAMES)
+        if name == 'end_date' and 'start_date' in values:
+            start = date.fromisoformat(values['start_date']) if '-' in values['start_date'] else \
+                date(*reversed([int(part) for part in values['start_date'].split('/')]))
+            return (start + timedelta(days=rng.randint(0, 4))).isoformat()
+        if name == 'incident_date':
+            return self.day(-14, -1).isoformat()
+        if spec.get('format') == 'date':
+            return self.date_text(self.day())
+        if spec.get('format') == 'time':
+            minutes = rng.randrange(11 * 60, 22 * 60 + 30, 15)
+            hours, minutes = divmod(minutes, 60)
+            return f'{hours:02d}:{minutes:02d}' if rng.random() < 0.8 else f'{hours % 12 or 12}.{minutes:02d}pm'
+        if name == 'shortlet_type':
+            return rng.choice(SHORTLET_TYPES)
+        if name == 'desired_food':
+            return rng.choice(FOODS)
+        if name in ('reason', 'comment'):
+            return rng.choice(REASONS)
+        if name == 'next_token':
+            return None
+        if spec['type'] in ('integer', 'number'):
+            low = spec.get('minimum', 1)
+            return str(rng.randint(low, min(spec.get('maximum', 8), low + 7)))
+        if spec['type'] == 'boolean':
+            return rng.choice(['true', 'false'])
+        return rng.choice(NAMES)
+
+    def event(self, domain, function, session_id=None):
+        values = {}
+        for name, spec in function['parameters'].items():
+            if not spec['required'] and self.rng.random() < 0.5:
+                continue
+            value = self.value(domain, name, spec, values)
+            if value is not None:
+                values[name] = value
+        return {
+            'messageVersion': '1.0',
+            'sessionId': session_id or f'session-{self.rng.getrandbits(48):012x}',
+            'actionGroup': self.action_groups[domain],
+            'function': function['name'],
+            'parameters': [{'name': name, 'type': 'string', 'value': value} for name, value in values.items()],
+        }
+
+    def record(self, domain, function, body):
+        if not function['name'].startswith('create_'):
+            return
+        with contextlib.suppress(ValueError, TypeError, KeyError):
+            booking_id = json.loads(body)['booking_id']
+            with self.lock:
+                self.bookings[domain].append(booking_id)
+
+
+def create_tables(client):
+    import availability
+    import connection
+    import idempotency
+    import ledger
+
+    def index(name, partition_key, sort_key):
+        return {'IndexName': name,
+                'KeySchema': [{'AttributeName': partition_key, 'KeyType': 'HASH'},
+                              {'AttributeName': sort_key, 'KeyType': 'RANGE'}],
+                'Projection': {'ProjectionType': 'ALL'}}
+
+    tables = [
+        dict(TableName=connection.TABLE_NAME,
+             KeySchema=[{'AttributeName': 'booking_id', 'KeyType': 'HASH'}],
+             AttributeDefinitions=[{'AttributeName': name, 'AttributeType': 'S'} for name in
+                                   ('booking_id', 'name_key', 'type_booking_id', 'staff_name_key', 'booking_type')],
+             GlobalSecondaryIndexes=[index(connection.NAME_INDEX, 'name_key', 'type_booking_id'),
+                                     index(connection.STAFF_NAME_INDEX, 'staff_name_key', 'booking_id'),
+                                     index(connection.BOOKING_TYPE_INDEX, 'booking_type', 'booking_id')]),
+        dict(TableName=availability.AVAILABILITY_TABLE_NAME,
+             KeySchema=[{'AttributeName': 'slot_id', 'KeyType': 'HASH'}],
+             AttributeDefinitions=[{'AttributeName': 'slot_id', 'AttributeType': 'S'}]),
+        dict(TableName=ledger.LEDGER_TABLE_NAME,
+             KeySchema=[{'AttributeName': 'staff_key', 'KeyType': 'HASH'}, {'AttributeName': 'day', 'KeyType': 'RANGE'}],
+             AttributeDefinitions=[{'AttributeName': 'staff_key', 'AttributeType': 'S'},
+                                   {'AttributeName': 'day', 'AttributeType': 'S'}],
+             GlobalSecondaryIndexes=[index(ledger.LEDGER_DAY_INDEX, 'day', 'staff_key')]),
+        dict(TableName=idempotency.IDEMPOTENCY_TABLE_NAME,
+             KeySchema=[{'AttributeName': 'idempotency_key', 'KeyType': 'HASH'}],
+             AttributeDefinitions=[{'AttributeName': 'idempotency_key', 'AttributeType': 'S'}]),
+    ]
+    existing = set(client.list_tables()['TableNames'])
+    for table in tables:
+        if table['TableName'] not in existing:
+            client.create_table(BillingMode='PAY_PER_REQUEST', **table)
+            client.get_waiter('table_exists').wait(TableName=table['TableName'])
+
+
+def percentile(samples, share):
+    """
+    Nearest-rank percentile of sorted samples
+    """
+    return samples[max(math.ceil(share * len(samples)) - 1, 0)]
+
+
+def replay(args):
+    import executor_lambda_function as executor
+    import connection
+
+    create_tables(connection.get_client())
+    rng = random.Random(args.seed)
+    functions = load_functions()
+    action_groups = {domain: getattr(module, 'ACTION_GROUP') for domain, module in (
+        ('reservation', executor.reservation_lambda_function), ('hr', executor.hr_lambda_function),
+        ('shortlet', executor.shortlet_lambda_function), ('ticket', executor.ticket_lambda_function),
+        ('operations', executor.operations_lambda_function))}
+    factory = EventFactory(action_groups, rng)
+
+    # Seed bookings so lookups and deletes have something to find
+    for domain, function in functions:
+        if function['name'].startswith('create_'):
+            for _ in range(SEED_BOOKINGS):
+                factory.record(domain, function, executor.lambda_handler(factory.event(domain, function))
+                               ['response']['functionResponse']['responseBody']['TEXT']['body'])
+
+    weights = [WEIGHTS[function['name'].split('_')[0]] for _, function in functions]
+    plan = rng.choices(functions, weights=weights, k=args.calls)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    results_lock = threading.Lock()
+
+    def call(entry):
+        domain, function = entry
+        event = factory.event(domain, function)
+        started = time.perf_counter()
+        body = executor.lambda_handler(event)['response']['functionResponse']['responseBody']['TEXT']['body']
+        elapsed = (time.perf_counter() - started) * 1000
+        factory.record(domain, function, body)
+        with results_lock:
+            latencies[function['name']].append(elapsed)
+            if '"error"' in body or not body.startswith('{'):
+                errors[function['name']] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, plan))
+    wall = time.perf_counter() - started
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}, {wall:.2f} s, {args.calls / wall:.1f} calls/s\n")
+    print(f"{'function':34} {'calls':>6} {'errors':>6} {'calls/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for _, function in functions:
+        samples = sorted(latencies.get(function['name'], []))
+        if not samples:
+            continue
+        print(f"{function['name']:34} {len(samples):6d} {errors[function['name']]:6d} {len(samples) / wall:8.1f} "
+              f"{percentile(samples, 0.5):8.2f} {percentile(samples, 0.95):8.2f} {percentile(samples, 0.99):8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--endpoint-url', help='DynamoDB Local endpoint; moto is used when omitted')
+    args = parser.parse_args()
+    # EMF lines would drown the report
+    from metrics import metrics
+
+    if args.endpoint_url:
+        os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = args.endpoint_url
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+        with metrics.capture():
+            replay(args)
+        return
+
+    import moto
+    from moto.core.botocore_stubber import BotocoreStubber
+
+    serve = BotocoreStubber.__call__
+    backend_lock = threading.Lock()
+
+    def serve_one_at_a_time(self, *args, **kwargs):
+        with backend_lock:
+            return serve(self, *args, **kwargs)
+
+    BotocoreStubber.__call__ = serve_one_at_a_time
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws(), metrics.capture():
+        replay(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Replay a day of action group traffic against a model of Lambda container reuse, comparing
+the cold-start rate of four per-domain executors with one consolidated executor.
+
+Arrivals are Poisson per domain, following a steakhouse day (lunch and dinner peaks) and
+the traffic mix below. A container serves one call at a time, is reused while warm and is
+reclaimed after `--keep-alive` minutes idle. A call that finds no free warm container in
+its function's pool starts a new one, a cold start.
+
+The import cost of each handler module is measured too, since the consolidated executor
+loads all four domains on its cold starts.
+
+Usage:
+    python benchmarks/replay_cold_starts.py [--calls-per-day 1500] [--keep-alive 10] [--seed 7]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+
+ACTIONGROUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambdas', 'actiongroup')
+
+# Share of action group calls per domain
+TRAFFIC_MIX = {'reservation': 0.55, 'shortlet': 0.2, 'hr': 0.15, 'ticket': 0.1}
+# Relative traffic per hour of the day, peaking at lunch and dinner
+HOURLY_PROFILE = [0.1, 0.05, 0.05, 0.05, 0.05, 0.1, 0.3, 0.6, 0.8, 1, 1.2, 2, 2.5, 2, 1.2, 1,
+                  1.2, 2, 3, 3, 2.5, 1.5, 0.8, 0.3]
+CALL_SECONDS = (0.15, 0.6)
+
+
+def arrivals(calls_per_day, rng):
+    """
+    Yield (time in seconds, domain) of one day of calls, in time order
+    """
+    total = sum(HOURLY_PROFILE)
+    calls = []
+    for domain, share in TRAFFIC_MIX.items():
+        for hour, weight in enumerate(HOURLY_PROFILE):
+            rate = calls_per_day * share * weight / total / 3600
+            t = hour * 3600.0
+            while True:
+                t += rng.expovariate(rate)
+                if t >= (hour + 1) * 3600:
+                    break
+                calls.append((t, domain))
+    return sorted(calls)
+
+
+def replay(calls, pool_of, keep_alive, rng):
+    """
+    Return the number of cold starts per domain when each call runs in the pool `pool_of(domain)`
+    """
+    pools = {}
+    cold = dict.fromkeys(TRAFFIC_MIX, 0)
+    for t, domain in calls:
+        # Each container is [busy_until, last_used]
+        pool = pools.setdefault(pool_of(domain), [])
+        pool[:] = [container for container in pool if t - container[0] < keep_alive or container[0] > t]
+        free = [container for container in pool if container[0] <= t]
+        duration = rng.uniform(*CALL_SECONDS)
+        if free:
+            container = max(free, key=lambda c: c[1])
+        else:
+            cold[domain] += 1
+            container = [t, t]
+            pool.append(container)
+        container[0] = container[1] = t + duration
+    return cold
+
+
+def import_ms(module, samples):
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+    return statistics.median(
+        float(subprocess.run([sys.executable, '-c', code], cwd=ACTIONGROUP_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout) * 1000
+        for _ in range(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls-per-day', type=int, default=1500)
+    parser.add_argument('--keep-alive', type=float, default=10, help='Minutes a container stays warm when idle')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--samples', type=int, default=5, help='Samples of each import time')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keep_alive = args.keep_alive * 60
+    totals = {'separate': dict.fromkeys(TRAFFIC_MIX, 0), 'consolidated': dict.fromkeys(TRAFFIC_MIX, 0)}
+    calls_per_domain = dict.fromkeys(TRAFFIC_MIX, 0)
+    for _ in range(args.days):
+        calls = arrivals(args.calls_per_day, rng)
+        for _, domain in calls:
+            calls_per_domain[domain] += 1
+        for name, pool_of in (('separate', lambda domain: domain), ('consolidated', lambda domain: 'executor')):
+            for domain, count in replay(calls, pool_of, keep_alive, random.Random(args.seed)).items():
+                totals[name][domain] += count
+
+    print(f"{args.days} days x ~{args.calls_per_day} calls/day, keep-alive {args.keep_alive:g} min\n")
+    print(f"{'domain':12} {'calls':>7} {'separate':>14} {'consolidated':>14}")
+    for domain in TRAFFIC_MIX:
+        calls = calls_per_domain[domain]
+        print(f"{domain:12} {calls:7d} "
+              f"{totals['separate'][domain]:6d} ({totals['separate'][domain] / calls:5.1%}) "
+              f"{totals['consolidated'][domain]:6d} ({totals['consolidated'][domain] / calls:5.1%})")
+    calls = sum(calls_per_domain.values())
+    separate, consolidated = sum(totals['separate'].values()), sum(totals['consolidated'].values())
+    print(f"{'total':12} {calls:7d} {separate:6d} ({separate / calls:5.1%}) "
+          f"{consolidated:6d} ({consolidated / calls:5.1%})\n")
+
+    domain_import = statistics.mean(import_ms(f'{domain}_lambda_function', args.samples) for domain in TRAFFIC_MIX)
+    executor_import = import_ms('executor_lambda_function', args.samples)
+    print(f"handler import: per-domain {domain_import:.1f} ms, consolidated {executor_import:.1f} ms (median)")
+    print(f"cold-start import time per day: separate {separate / args.days * domain_import / 1000:.1f} s, "
+          f"consolidated {consolidated / args.days * executor_import / 1000:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
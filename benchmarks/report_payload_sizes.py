@@ -0,0 +1,85 @@
+"""
+Report the size of the action group response bodies before and after the compact encoder.
+
+"Before" is how the handlers used to serialise results, `json.dumps(str(result))`; "after"
+is `encoder.encode`. The results are representative of what DynamoDB returns, Decimal
+numbers and internal bookkeeping attributes included. Token counts are approximated as
+one token per four bytes.
+
+Usage:
+    python benchmarks/report_payload_sizes.py
+"""
+import json
+import os
+import sys
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambdas', 'actiongroup'))
+
+from encoder import encode  # noqa: E402
+
+
+def reservation(booking_id):
+    return {'booking_id': booking_id, 'booking_type': 'reservation', 'type_booking_id': f'reservation#{booking_id}',
+            'date': '2025-03-14', 'time': '19:30', 'name': 'Ada Lovelace', 'num_guests': Decimal('4'),
+            'desired_food': 'Ribeye', 'slot_id': 'reservation#2025-03-14#19:30'}
+
+
+def time_off(booking_id):
+    return {'booking_id': booking_id, 'booking_type': 'time_off', 'type_booking_id': f'time_off#{booking_id}',
+            'staff_name': 'Grace Hopper', 'start_date': '2025-03-10', 'end_date': '2025-03-14',
+            'reason': 'Vacation', 'comment': '',
+            'ledger_days': ['2025-03-10', '2025-03-11', '2025-03-12', '2025-03-13', '2025-03-14']}
+
+
+def shortlet(booking_id):
+    return {'booking_id': booking_id, 'booking_type': 'shortlet', 'type_booking_id': f'shortlet#{booking_id}',
+            'name': 'Alan Turing', 'date': '2025-03-14', 'number_days': Decimal('3'), 'shortlet_type': 'Studio',
+            'num_guests': Decimal('2'),
+            'slot_ids': ['shortlet#studio#2025-03-14', 'shortlet#studio#2025-03-15', 'shortlet#studio#2025-03-16']}
+
+
+def ticket(booking_id):
+    return {'booking_id': booking_id, 'booking_type': 'ticket', 'type_booking_id': f'ticket#{booking_id}',
+            'name': 'Edsger Dijkstra', 'creation_date': '2025-03-14', 'incident_date': '2025-03-12',
+            'reason': 'The steak was cold'}
+
+
+IDS = [f'01jp{index:06d}abcd' for index in range(10)]
+
+RESULTS = {
+    'get_reservation_booking_details': reservation(IDS[0]),
+    'get_reservation_bookings': {'bookings': [reservation(booking_id) for booking_id in IDS], 'not_found': []},
+    'list_reservation_bookings_by_name': {
+        'bookings': [{'booking_id': booking_id, 'date': '2025-03-14', 'time': '19:30'} for booking_id in IDS],
+        'next_token': 'eyJib29raW5nX2lkIjogIjAxanAwMDAwMDlhYmNkIn0='},
+    'create_reservation_booking': {'booking_id': IDS[0]},
+    'check_reservation_availability': {'date': '2025-03-14', 'time': '19:30', 'available': True,
+                                       'remaining': Decimal('36')},
+    'get_time_off_booking_details': time_off(IDS[0]),
+    'get_time_off_bookings': {'bookings': [time_off(booking_id) for booking_id in IDS], 'not_found': []},
+    'list_staff_off_on': {'day': '2025-03-12', 'staff': [
+        {'staff_name': 'Grace Hopper', 'booking_id': booking_id, 'reason': 'Vacation'} for booking_id in IDS]},
+    'get_shortlet_booking_details': shortlet(IDS[0]),
+    'get_shortlet_bookings': {'bookings': [shortlet(booking_id) for booking_id in IDS], 'not_found': []},
+    'get_ticket_booking_details': ticket(IDS[0]),
+    'get_ticket_bookings': {'bookings': [ticket(booking_id) for booking_id in IDS], 'not_found': []},
+    'delete_ticket_booking': {'message': f'Booking with ID {IDS[0]} deleted successfully'},
+}
+
+
+def main():
+    print(f"{'function':36} {'before':>8} {'after':>8} {'saved':>6} {'~tokens':>15}")
+    total_before = total_after = 0
+    for function, result in RESULTS.items():
+        before = len(json.dumps(str(result)).encode())
+        after = len(encode(function, result).encode())
+        total_before += before
+        total_after += after
+        print(f"{function:36} {before:8d} {after:8d} {1 - after / before:6.0%} "
+              f"{before // 4:7d}->{after // 4:6d}")
+    print(f"{'total':36} {total_before:8d} {total_after:8d} {1 - total_after / total_before:6.0%}")
+
+
+if __name__ == '__main__':
+    main()
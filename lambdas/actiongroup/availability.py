@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from datetime import date as Date, timedelta
+from connection import get_client, name_key, serialize
+from expiry import WORKING_DAYS_RETENTION, day_expires_at
+
+AVAILABILITY_TABLE_NAME = os.environ.get('AVAILABILITY_TABLE_NAME', 'steakhouse_availability')
+SLOT_MINUTES = int(os.environ.get('RESERVATION_SLOT_MINUTES', '30'))
+SLOT_CAPACITY = int(os.environ.get('RESERVATION_SLOT_CAPACITY', '40'))
+SHORTLET_DEFAULT_UNITS = int(os.environ.get('SHORTLET_DEFAULT_UNITS', '1'))
+SHORTLET_UNITS = {name_key(shortlet_type): units for shortlet_type, units in
+                  json.loads(os.environ.get('SHORTLET_UNITS_BY_TYPE', '{}')).items()}
+
+
+class CapacityError(Exception):
+    """
+    Raised when a booking would take a slot past its capacity
+    """
+
+
+def reservation_slot(date, time):
+    """
+    Return the counter key of the time slot a reservation falls in
+
+    Args:
+        date (string): ISO date of the reservation
+        time (string): HH:MM time of the reservation
+    """
+    hours, minutes = (int(part) for part in time.split(':'))
+    start = (hours * 60 + minutes) // SLOT_MINUTES * SLOT_MINUTES
+    return f'reservation#{date}#{start // 60:02d}:{start % 60:02d}'
+
+
+def shortlet_nights(shortlet_type, date, number_days):
+    """
+    Return the counter keys of the nights a shortlet stay occupies
+
+    Args:
+        shortlet_type (string): The Shortlet apartment type
+        date (string): ISO check in date
+        number_days (int): The number of nights of the stay
+    """
+    check_in = Date.fromisoformat(date)
+    shortlet_type = name_key(shortlet_type)
+    return [f'shortlet#{shortlet_type}#{(check_in + timedelta(days=night)).isoformat()}'
+            for night in range(number_days)]
+
+
+def shortlet_units(shortlet_type):
+    """
+    Return how many apartments of a shortlet type can be let on the same night
+    """
+    return SHORTLET_UNITS.get(name_key(shortlet_type), SHORTLET_DEFAULT_UNITS)
+
+
+def slot_expires_at(slot):
+    """
+    Return the TTL of a slot counter: the end of its day, plus the working days retention
+    """
+    # reservation#<date>#<time> or shortlet#<type>#<night>
+    parts = slot.split('#')
+    return day_expires_at(parts[1] if parts[0] == 'reservation' else parts[-1], WORKING_DAYS_RETENTION)
+
+
+def reserve(slot, quantity, capacity):
+    """
+    Transaction item that takes `quantity` units of a slot, failing past `capacity`
+    """
+    if quantity > capacity:
+        raise CapacityError(f'At most {capacity} can be booked at once')
+    return {'Update': {
+        'TableName': AVAILABILITY_TABLE_NAME,
+        'Key': serialize({'slot_id': slot}),
+        'UpdateExpression': 'SET booked = if_not_exists(booked, :zero) + :quantity, expires_at = :expires_at',
+        'ConditionExpression': 'attribute_not_exists(booked) OR booked <= :limit',
+        'ExpressionAttributeValues': serialize({':zero': 0, ':quantity': quantity, ':limit': capacity - quantity,
+                                                ':expires_at': slot_expires_at(slot)}),
+    }}
+
+
+def release(slot, quantity):
+    """
+    Transaction item that gives back `quantity` units of a slot
+
+    Counters outlive their day only briefly, so a past booking may find its counter removed
+    by TTL: it then comes back at zero, already expired.
+    """
+    return {'Update': {
+        'TableName': AVAILABILITY_TABLE_NAME,
+        'Key': serialize({'slot_id': slot}),
+        'UpdateExpression': 'SET booked = if_not_exists(booked, :quantity) - :quantity, expires_at = :expires_at',
+        'ConditionExpression': 'attribute_not_exists(booked) OR booked >= :quantity',
+        'ExpressionAttributeValues': serialize({':quantity': quantity, ':expires_at': slot_expires_at(slot)}),
+    }}
+
+
+def move_holds(held, wanted, capacity):
+    """
+    Transaction items that turn the units held per slot from `held` into `wanted`
+
+    Each slot gets at most one item, the difference, since a transaction may not touch
+    an item twice.
+
+    Args:
+        held (dict): slot -> units held now
+        wanted (dict): slot -> units to hold instead
+        capacity (int): Capacity of the slots gaining units
+    """
+    writes = []
+    for slot in dict.fromkeys(list(held) + list(wanted)):
+        delta = wanted.get(slot, 0) - held.get(slot, 0)
+        if delta > 0:
+            writes.append(reserve(slot, delta, capacity))
+        elif delta < 0:
+            writes.append(release(slot, -delta))
+    return writes
+
+
+def net_holds(writes):
+    """
+    One transaction item for several reserve and release items of the same slot, e.g. from
+    a booking cancelled and another made in one batch; None when they cancel out
+    """
+    slot = writes[0]['Update']['Key']['slot_id']['S']
+    delta, capacity = 0, None
+    for write in writes:
+        values = write['Update']['ExpressionAttributeValues']
+        quantity = int(values[':quantity']['N'])
+        if ':limit' in values:
+            capacity = int(values[':limit']['N']) + quantity
+            delta += quantity
+        else:
+            delta -= quantity
+    if delta > 0:
+        return reserve(slot, delta, capacity)
+    if delta < 0:
+        return release(slot, -delta)
+    return None
+
+
+def get_booked(slots):
+    """
+    Return the booked units of each slot, reading all of them in one request
+
+    Args:
+        slots (list): Slot keys, at most 100
+    """
+    slots = list(dict.fromkeys(slots))
+    booked = dict.fromkeys(slots, 0)
+    request = {AVAILABILITY_TABLE_NAME: {
+        'Keys': [serialize({'slot_id': slot}) for slot in slots],
+        'ProjectionExpression': 'slot_id, booked',
+        'ConsistentRead': True,
+    }}
+    while request:
+        response = get_client().batch_get_item(RequestItems=request)
+        for item in response.get('Responses', {}).get(AVAILABILITY_TABLE_NAME, []):
+            booked[item['slot_id']['S']] = int(item['booked']['N'])
+        request = response.get('UnprocessedKeys')
+        if request:
+            time.sleep(0.05)
+    return booked
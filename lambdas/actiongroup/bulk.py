@@ -0,0 +1,319 @@
+"""
+Bulk import and export of steakhouse bookings.
+
+Import streams JSONL or CSV rows into the bookings table with BatchWriteItem, 25 items
+a request, several requests in flight. Export streams the table to JSONL or CSV through
+a parallel segmented Scan, one segment per worker, without holding it in memory.
+
+Imported bookings keep their booking_id when they have one and get a fresh one otherwise.
+Reservations, shortlet stays and time off that are not over yet take their availability
+counters or ledger days as a create call would, one transaction per booking; rows that do
+not fit, or whose dates cannot be read, are reported and left out. A booking already stored
+is overwritten without taking them again. Past bookings are written as history, and those
+already past their retention expire at the next TTL sweep.
+Raise DYNAMODB_MAX_POOL_CONNECTIONS along with --concurrency or --segments past 10.
+
+Usage:
+    python lambdas/actiongroup/bulk.py import bookings.jsonl [--booking-type reservation] [--concurrency 8]
+    python lambdas/actiongroup/bulk.py export bookings.csv [--segments 8]
+"""
+import argparse
+import csv
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from availability import CapacityError
+from connection import TABLE_NAME, get_client, serialize, deserialize, with_name_keys
+from decoders import DECODERS
+from expiry import booking_end, expires_at
+from ids import new_booking_id
+from operations_lambda_function import BOOKING_TYPES
+
+BATCH_WRITE_LIMIT = 25
+NUMERIC_FIELDS = frozenset(['num_guests', 'number_days'])
+CSV_FIELDS = ['booking_id', 'booking_type', 'name', 'staff_name', 'date', 'time', 'num_guests', 'desired_food',
+              'shortlet_type', 'number_days', 'start_date', 'end_date', 'reason', 'comment', 'creation_date',
+              'incident_date']
+
+
+def _file_format(path, file_format=None):
+    return file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+
+
+def read_rows(path, file_format=None):
+    """
+    Yield the bookings of a JSONL or CSV file one at a time
+    """
+    with open(path, newline='') as rows_file:
+        if _file_format(path, file_format) == 'csv':
+            for row in csv.DictReader(rows_file):
+                yield {key: Decimal(value) if key in NUMERIC_FIELDS else value
+                       for key, value in row.items() if value not in (None, '')}
+        else:
+            for line in rows_file:
+                if line.strip():
+                    yield json.loads(line, parse_float=Decimal)
+
+
+def to_booking(row, booking_type=None):
+    """
+    Complete a row into a stored booking: booking_id, booking_type, their sort key, the lookup
+    keys of its names and its expiry
+    """
+    booking = with_name_keys(row)
+    booking['booking_type'] = booking.get('booking_type') or booking_type
+    if not booking['booking_type']:
+        raise ValueError(f'No booking_type for row {row!r}')
+    booking['booking_id'] = booking.get('booking_id') or new_booking_id()
+    booking['type_booking_id'] = f"{booking['booking_type']}#{booking['booking_id']}"
+    if 'expires_at' not in booking:
+        expiry = expires_at(booking['booking_type'], booking)
+        if expiry:
+            booking['expires_at'] = expiry
+    return booking
+
+
+def takes_holds(booking):
+    """
+    Whether a booking holds availability or ledger days: a reservation, shortlet or time off
+    that is not over yet, or whose dates cannot be read
+    """
+    if BOOKING_TYPES.get(booking['booking_type'], (None, None, None))[2] is None:
+        return False
+    end = booking_end(booking['booking_type'], booking)
+    return end is None or end >= datetime.now(timezone.utc).date()
+
+
+def write_held(booking):
+    """
+    Write one booking with the holds its create call would take, in one transaction
+
+    Returns:
+        None once written, or why it was left out
+    """
+    new = BOOKING_TYPES[booking['booking_type']][0]
+    decoder = DECODERS[f"create_{booking['booking_type']}_booking"]
+    try:
+        item, holds = new(**decoder([{'name': name, 'value': value} for name, value in booking.items()]))
+    except (ValueError, CapacityError) as e:
+        return str(e)
+    booking = dict(booking, **item)
+    expiry = expires_at(booking['booking_type'], booking)
+    if expiry:
+        booking['expires_at'] = expiry
+    put = {'TableName': TABLE_NAME, 'Item': serialize(booking),
+           'ConditionExpression': 'attribute_not_exists(booking_id)'}
+    client = get_client()
+    try:
+        client.transact_write_items(
+            TransactItems=[{'Put': put}] + (holds(booking['booking_id']) if callable(holds) else holds))
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+        if reasons[:1] == ['ConditionalCheckFailed']:
+            # Stored already, holds and all: refresh it only
+            client.put_item(TableName=TABLE_NAME, Item=put['Item'])
+        elif 'ConditionalCheckFailed' in reasons[1:]:
+            return ('The time off overlaps time off already booked' if booking['booking_type'] == 'time_off'
+                    else 'Not enough availability for this booking')
+        else:
+            raise
+    return None
+
+
+def write_batch(items, max_attempts=8, base_delay=0.05):
+    """
+    Write up to 25 items with BatchWriteItem, retrying unprocessed items with exponential backoff
+
+    Returns:
+        The number of items written
+    """
+    request = {TABLE_NAME: [{'PutRequest': {'Item': serialize(item)}} for item in items]}
+    for attempt in range(max_attempts):
+        response = get_client().batch_write_item(RequestItems=request)
+        request = response.get('UnprocessedItems')
+        if not request:
+            return len(items)
+        time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+    raise RuntimeError(f'{len(request[TABLE_NAME])} items still unprocessed after {max_attempts} attempts')
+
+
+def import_bookings(rows, booking_type=None, concurrency=8, rejected=None):
+    """
+    Write bookings in batches of 25, with at most `concurrency` batches in flight
+
+    Bookings that take holds are written one transaction each instead, alongside the batches.
+
+    Args:
+        rows (iterable): Booking dicts, read lazily
+        booking_type (string, optional): Type of rows without one. Defaults to None.
+        concurrency (int, optional): Concurrent BatchWriteItem requests. Defaults to 8.
+        rejected (list, optional): Gets a (booking, reason) pair for each booking left out
+            because its holds could not be taken. Defaults to None.
+
+    Returns:
+        The number of bookings written
+    """
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    futures = []
+    written = 0
+    rejected = [] if rejected is None else rejected
+
+    def release(future):
+        slots.release()
+
+    def write_one(booking):
+        reason = write_held(booking)
+        if reason:
+            rejected.append((booking, reason))
+            return 0
+        return 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        batch = {}
+        for row in rows:
+            booking = to_booking(row, booking_type)
+            if takes_holds(booking):
+                slots.acquire()
+                futures.append(pool.submit(write_one, booking))
+                futures[-1].add_done_callback(release)
+                continue
+            # A request may not hold the same key twice; the last row wins
+            batch[booking['booking_id']] = booking
+            if len(batch) == BATCH_WRITE_LIMIT:
+                slots.acquire()
+                futures.append(pool.submit(write_batch, list(batch.values())))
+                futures[-1].add_done_callback(release)
+                batch = {}
+            # Collect finished batches as we go so errors surface early and memory stays flat
+            while futures and futures[0].done():
+                written += futures.pop(0).result()
+        if batch:
+            futures.append(pool.submit(write_batch, list(batch.values())))
+        for future in futures:
+            written += future.result()
+    return written
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _put(rows, row, stop):
+    """
+    Put a row on the `rows` queue, giving up once `stop` is set
+
+    Returns:
+        Whether the row was put
+    """
+    while not stop.is_set():
+        try:
+            rows.put(row, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def scan_segment(segment, total_segments, rows, stop=None):
+    """
+    Put every booking of one Scan segment on the `rows` queue, page by page
+
+    Args:
+        stop (threading.Event, optional): Set when the rows are no longer wanted, e.g. the
+            writer failed; the scan then ends early. Defaults to None.
+    """
+    stop = stop or threading.Event()
+    request = {'TableName': TABLE_NAME, 'Segment': segment, 'TotalSegments': total_segments}
+    while not stop.is_set():
+        response = get_client().scan(**request)
+        for item in response.get('Items', []):
+            if not _put(rows, deserialize(item), stop):
+                return
+        if 'LastEvaluatedKey' not in response:
+            return
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def export_bookings(path, segments=8, file_format=None):
+    """
+    Stream the bookings table to a JSONL or CSV file with a parallel segmented Scan
+
+    Returns:
+        The number of bookings written
+    """
+    rows = queue.Queue(maxsize=1000)
+    # Set when the writer fails, so the scanners stop instead of blocking on the full queue
+    stop = threading.Event()
+    done = object()
+    written = 0
+
+    def scan_all():
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            futures = [pool.submit(scan_segment, segment, segments, rows, stop) for segment in range(segments)]
+        _put(rows, done, stop)
+        for future in futures:
+            future.result()
+
+    with ThreadPoolExecutor(max_workers=1) as scanner, open(path, 'w', newline='') as out:
+        scan = scanner.submit(scan_all)
+        if _file_format(path, file_format) == 'csv':
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                out.write(json.dumps(row, default=_json_default) + '\n')
+        try:
+            while True:
+                row = rows.get()
+                if row is done:
+                    break
+                write(row)
+                written += 1
+        except BaseException:
+            stop.set()
+            raise
+        scan.result()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='Load bookings from a JSONL or CSV file')
+    importer.add_argument('path')
+    importer.add_argument('--booking-type', help='Type of rows without a booking_type column')
+    importer.add_argument('--concurrency', type=int, default=8)
+    importer.add_argument('--format', choices=['jsonl', 'csv'])
+    exporter = commands.add_parser('export', help='Write every booking to a JSONL or CSV file')
+    exporter.add_argument('path')
+    exporter.add_argument('--segments', type=int, default=8)
+    exporter.add_argument('--format', choices=['jsonl', 'csv'])
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.command == 'import':
+        rejected = []
+        count = import_bookings(read_rows(args.path, args.format), args.booking_type, args.concurrency, rejected)
+        for booking, reason in rejected:
+            print(f"rejected {booking['booking_type']} {booking['booking_id']}: {reason}", file=sys.stderr)
+    else:
+        count = export_bookings(args.path, args.segments, args.format)
+    elapsed = time.perf_counter() - started
+    print(f'{args.command}ed {count} bookings in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.0f}/s)',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
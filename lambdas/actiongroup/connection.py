@@ -0,0 +1,68 @@
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from metrics import instrument
+
+TABLE_NAME = os.environ.get('TABLE_NAME', 'steakhouse_bookings')
+NAME_INDEX = os.environ.get('NAME_INDEX', 'name-index')
+STAFF_NAME_INDEX = os.environ.get('STAFF_NAME_INDEX', 'staff-name-index')
+BOOKING_TYPE_INDEX = os.environ.get('BOOKING_TYPE_INDEX', 'booking-type-index')
+# Name attribute -> the normalised copy of it the name indexes are keyed on
+NAME_KEYS = {'name': 'name_key', 'staff_name': 'staff_name_key'}
+
+CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', '10')),
+    connect_timeout=2,
+    read_timeout=5,
+    retries={'mode': 'adaptive', 'max_attempts': 4}
+)
+
+_client = None
+_client_lock = threading.Lock()
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def get_client():
+    """
+    Return the DynamoDB client of this container, creating it on first use
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = instrument(boto3.client('dynamodb', config=CLIENT_CONFIG))
+    return _client
+
+
+def serialize(item):
+    """
+    Convert a python dict into a DynamoDB attribute value map
+    """
+    return {key: _serializer.serialize(value) for key, value in item.items()}
+
+
+def deserialize(item):
+    """
+    Convert a DynamoDB attribute value map into a python dict
+    """
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+
+def name_key(name):
+    """
+    Normalise a name for lookups: case folded, with runs of whitespace collapsed
+    """
+    return ' '.join(str(name).casefold().split())
+
+
+def with_name_keys(booking):
+    """
+    Return a booking with the normalised copies of its names, for the name indexes
+    """
+    return dict(booking, **{key: name_key(booking[field]) for field, key in NAME_KEYS.items()
+                            if booking.get(field)})
@@ -0,0 +1,169 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from schemas import FUNCTION_SCHEMAS
+
+
+class ParameterError(ValueError):
+    """
+    Raised when the parameters of an action group call do not match the function schema
+    """
+
+
+def _to_string(value):
+    return str(value).strip()
+
+
+def _to_integer(value):
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError('expected integer')
+    if not number.is_finite() or number != number.to_integral_value():
+        raise ValueError('expected integer')
+    return int(number)
+
+
+def _to_number(value):
+    # DynamoDB only accepts Decimal for non-integer numbers
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError('expected number')
+    if not number.is_finite():
+        raise ValueError('expected number')
+    return number
+
+
+def _to_boolean(value):
+    text = str(value).strip().lower()
+    if text in ('true', 'yes', '1'):
+        return True
+    if text in ('false', 'no', '0'):
+        return False
+    raise ValueError('expected boolean')
+
+
+def _to_array(value):
+    if isinstance(value, list):
+        return value
+    text = str(value).strip()
+    try:
+        items = json.loads(text)
+    except ValueError:
+        # The agent sometimes sends arrays without quoting their items, e.g. [a, b]
+        items = [item.strip().strip('"\'') for item in text.strip('[]').split(',')]
+    if not isinstance(items, list):
+        raise ValueError('expected array')
+    return [item for item in items if item != '']
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d %B %Y', '%d %b %Y',
+                '%B %d %Y', '%b %d %Y', '%B %d, %Y', '%b %d, %Y')
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%H%M', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p')
+
+
+def _to_date(value):
+    text = str(value).strip()
+    # Fast path for the ISO dates the agent usually sends
+    if len(text) == 10 and text[4] == '-':
+        try:
+            return date.fromisoformat(text).isoformat()
+        except ValueError:
+            pass
+    # Day-first, like the dates the steakhouse writes on tickets
+    text = ' '.join(text.replace(',', ', ').split()).replace(' ,', ',')
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError('expected date')
+
+
+def _to_time(value):
+    text = str(value).strip().upper().replace('.', ':')
+    # Fast path for HH:MM
+    if len(text) == 5 and text[2] == ':' and text[:2].isdigit() and text[3:].isdigit():
+        if int(text[:2]) < 24 and int(text[3:]) < 60:
+            return text
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, time_format).strftime('%H:%M')
+        except ValueError:
+            continue
+    raise ValueError('expected time')
+
+
+FORMATS = {
+    'date': (_to_date, 'date such as 2025-03-14'),
+    'time': (_to_time, 'time such as 19:30'),
+}
+
+COERCERS = {
+    'string': _to_string,
+    'integer': _to_integer,
+    'number': _to_number,
+    'boolean': _to_boolean,
+    'array': _to_array,
+}
+
+
+class Decoder:
+    """
+    Coerces and validates the raw parameters of one function against its schema
+    """
+
+    def __init__(self, parameters):
+        self.fields = {}
+        for field, spec in parameters.items():
+            coerce, type_name = COERCERS[spec['type']], spec['type']
+            if 'format' in spec:
+                coerce, type_name = FORMATS[spec['format']]
+            self.fields[field] = (coerce, type_name, spec.get('minimum'), spec.get('maximum'))
+        self.required = tuple(field for field, spec in parameters.items() if spec['required'])
+
+    def __call__(self, parameters):
+        """
+        Decode the `parameters` list of a lambda event into a name -> value map
+
+        Args:
+            parameters (list): The parameters sent by the agent
+        """
+        values = {}
+        for item in parameters:
+            field = self.fields.get(item['name'])
+            if field is None:
+                continue
+            coerce, type_name, minimum, maximum = field
+            if item['value'] is None or item['value'] == '':
+                continue
+            try:
+                value = coerce(item['value'])
+            except ValueError:
+                raise ParameterError(f"Invalid value for {item['name']}: expected {type_name}")
+            if minimum is not None and value < minimum:
+                raise ParameterError(f"Invalid value for {item['name']}: must be at least {minimum}")
+            if maximum is not None and value > maximum:
+                raise ParameterError(f"Invalid value for {item['name']}: must be at most {maximum}")
+            if value == '' or value == []:
+                continue
+            values[item['name']] = value
+
+        missing = [field for field in self.required if field not in values]
+        if len(missing) == 1:
+            raise ParameterError(f'Missing {missing[0]} parameter')
+        if missing:
+            raise ParameterError('Missing required parameters: {}'.format(', '.join(missing)))
+        return values
+
+
+def load_decoders(schemas=FUNCTION_SCHEMAS):
+    """
+    Compile a decoder for every function declared in the function schemas
+    """
+    return {name: Decoder(function['parameters']) for name, function in schemas.items()}
+
+
+# Compiled once per container, at cold start
+DECODERS = load_decoders()
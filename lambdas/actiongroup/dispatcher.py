@@ -0,0 +1,118 @@
+import time
+import idempotency
+from decoders import DECODERS, ParameterError
+from encoder import encode
+from log import logger
+from metrics import metrics
+
+# (actionGroup, function) -> handler
+_registry = {}
+# (actionGroup, function) of the handlers that must not run twice for one agent call
+_idempotent = set()
+
+
+def action(action_group, function, idempotent=False):
+    """
+    Register a handler for a function of an action group
+
+    Args:
+        action_group (string): The action group name sent by the agent
+        function (string): The function name sent by the agent
+        idempotent (bool, optional): Whether retries of the same call in a session return the
+            booking of the first call instead of creating another. Defaults to False.
+    """
+    def register(handler):
+        _registry[(action_group, function)] = handler
+        if idempotent:
+            _idempotent.add((action_group, function))
+        return handler
+    return register
+
+
+def get_parameters(event):
+    """
+    Build a name -> value map of the parameters in the lambda event
+    """
+    return {item['name']: item['value'] for item in event.get('parameters', [])}
+
+
+def build_response(event, body):
+    """
+    Wrap a response body in the envelope expected by the Bedrock agent
+    """
+    return {
+        'response': {
+            'actionGroup': event.get('actionGroup', ''),
+            'function': event.get('function', ''),
+            'functionResponse': {
+                'responseBody': {'TEXT': {'body': body}}
+            }
+        },
+        'messageVersion': event.get('messageVersion', '1.0')
+    }
+
+
+def run(event, function, handler, params):
+    """
+    Run a handler, replaying the recorded result of idempotent calls already made
+    """
+    if (event.get('actionGroup', ''), function) not in _idempotent or not event.get('sessionId'):
+        return handler(params)
+    key = idempotency.idempotency_key(event['sessionId'], function, params)
+    booking_id = idempotency.recorded_booking(key)
+    if booking_id:
+        logger.info('Idempotent replay', booking_id=booking_id)
+        return {'booking_id': booking_id}
+    with idempotency.scope(key):
+        return handler(params)
+
+
+def handle(event, function):
+    """
+    Decode the parameters of an invocation and run its handler, returning the response body
+    """
+    handler = _registry.get((event.get('actionGroup', ''), function))
+
+    if handler is None:
+        body = 'Invalid function'
+        logger.warning('Invalid function', action_group=event.get('actionGroup', ''))
+    else:
+        decoder = DECODERS.get(function)
+        try:
+            params = decoder(event.get('parameters', [])) if decoder else get_parameters(event)
+        except ParameterError as e:
+            body = str(e)
+            logger.warning('Invalid parameters', error=body)
+        else:
+            try:
+                result = run(event, function, handler, params)
+            except Exception as e:
+                logger.error('Unhandled error', error=repr(e), parameters=params)
+                raise
+            if isinstance(result, dict) and 'error' in result:
+                logger.warning('Action failed', error=result['error'], parameters=params)
+            logger.debug('Action result', parameters=params, result=result)
+            body = encode(function, result)
+    return body
+
+
+def dispatch(event, context=None):
+    """
+    Route an action group invocation to its registered handler
+
+    Parameters are decoded against the function schema before the handler runs,
+    so invalid calls are rejected without touching DynamoDB.
+    """
+    started = time.perf_counter()
+    function = event.get('function', '')
+    logger.start(function, getattr(context, 'aws_request_id', None))
+    metrics.start(event.get('actionGroup', ''), function)
+    try:
+        body = handle(event, function)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        metrics.add('HandlerDuration', duration_ms)
+        metrics.flush()
+
+    logger.info('Invocation', duration_ms=round(duration_ms, 2), response_bytes=len(body))
+    return build_response(event, body)
@@ -0,0 +1,69 @@
+import json
+import os
+from decimal import Decimal
+from schemas import FUNCTION_SCHEMAS
+
+MAX_RESPONSE_BYTES = int(os.environ.get('MAX_RESPONSE_BYTES', '6000'))
+
+# Bookkeeping attributes the agent never needs to see
+INTERNAL_FIELDS = frozenset(['booking_type', 'type_booking_id', 'slot_id', 'slot_ids', 'ledger_days', 'name_key',
+                             'staff_name_key', 'expires_at'])
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def project(value, fields=None):
+    """
+    Drop internal attributes, and with `fields` keep only those attributes of each booking
+    """
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    is_booking = 'booking_id' in value
+    return {
+        key: project(item, fields) for key, item in value.items()
+        if key not in INTERNAL_FIELDS and not (is_booking and fields and key not in fields)
+    }
+
+
+def _dumps(value):
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False)
+
+
+def _largest_list(value):
+    lists = [(key, item) for key, item in value.items() if isinstance(item, list) and item]
+    return max(lists, key=lambda entry: len(entry[1]), default=(None, None))[0]
+
+
+def encode(function, result, max_bytes=MAX_RESPONSE_BYTES):
+    """
+    Encode the result of an action function as compact JSON for the agent
+
+    Args:
+        function (string): The function that produced the result
+        result: The value returned by the function
+        max_bytes (int, optional): Size cap of the encoded result. Lists are cut short
+            to fit, and the result is flagged as truncated. Defaults to MAX_RESPONSE_BYTES.
+    """
+    schema = FUNCTION_SCHEMAS.get(function, {})
+    result = project(result, schema.get('responseFields'))
+    body = _dumps(result)
+    if len(body.encode()) <= max_bytes or not isinstance(result, dict):
+        return body
+
+    result = dict(result, truncated=True)
+    key = _largest_list(result)
+    while key is not None:
+        result[key] = result[key][:len(result[key]) // 2]
+        body = _dumps(result)
+        if len(body.encode()) <= max_bytes:
+            return body
+        key = _largest_list(result)
+    return _dumps({'error': 'The result is too large, please narrow the request'})
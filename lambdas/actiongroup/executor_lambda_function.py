@@ -0,0 +1,9 @@
+# Registers the handlers of every action group, so one function can serve all the agents
+import hr_lambda_function  # noqa: F401
+import operations_lambda_function  # noqa: F401
+import reservation_lambda_function  # noqa: F401
+import shortlet_lambda_function  # noqa: F401
+import ticket_lambda_function  # noqa: F401
+from dispatcher import dispatch
+
+lambda_handler = dispatch
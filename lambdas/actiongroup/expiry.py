@@ -0,0 +1,52 @@
+import json
+import os
+from datetime import date as Date, datetime, timedelta, timezone
+
+# Days a booking stays in the live table after it is over, per booking type
+RETENTION_DAYS = dict({'reservation': 30, 'shortlet': 30, 'time_off': 365, 'ticket': 180},
+                      **json.loads(os.environ.get('BOOKING_RETENTION_DAYS', '{}')))
+# Availability counters and ledger days are only needed until their day is over
+WORKING_DAYS_RETENTION = int(os.environ.get('WORKING_DAYS_RETENTION', '1'))
+
+
+def _day(text):
+    text = str(text)
+    if '/' in text:
+        return datetime.strptime(text, '%d/%m/%Y').date()
+    return Date.fromisoformat(text[:10])
+
+
+def booking_end(booking_type, booking):
+    """
+    Return the last day a booking is in use, or None when its dates are missing or unreadable
+    """
+    try:
+        if booking_type == 'reservation':
+            return _day(booking['date'])
+        if booking_type == 'shortlet':
+            return _day(booking['date']) + timedelta(days=int(booking.get('number_days', 1)))
+        if booking_type == 'time_off':
+            return _day(booking['end_date'])
+        if booking_type == 'ticket':
+            return _day(booking.get('creation_date') or booking['incident_date'])
+    except (KeyError, ValueError):
+        return None
+    return None
+
+
+def day_expires_at(day, retention_days):
+    """
+    Return the epoch second at which an item about `day` expires, `retention_days` after it
+    """
+    end = _day(day) + timedelta(days=retention_days + 1)
+    return int(datetime(end.year, end.month, end.day, tzinfo=timezone.utc).timestamp())
+
+
+def expires_at(booking_type, booking):
+    """
+    Return the DynamoDB TTL of a booking: its retention period after its last day, or None
+    """
+    end = booking_end(booking_type, booking)
+    if end is None or booking_type not in RETENTION_DAYS:
+        return None
+    return day_expires_at(end.isoformat(), RETENTION_DAYS[booking_type])
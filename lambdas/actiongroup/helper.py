@@ -1,14 +1,296 @@
-import boto3
+import base64
+import json
+import time
+import idempotency
+from availability import CapacityError
+from cache import booking_cache
+from connection import TABLE_NAME, get_client, serialize, deserialize, with_name_keys
+from expiry import expires_at
+from ids import new_booking_id
+from metrics import metrics
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('steakhouse_bookings')
+BATCH_GET_LIMIT = 100
+TRANSACT_ITEMS_LIMIT = 100
+TYPE_SORT_KEY = 'type_booking_id'
+# Bookings written before booking types were recorded have none, and match any type
+TYPE_MATCHES = '(attribute_not_exists(booking_type) OR booking_type = :booking_type)'
+# Attributes the holds of a booking are released from; a delete is guarded on them
+HOLD_ATTRIBUTES = ('slot_id', 'slot_ids', 'ledger_days', 'num_guests')
 
 
-def get_named_parameter(event, name):
+def new_booking_items(booking_type, item, holds=()):
     """
-    Get a parameter from the lambda event
+    Build a new booking under a fresh booking ID and the transaction items that write it
+
+    Args:
+        booking_type (string): The kind of booking, e.g. reservation or ticket
+        item (dict): The booking attributes, without booking_id
+        holds (list or callable, optional): Availability updates to apply with it, or a callable
+            building them from the new booking ID. Defaults to ().
+
+    Returns:
+        The booking, and its Put followed by the holds
+    """
+    booking_id = new_booking_id()
+    booking = with_name_keys(dict(item, booking_id=booking_id, booking_type=booking_type,
+                                  **{TYPE_SORT_KEY: f'{booking_type}#{booking_id}'}))
+    expiry = expires_at(booking_type, booking)
+    if expiry:
+        booking['expires_at'] = expiry
+    put = {'TableName': TABLE_NAME, 'Item': serialize(booking),
+           'ConditionExpression': 'attribute_not_exists(booking_id)'}
+    return booking, [{'Put': put}] + (holds(booking_id) if callable(holds) else list(holds))
+
+
+def create_booking(booking_type, item, holds=(), max_attempts=5):
     """
-    return next((item['value'] for item in event.get('parameters', []) if item['name'] == name), None)
+    Write a new booking under a fresh booking ID, retrying if the ID is already taken
+
+    Args:
+        booking_type (string): The kind of booking, e.g. reservation or ticket
+        item (dict): The booking attributes, without booking_id
+        holds (list or callable, optional): Availability updates to apply in the same transaction,
+            or a callable building them from the new booking ID. Defaults to ().
+            Inside an idempotent create call, the call is recorded in the same transaction too.
+        max_attempts (int, optional): Attempts before giving up on ID collisions. Defaults to 5.
+
+    Returns:
+        The ID of the new booking
+    """
+    client = get_client()
+    for _ in range(max_attempts):
+        booking, writes = new_booking_items(booking_type, item, holds)
+        record = idempotency.claim(booking['booking_id'])
+        if record:
+            writes.append(record)
+        try:
+            if len(writes) > 1:
+                client.transact_write_items(TransactItems=writes)
+            else:
+                client.put_item(**writes[0]['Put'])
+        except client.exceptions.ConditionalCheckFailedException:
+            continue
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            # A retry of a create call that already went through returns the original booking
+            if record and reasons[-1:] == ['ConditionalCheckFailed']:
+                original = idempotency.recorded_booking()
+                if original:
+                    return original
+            if 'ConditionalCheckFailed' in reasons[1:]:
+                raise CapacityError('Not enough availability for this booking')
+            if reasons[:1] == ['ConditionalCheckFailed']:
+                continue
+            raise
+        booking_cache.put(booking['booking_id'], booking)
+        return booking['booking_id']
+    raise RuntimeError('Could not allocate a unique booking ID')
+
+
+def _stored_booking(booking_id, booking_type=None):
+    response = get_client().get_item(TableName=TABLE_NAME, Key=serialize({'booking_id': booking_id}),
+                                      ConsistentRead=True)
+    booking = deserialize(response['Item']) if 'Item' in response else None
+    if booking is None or (booking_type and booking.get('booking_type', booking_type) != booking_type):
+        raise LookupError(f'No booking found with ID {booking_id}')
+    return booking
+
+
+def delete_booking_items(booking_id, booking_type=None, releases=None):
+    """
+    Build the transaction items that delete a stored booking and release its holds
+
+    With releases, the delete is guarded on the attributes they were built from, so a
+    concurrent change moving the holds cancels the transaction.
+
+    Args:
+        booking_id (string): The ID of the booking to delete
+        booking_type (string, optional): The kind of booking it must be. Defaults to None.
+        releases (callable, optional): Given the stored booking, returns the availability
+            updates that undo its holds. Defaults to None.
+
+    Returns:
+        The Delete of the booking followed by the releases
+    """
+    booking = _stored_booking(booking_id, booking_type)
+    delete = {'TableName': TABLE_NAME, 'Key': serialize({'booking_id': booking_id}),
+              'ConditionExpression': 'attribute_exists(booking_id)'}
+    if not releases:
+        return [{'Delete': delete}]
+
+    names, values, guards = {}, {}, ['attribute_exists(booking_id)']
+    for i, field in enumerate(HOLD_ATTRIBUTES):
+        names[f'#h{i}'] = field
+        if field in booking:
+            guards.append(f'#h{i} = :h{i}')
+            values[f':h{i}'] = booking[field]
+        else:
+            guards.append(f'attribute_not_exists(#h{i})')
+    delete.update(ConditionExpression=' AND '.join(guards), ExpressionAttributeNames=names)
+    if values:
+        delete['ExpressionAttributeValues'] = serialize(values)
+    return [{'Delete': delete}] + list(releases(booking))
+
+
+def delete_booking(booking_id, booking_type, releases=None, max_attempts=3):
+    """
+    Delete a steakhouse booking
+
+    Args:
+        booking_id (string): The ID of the booking to delete
+        booking_type (string): The kind of booking it must be; a booking of another kind is left alone
+        releases (callable, optional): Given the stored booking, returns the availability
+            updates that undo its holds; they are applied in the same transaction. Defaults to None.
+        max_attempts (int, optional): Attempts when the booking changes concurrently. Defaults to 3.
+    """
+    booking_cache.invalidate(booking_id)
+    client = get_client()
+    for _ in range(max_attempts):
+        writes = []
+        if releases is not None:
+            try:
+                writes = delete_booking_items(booking_id, booking_type, releases)
+            except LookupError:
+                # Gone already, or of another kind: the guarded delete below tells them apart
+                pass
+        if len(writes) <= 1:
+            try:
+                client.delete_item(TableName=TABLE_NAME, Key=serialize({'booking_id': booking_id}),
+                                   ConditionExpression=f'attribute_not_exists(booking_id) OR {TYPE_MATCHES}',
+                                   ExpressionAttributeValues=serialize({':booking_type': booking_type}))
+            except client.exceptions.ConditionalCheckFailedException:
+                raise LookupError(f'No booking found with ID {booking_id}')
+            return
+        try:
+            client.transact_write_items(TransactItems=writes)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            # Deleted or its holds moved concurrently: read it again and release what it holds now
+            if reasons[:1] == ['ConditionalCheckFailed']:
+                continue
+            raise
+        return
+    raise RuntimeError('The booking kept changing while deleting it, please try again')
+
+
+def _set_expression(fields, names, prefix):
+    names.update({f'#{prefix}{i}': field for i, field in enumerate(fields)})
+    return ', '.join(f'#{prefix}{i} = :{prefix}{i}' for i in range(len(fields)))
+
+
+def _changes(changes):
+    changes = {field: value for field, value in changes.items() if value not in (None, '')}
+    if not changes:
+        raise ValueError('Nothing to update')
+    return changes
+
+
+def update_booking_items(booking_id, booking_type, changes, reholds=None):
+    """
+    Build the transaction items that change a stored booking and move its holds
+
+    The booking update is guarded on the attributes it changes, so a concurrent change
+    to the booking cancels the transaction.
+
+    Args:
+        booking_id (string): The ID of the booking to update
+        booking_type (string): The kind of booking, e.g. reservation or ticket
+        changes (dict): The attributes to change; None and empty values are left as they are
+        reholds (callable, optional): Given the stored and the updated booking, returns the
+            attributes derived from the change and the availability updates that move its holds.
+            Defaults to None.
+
+    Returns:
+        The attributes that change with their new values, and the Update of the booking
+        followed by the holds; no items when nothing changes
+    """
+    changes = _changes(changes)
+    current = _stored_booking(booking_id, booking_type)
+    updated = dict(current, **changes)
+    derived, writes = reholds(current, updated) if reholds else ({}, [])
+    updated.update(derived)
+    expiry = expires_at(booking_type, updated)
+    if expiry:
+        updated['expires_at'] = expiry
+    changed = {field: value for field, value in updated.items() if current.get(field) != value}
+    if not changed:
+        return {}, []
+
+    names = {}
+    fields = list(changed)
+    values = {f':f{i}': changed[field] for i, field in enumerate(fields)}
+    guards = []
+    for i, field in enumerate(fields):
+        if field in current:
+            guards.append(f'#f{i} = :o{i}')
+            values[f':o{i}'] = current[field]
+        else:
+            guards.append(f'attribute_not_exists(#f{i})')
+    update = {'TableName': TABLE_NAME, 'Key': serialize({'booking_id': booking_id}),
+              'UpdateExpression': 'SET ' + _set_expression(fields, names, 'f'),
+              'ConditionExpression': ' AND '.join(guards),
+              'ExpressionAttributeNames': names,
+              'ExpressionAttributeValues': serialize(values)}
+    return changed, [{'Update': update}] + list(writes)
+
+
+def update_booking(booking_id, booking_type, changes, reholds=None, held=(), max_attempts=3):
+    """
+    Change some attributes of a steakhouse booking in place
+
+    Args:
+        booking_id (string): The ID of the booking to update
+        booking_type (string): The kind of booking, e.g. reservation or ticket
+        changes (dict): The attributes to change; None and empty values are left as they are
+        reholds (callable, optional): Given the stored and the updated booking, returns the
+            attributes derived from the change and the availability updates that move its holds.
+            Defaults to None.
+        held (iterable, optional): The attributes whose change moves the holds. Defaults to ().
+        max_attempts (int, optional): Attempts when the booking changes concurrently. Defaults to 3.
+
+    Returns:
+        The attributes that changed, with their new values
+    """
+    changes = _changes(changes)
+    booking_cache.invalidate(booking_id)
+    client = get_client()
+
+    if reholds is None or not set(changes) & set(held):
+        # A single conditional UpdateItem, returning only what it set
+        names = {}
+        try:
+            response = client.update_item(
+                TableName=TABLE_NAME, Key=serialize({'booking_id': booking_id}),
+                UpdateExpression='SET ' + _set_expression(list(changes), names, 'f'),
+                ConditionExpression=f'attribute_exists(booking_id) AND {TYPE_MATCHES}',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=serialize(dict(
+                    {f':f{i}': value for i, value in enumerate(changes.values())}, **{':booking_type': booking_type})),
+                ReturnValues='UPDATED_NEW')
+        except client.exceptions.ConditionalCheckFailedException:
+            raise LookupError(f'No booking found with ID {booking_id}')
+        return deserialize(response.get('Attributes', {}))
+
+    # Moving holds: the booking and its counters change in one transaction, guarded on the
+    # attributes read so a concurrent change makes it start over
+    for _ in range(max_attempts):
+        changed, writes = update_booking_items(booking_id, booking_type, changes, reholds)
+        if not changed:
+            return {}
+        if len(writes) > TRANSACT_ITEMS_LIMIT:
+            raise ValueError('This change touches too many days at once, please split it up')
+        try:
+            client.transact_write_items(TransactItems=writes)
+        except client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            if 'ConditionalCheckFailed' in reasons[1:]:
+                raise CapacityError('Not enough availability for this change')
+            if reasons[:1] == ['ConditionalCheckFailed']:
+                continue
+            raise
+        return changed
+    raise RuntimeError('The booking kept changing while updating it, please try again')
+
 
 def get_booking_details(booking_id):
     """
@@ -17,11 +299,122 @@ def get_booking_details(booking_id):
     Args:
         booking_id (string): The ID of the booking to retrieve
     """
+    booking = booking_cache.get(booking_id)
+    metrics.add('CacheHits', int(bool(booking)))
+    metrics.add('CacheMisses', int(not booking))
+    if booking:
+        return booking
+
     try:
-        response = table.get_item(Key={'booking_id': booking_id})
+        response = get_client().get_item(TableName=TABLE_NAME, Key=serialize({'booking_id': booking_id}))
         if 'Item' in response:
-            return response['Item']
+            booking = deserialize(response['Item'])
+            booking_cache.put(booking_id, booking)
+            return booking
         else:
             return {'message': f'No booking found with ID {booking_id}'}
     except Exception as e:
         return {'error': str(e)}
+
+
+def get_bookings(booking_ids, max_attempts=5):
+    """
+    Retrieve details of several steakhouse bookings with a single BatchGetItem
+
+    Args:
+        booking_ids (list): The IDs of the bookings to retrieve
+        max_attempts (int, optional): Attempts for keys DynamoDB leaves unprocessed. Defaults to 5.
+    """
+    booking_ids = list(dict.fromkeys(booking_ids))
+    found = {}
+    pending = []
+    for booking_id in booking_ids:
+        booking = booking_cache.get(booking_id)
+        if booking:
+            found[booking_id] = booking
+        else:
+            pending.append(booking_id)
+    metrics.add('CacheHits', len(found))
+    metrics.add('CacheMisses', len(pending))
+
+    try:
+        # BatchGetItem accepts at most 100 keys per request
+        for start in range(0, len(pending), BATCH_GET_LIMIT):
+            keys = [serialize({'booking_id': booking_id}) for booking_id in pending[start:start + BATCH_GET_LIMIT]]
+            request = {TABLE_NAME: {'Keys': keys}}
+            for attempt in range(max_attempts):
+                response = get_client().batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(TABLE_NAME, []):
+                    booking = deserialize(item)
+                    found[booking['booking_id']] = booking
+                    booking_cache.put(booking['booking_id'], booking)
+                request = response.get('UnprocessedKeys')
+                if not request:
+                    break
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+            else:
+                return {'error': 'Some bookings could not be retrieved, please try again'}
+    except Exception as e:
+        return {'error': str(e)}
+
+    return {
+        'bookings': [found[booking_id] for booking_id in booking_ids if booking_id in found],
+        'not_found': [booking_id for booking_id in booking_ids if booking_id not in found],
+    }
+
+
+def _encode_token(last_key):
+    return base64.urlsafe_b64encode(json.dumps(deserialize(last_key)).encode()).decode()
+
+
+def _decode_token(token):
+    return serialize(json.loads(base64.urlsafe_b64decode(token.encode())))
+
+
+def list_bookings(index_name, key_name, key_value, attributes, booking_type=None, limit=10, next_token=None):
+    """
+    List the bookings under one key of a secondary index, newest first
+
+    Args:
+        index_name (string): The global secondary index to query
+        key_name (string): The partition key attribute of the index
+        key_value (string): The value to look up, e.g. a customer name
+        attributes (list): The attributes to return for each booking
+        booking_type (string, optional): Only return bookings of this type. Defaults to None.
+        limit (int, optional): Maximum number of bookings to return. Defaults to 10.
+        next_token (string, optional): Token returned by the previous page. Defaults to None.
+    """
+    names = {'#k': key_name}
+    values = {':k': key_value}
+    condition = '#k = :k'
+    if booking_type:
+        names['#s'] = TYPE_SORT_KEY
+        values[':s'] = f'{booking_type}#'
+        condition += ' AND begins_with(#s, :s)'
+
+    projection = []
+    for i, attribute in enumerate(['booking_id'] + list(attributes)):
+        names[f'#p{i}'] = attribute
+        projection.append(f'#p{i}')
+
+    request = {
+        'TableName': TABLE_NAME,
+        'IndexName': index_name,
+        'KeyConditionExpression': condition,
+        'ProjectionExpression': ', '.join(projection),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': serialize(values),
+        'ScanIndexForward': False,
+        'Limit': limit,
+    }
+    try:
+        if next_token:
+            request['ExclusiveStartKey'] = _decode_token(next_token)
+        response = get_client().query(**request)
+    except Exception as e:
+        return {'error': str(e)}
+
+    result = {'bookings': [deserialize(item) for item in response.get('Items', [])]}
+    if 'LastEvaluatedKey' in response:
+        result['next_token'] = _encode_token(response['LastEvaluatedKey'])
+    return result
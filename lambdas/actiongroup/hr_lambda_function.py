@@ -1,10 +1,40 @@
-import json
-import uuid
-import boto3
-from  helper import get_named_parameter, get_booking_details
+import os
+from availability import CapacityError
+from connection import STAFF_NAME_INDEX, name_key
+from helper import create_booking, delete_booking, get_booking_details, get_bookings, list_bookings, update_booking
+from ledger import days_off_between, hold_days, relabel_days, release_days, staff_off_on, time_off_days
+from dispatcher import action, dispatch
+
+ACTION_GROUP = os.environ.get('HR_ACTION_GROUP_NAME', 'HrBookingsActionGroup')
+BOOKING_TYPE = 'time_off'
+LISTED_ATTRIBUTES = ['start_date', 'end_date', 'reason']
+# Changing these moves or relabels the ledger days held by the booking
+HELD_ATTRIBUTES = ('start_date', 'end_date', 'reason')
+
+
+def new_time_off(staff_name, start_date, end_date, reason, comment=None):
+    """
+    The item of a new time off booking and a callable building its ledger days from its ID
+    """
+    item = {
+        'staff_name': staff_name,
+        'start_date': start_date,
+        'end_date': end_date,
+        'reason': reason,
+    }
+
+    # Only add comment if it's not None or empty
+    if comment:
+        item['comment'] = comment
+
+    # Mark each day off in the staff ledger in the same transaction as the booking
+    item['ledger_days'] = time_off_days(start_date, end_date)
+
+    def holds(booking_id):
+        return hold_days(staff_name, item['ledger_days'], booking_id, reason)
+
+    return item, holds
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('steakhouse_bookings')
 
 def create_time_off_booking(staff_name, start_date, end_date, reason, comment=None):
     """
@@ -18,22 +48,97 @@ def create_time_off_booking(staff_name, start_date, end_date, reason, comment=No
         comment (string, optional): Detailed description of time off reason. Defaults to None.
     """
     try:
-        booking_id = str(uuid.uuid4())[:8]
-        item = {
-            'booking_id': booking_id,
-            'staff_name': staff_name,
-            'start_date': start_date,
-            'end_date': end_date,
-            'reason': reason,
-        }
-
-        # Only add comment if it's not None or empty
-        if comment:
-            item['comment'] = comment
-        
-        table.put_item(Item=item)
-
-        return {'booking_id': booking_id}
+        item, holds = new_time_off(staff_name, start_date, end_date, reason, comment)
+        return {'booking_id': create_booking(BOOKING_TYPE, item, holds)}
+    except CapacityError:
+        return dict(check_time_off_conflicts(staff_name, start_date, end_date),
+                    error='The time off overlaps time off already booked')
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def release_ledger_days(booking):
+    """
+    Ledger updates that remove the days held by a time off booking
+    """
+    return release_days(booking['staff_name'], booking.get('ledger_days', []), booking['booking_id'])
+
+
+def move_ledger_days(booking, updated):
+    """
+    Ledger updates that move the days held by a time off booking to its new dates and reason
+    """
+    held = booking.get('ledger_days', [])
+    days = time_off_days(updated['start_date'], updated['end_date'])
+    staff_name, booking_id = booking['staff_name'], booking['booking_id']
+    kept = [day for day in days if day in held]
+    writes = release_days(staff_name, [day for day in held if day not in days], booking_id)
+    writes += hold_days(staff_name, [day for day in days if day not in held], booking_id, updated['reason'])
+    if updated['reason'] != booking['reason']:
+        writes += relabel_days(staff_name, kept, booking_id, updated['reason'])
+    return {'ledger_days': days}, writes
+
+
+def update_time_off_booking(booking_id, start_date=None, end_date=None, reason=None, comment=None):
+    """
+    Change an existing steakhouse hr time off booking
+
+    Args:
+        booking_id (str): The ID of the booking to change
+        start_date (string, optional): The new start date of the time off. Defaults to None.
+        end_date (string, optional): The new end date of the time off. Defaults to None.
+        reason (string, optional): The new reason for taking a time off. Defaults to None.
+        comment (string, optional): The new description of the time off reason. Defaults to None.
+    """
+    try:
+        changes = {'start_date': start_date, 'end_date': end_date, 'reason': reason, 'comment': comment}
+        updated = update_booking(booking_id, BOOKING_TYPE, changes, reholds=move_ledger_days, held=HELD_ATTRIBUTES)
+        return {'booking_id': booking_id, 'updated': updated}
+    except CapacityError:
+        booking = get_booking_details(booking_id)
+        if 'staff_name' not in booking:
+            # Deleted since the update was refused, so there is nothing left to list conflicts for
+            return {'error': 'The time off overlaps time off already booked'}
+        conflicts = check_time_off_conflicts(booking['staff_name'], start_date or booking['start_date'],
+                                             end_date or booking['end_date'])
+        if 'conflicts' in conflicts:
+            conflicts['conflicts'] = [conflict for conflict in conflicts['conflicts']
+                                      if conflict['booking_id'] != booking_id]
+        return dict(conflicts, error='The time off overlaps time off already booked')
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def check_time_off_conflicts(staff_name, start_date, end_date):
+    """
+    Find the time off a staff member already has between two dates
+
+    Args:
+        staff_name (string): Name of staff taking a time off
+        start_date (string): The intended start date of the time off
+        end_date (string): The intended end date of the time off
+    """
+    try:
+        time_off_days(start_date, end_date)
+        conflicts = {}
+        for entry in days_off_between(staff_name, start_date, end_date):
+            conflict = conflicts.setdefault(entry['booking_id'], {'booking_id': entry['booking_id'],
+                                                                  'reason': entry.get('reason'), 'days': []})
+            conflict['days'].append(entry['day'])
+        return {'staff_name': staff_name, 'has_conflicts': bool(conflicts), 'conflicts': list(conflicts.values())}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def list_staff_off_on(date):
+    """
+    List the staff who are off on a given date
+
+    Args:
+        date (string): The date to check
+    """
+    try:
+        return {'date': date, 'staff': staff_off_on(date)}
     except Exception as e:
         return {'error': str(e)}
 
@@ -46,64 +151,53 @@ def delete_time_off_booking(booking_id):
         booking_id (str): The ID of the booking to delete
     """
     try:
-        response = table.delete_item(Key={'booking_id': booking_id})
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return {'message': f'Booking with ID {booking_id} deleted successfully'}
-        else:
-            return {'message': f'Failed to delete booking with ID {booking_id}'}
+        delete_booking(booking_id, BOOKING_TYPE, releases=release_ledger_days)
+        return {'message': f'Booking with ID {booking_id} deleted successfully'}
     except Exception as e:
         return {'error': str(e)}
 
 
-def lambda_handler(event, context):
-    # get the action group used during the invocation of the lambda function
-    actionGroup = event.get('actionGroup', '')
-
-    # name of the function that should be invoked
-    function = event.get('function', '')
-
-    if function == 'get_time_off_booking_details':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(get_booking_details(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    elif function == 'create_time_off_booking':
-        staff_name = get_named_parameter(event, "staff_name")
-        start_date = get_named_parameter(event, "start_date")
-        end_date = get_named_parameter(event, "end_date")
-        reason = get_named_parameter(event, "reason")
-        comment = get_named_parameter(event, "comment") or ""
-
-        if staff_name and start_date and end_date and reason:
-            response = str(create_time_off_booking(staff_name, start_date, end_date, reason, comment))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing required parameters'}}
-
-    elif function == 'delete_time_off_booking':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(delete_time_off_booking(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    else:
-        responseBody = {'TEXT': {'body': 'Invalid function'}}
-
-    action_response = {
-        'actionGroup': actionGroup,
-        'function': function,
-        'functionResponse': {
-            'responseBody': responseBody
-        }
-    }
+@action(ACTION_GROUP, 'get_time_off_booking_details')
+def get_time_off_booking_details(params):
+    return get_booking_details(params['booking_id'])
+
+
+@action(ACTION_GROUP, 'get_time_off_bookings')
+def get_time_off_bookings(params):
+    return get_bookings(params['booking_ids'])
+
+
+@action(ACTION_GROUP, 'list_time_off_bookings_by_name')
+def list_time_off_bookings_by_name(params):
+    return list_bookings(STAFF_NAME_INDEX, 'staff_name_key', name_key(params['staff_name']), LISTED_ATTRIBUTES,
+                         limit=params.get('limit', 10), next_token=params.get('next_token'))
+
+
+@action(ACTION_GROUP, 'create_time_off_booking', idempotent=True)
+def create_time_off_booking_action(params):
+    return create_time_off_booking(params['staff_name'], params['start_date'], params['end_date'],
+                                   params['reason'], params.get('comment') or "")
+
+
+@action(ACTION_GROUP, 'check_time_off_conflicts')
+def check_time_off_conflicts_action(params):
+    return check_time_off_conflicts(params['staff_name'], params['start_date'], params['end_date'])
+
+
+@action(ACTION_GROUP, 'list_staff_off_on')
+def list_staff_off_on_action(params):
+    return list_staff_off_on(params['date'])
+
+
+@action(ACTION_GROUP, 'update_time_off_booking')
+def update_time_off_booking_action(params):
+    return update_time_off_booking(params['booking_id'], params.get('start_date'), params.get('end_date'),
+                                   params.get('reason'), params.get('comment'))
+
+
+@action(ACTION_GROUP, 'delete_time_off_booking')
+def delete_time_off_booking_action(params):
+    return delete_time_off_booking(params['booking_id'])
 
-    function_response = {'response': action_response,
-                         'messageVersion': event.get('messageVersion', '1.0')}
-    print("Response: {}".format(function_response))
 
-    return function_response
+lambda_handler = dispatch
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from connection import get_client, name_key, serialize, deserialize
+
+IDEMPOTENCY_TABLE_NAME = os.environ.get('IDEMPOTENCY_TABLE_NAME', 'steakhouse_idempotency')
+# Long enough to cover the agent's retries of one call, short enough to keep the table small
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '3600'))
+
+# Key of the create call being dispatched on this thread, if it is idempotent
+_state = threading.local()
+
+
+def _current_key():
+    return getattr(_state, 'key', None)
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return name_key(value)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item not in (None, '')}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def idempotency_key(session_id, function, params):
+    """
+    Return the key of a create call: its session, its function and a hash of its parameters
+
+    Parameters are normalized first, so the same request with other casing or spacing,
+    or with optional parameters left empty, maps to the same key.
+    """
+    payload = json.dumps(_normalize(params), sort_keys=True, default=str, separators=(',', ':'))
+    return f'{session_id}#{function}#{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+@contextmanager
+def scope(key):
+    """
+    Make `key` the idempotency key of the bookings created inside the block
+    """
+    _state.key = key
+    try:
+        yield
+    finally:
+        _state.key = None
+
+
+def claim(booking_id, now=None):
+    """
+    Transaction item recording that the current create call made `booking_id`
+
+    It fails if the call was already recorded, and is None outside of an idempotent call.
+    Expired records are overwritten, since TTL deletion lags behind expiry.
+    """
+    key = _current_key()
+    if key is None:
+        return None
+    now = int(now if now is not None else time.time())
+    return {'Put': {
+        'TableName': IDEMPOTENCY_TABLE_NAME,
+        'Item': serialize({'idempotency_key': key, 'booking_id': booking_id,
+                           'expires_at': now + IDEMPOTENCY_TTL_SECONDS}),
+        'ConditionExpression': 'attribute_not_exists(idempotency_key) OR expires_at < :now',
+        'ExpressionAttributeValues': serialize({':now': now}),
+    }}
+
+
+def recorded_booking(key=None, now=None):
+    """
+    Return the booking ID recorded for a create call, or None if there is none or it expired
+
+    Args:
+        key (string, optional): The idempotency key. Defaults to the current one.
+    """
+    key = key or _current_key()
+    if key is None:
+        return None
+    response = get_client().get_item(TableName=IDEMPOTENCY_TABLE_NAME, Key=serialize({'idempotency_key': key}),
+                                     ConsistentRead=True)
+    record = deserialize(response['Item']) if 'Item' in response else None
+    if record is None or record['expires_at'] < (now if now is not None else time.time()):
+        return None
+    return record['booking_id']
@@ -0,0 +1,44 @@
+import secrets
+import time
+
+# Crockford base32, lowercase. The alphabet is in ascending ASCII order, so
+# IDs sort lexicographically in the order they were generated.
+ALPHABET = '0123456789abcdefghjkmnpqrstvwxyz'
+TIME_LENGTH = 10
+RANDOM_LENGTH = 4
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+def new_booking_id(now=None):
+    """
+    Generate a ULID-style booking ID: a 48 bit millisecond timestamp followed by 20 random bits
+
+    Args:
+        now (float, optional): Unix time in seconds. Defaults to the current time.
+    """
+    millis = int((time.time() if now is None else now) * 1000)
+    return _encode(millis, TIME_LENGTH) + _encode(secrets.randbits(5 * RANDOM_LENGTH), RANDOM_LENGTH)
+
+
+def booking_id_time(booking_id):
+    """
+    Return the Unix time in seconds encoded in a booking ID
+    """
+    millis = 0
+    for char in booking_id[:TIME_LENGTH]:
+        millis = millis * 32 + ALPHABET.index(char)
+    return millis / 1000
+
+
+def booking_id_bound(timestamp):
+    """
+    Return the smallest booking ID generated at or after `timestamp`, for range queries
+    """
+    return _encode(int(timestamp * 1000), TIME_LENGTH)
@@ -0,0 +1,134 @@
+import os
+from datetime import date as Date, timedelta
+from connection import get_client, serialize, deserialize, name_key
+from expiry import WORKING_DAYS_RETENTION, day_expires_at
+
+LEDGER_TABLE_NAME = os.environ.get('LEDGER_TABLE_NAME', 'steakhouse_time_off_ledger')
+LEDGER_DAY_INDEX = os.environ.get('LEDGER_DAY_INDEX', 'day-index')
+# A transaction holds at most 100 items, one of which is the booking itself
+MAX_TIME_OFF_DAYS = 90
+
+
+def time_off_days(start_date, end_date):
+    """
+    Return the ISO days from `start_date` to `end_date`, both included
+    """
+    start, end = Date.fromisoformat(start_date), Date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError('The end date of the time off is before its start date')
+    if (end - start).days >= MAX_TIME_OFF_DAYS:
+        raise ValueError(f'Time off can span at most {MAX_TIME_OFF_DAYS} days, please split it up')
+    return [(start + timedelta(days=day)).isoformat() for day in range((end - start).days + 1)]
+
+
+# Ledger days outlive their day only briefly, so a past booking may find some of its days
+# removed by TTL; releasing or relabelling them then succeeds all the same
+OWN_OR_EXPIRED = 'attribute_not_exists(staff_key) OR booking_id = :booking_id'
+
+
+def _ledger_item(staff_name, day, booking_id, reason):
+    return serialize({'staff_key': name_key(staff_name), 'day': day, 'staff_name': staff_name,
+                      'booking_id': booking_id, 'reason': reason,
+                      'expires_at': day_expires_at(day, WORKING_DAYS_RETENTION)})
+
+
+def hold_days(staff_name, days, booking_id, reason):
+    """
+    Transaction items that mark a staff member as off on each of `days`, failing on overlaps
+    """
+    return [{'Put': {
+        'TableName': LEDGER_TABLE_NAME,
+        'Item': _ledger_item(staff_name, day, booking_id, reason),
+        'ConditionExpression': 'attribute_not_exists(staff_key)',
+    }} for day in days]
+
+
+def release_days(staff_name, days, booking_id):
+    """
+    Transaction items that remove the ledger days of one time off booking
+    """
+    return [{'Delete': {
+        'TableName': LEDGER_TABLE_NAME,
+        'Key': serialize({'staff_key': name_key(staff_name), 'day': day}),
+        'ConditionExpression': OWN_OR_EXPIRED,
+        'ExpressionAttributeValues': serialize({':booking_id': booking_id}),
+    }} for day in days]
+
+
+def relabel_days(staff_name, days, booking_id, reason):
+    """
+    Transaction items that change the reason shown on ledger days a time off booking keeps
+    """
+    return [{'Put': {
+        'TableName': LEDGER_TABLE_NAME,
+        'Item': _ledger_item(staff_name, day, booking_id, reason),
+        'ConditionExpression': OWN_OR_EXPIRED,
+        'ExpressionAttributeValues': serialize({':booking_id': booking_id}),
+    }} for day in days]
+
+
+def merge_day_writes(writes):
+    """
+    One transaction item for several writes to the same ledger day, e.g. from a time off
+    released and another taking its day in one batch
+
+    It makes the last write, on the condition of the first, which expects the day as it
+    was before the batch. Raises ValueError when two of the writes hold the day.
+    """
+    holder = None
+    for write in writes:
+        action, body = next(iter(write.items()))
+        booking_id = body['Item']['booking_id']['S'] if action == 'Put' else None
+        if holder is not None:
+            # After an earlier write of the batch, only the booking holding the day may change it
+            own = deserialize(body.get('ExpressionAttributeValues', {})).get(':booking_id')
+            if holder and holder != own:
+                raise ValueError('The time off overlaps time off already booked')
+        holder = booking_id or ''
+    first = next(iter(writes[0].values()))
+    action, body = next(iter(writes[-1].items()))
+    merged = {name: value for name, value in body.items()
+              if name not in ('ConditionExpression', 'ExpressionAttributeValues')}
+    merged['ConditionExpression'] = first['ConditionExpression']
+    if 'ExpressionAttributeValues' in first:
+        merged['ExpressionAttributeValues'] = first['ExpressionAttributeValues']
+    return {action: merged}
+
+
+def _query(request):
+    items = []
+    while True:
+        response = get_client().query(**request)
+        items.extend(deserialize(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def days_off_between(staff_name, start_date, end_date):
+    """
+    Return the ledger entries of a staff member between two ISO dates, both included
+    """
+    return _query({
+        'TableName': LEDGER_TABLE_NAME,
+        'KeyConditionExpression': 'staff_key = :staff AND #day BETWEEN :start AND :end',
+        'ProjectionExpression': '#day, booking_id, reason',
+        'ExpressionAttributeNames': {'#day': 'day'},
+        'ExpressionAttributeValues': serialize({':staff': name_key(staff_name), ':start': start_date,
+                                                ':end': end_date}),
+        'ConsistentRead': True,
+    })
+
+
+def staff_off_on(day):
+    """
+    Return the ledger entries of every staff member off on an ISO date
+    """
+    return _query({
+        'TableName': LEDGER_TABLE_NAME,
+        'IndexName': LEDGER_DAY_INDEX,
+        'KeyConditionExpression': '#day = :day',
+        'ProjectionExpression': 'staff_name, booking_id, reason',
+        'ExpressionAttributeNames': {'#day': 'day'},
+        'ExpressionAttributeValues': serialize({':day': day}),
+    })
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+# Customer and staff names, and their normalised lookup keys, never reach the logs in clear
+REDACTED_FIELDS = frozenset(['name', 'staff_name', 'name_key', 'staff_name_key', 'staff_key'])
+
+
+def redact(value):
+    """
+    Replace customer names with a short digest, recursively, so log lines stay correlatable
+    """
+    if isinstance(value, dict):
+        return {key: _digest(item) if key in REDACTED_FIELDS and isinstance(item, str) else redact(item)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def _digest(text):
+    return 'redacted:' + hashlib.sha256(text.encode()).hexdigest()[:8]
+
+
+class _Invocation(threading.local):
+    context = {}
+    sampled = True
+
+
+class Logger:
+    """
+    JSON lines logger with per-invocation sampling
+
+    Warnings and errors are always written. Info and debug lines are only written for the
+    sampled share of invocations, set per function with `sample_rates`.
+    """
+
+    def __init__(self, level='INFO', sample_rate=1.0, sample_rates=None, stream=None, rng=random.random):
+        self.level = LEVELS.get(str(level).upper(), LEVELS['INFO'])
+        self.sample_rate = sample_rate
+        self.sample_rates = sample_rates or {}
+        self.stream = stream
+        self.rng = rng
+        # Per thread, so concurrent invocations in one process keep their own context
+        self.invocation = _Invocation()
+
+    def start(self, function, request_id=None):
+        """
+        Begin an invocation: reset the context and decide whether it is sampled
+        """
+        context = {'function': function}
+        if request_id:
+            context['request_id'] = request_id
+        self.invocation.context = context
+        self.invocation.sampled = self.rng() < self.sample_rates.get(function, self.sample_rate)
+
+    def enabled(self, level):
+        level = LEVELS[level]
+        return level >= self.level and (self.invocation.sampled or level >= LEVELS['WARNING'])
+
+    def log(self, level, message, **fields):
+        if not self.enabled(level):
+            return
+        record = {'timestamp': round(time.time(), 3), 'level': level, 'message': message}
+        record.update(self.invocation.context)
+        record.update(redact(fields))
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(record, default=str, separators=(',', ':')) + '\n')
+
+    def debug(self, message, **fields):
+        self.log('DEBUG', message, **fields)
+
+    def info(self, message, **fields):
+        self.log('INFO', message, **fields)
+
+    def warning(self, message, **fields):
+        self.log('WARNING', message, **fields)
+
+    def error(self, message, **fields):
+        self.log('ERROR', message, **fields)
+
+
+logger = Logger(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    sample_rate=float(os.environ.get('LOG_SAMPLE_RATE', '1')),
+    sample_rates=json.loads(os.environ.get('LOG_SAMPLE_RATES', '{}'))
+)
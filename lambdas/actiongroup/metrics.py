@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Steakhouse/ActionGroups')
+DIMENSIONS = ['actionGroup', 'function']
+
+UNITS = {
+    'HandlerDuration': 'Milliseconds',
+    'DynamoDBLatency': 'Milliseconds',
+    'DynamoDBCalls': 'Count',
+    'ConsumedCapacity': 'Count',
+    'CacheHits': 'Count',
+    'CacheMisses': 'Count',
+}
+
+
+class _Invocation(threading.local):
+    dimensions = {}
+    values = None
+
+
+class Metrics:
+    """
+    Per-invocation metrics, written as one CloudWatch Embedded Metric Format line
+
+    With a `sink` list the records are appended to it instead of being printed,
+    which lets tests assert on them.
+    """
+
+    def __init__(self, namespace=METRICS_NAMESPACE, stream=None, sink=None):
+        self.namespace = namespace
+        self.stream = stream
+        self.sink = sink
+        # Per thread, so concurrent invocations in one process keep their own metrics
+        self.invocation = _Invocation()
+
+    def start(self, action_group, function):
+        self.invocation.dimensions = {'actionGroup': action_group, 'function': function}
+        self.invocation.values = {}
+
+    def add(self, name, value):
+        """
+        Add to a metric of the current invocation
+        """
+        values = self.invocation.values
+        if values is not None:
+            values[name] = values.get(name, 0) + value
+
+    def flush(self):
+        """
+        Emit the metrics of the current invocation, then reset them
+        """
+        dimensions, values = self.invocation.dimensions, self.invocation.values
+        if not dimensions:
+            return None
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [DIMENSIONS],
+                    'Metrics': [{'Name': name, 'Unit': UNITS.get(name, 'None')} for name in values],
+                }],
+            },
+        }
+        record.update(dimensions)
+        record.update({name: round(value, 3) for name, value in values.items()})
+        if self.sink is not None:
+            self.sink.append(record)
+        else:
+            (self.stream or sys.stdout).write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.invocation.dimensions, self.invocation.values = {}, None
+        return record
+
+    @contextmanager
+    def capture(self):
+        """
+        Collect the emitted records in a list instead of printing them
+        """
+        previous, self.sink = self.sink, []
+        try:
+            yield self.sink
+        finally:
+            self.sink = previous
+
+
+def _request_capacity(params, model, **kwargs):
+    if 'ReturnConsumedCapacity' in model.input_shape.members:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _before_call(context, **kwargs):
+    context['metrics_started'] = time.perf_counter()
+
+
+def _after_call(parsed, context, **kwargs):
+    started = context.get('metrics_started')
+    if started is not None:
+        metrics.add('DynamoDBLatency', (time.perf_counter() - started) * 1000)
+    metrics.add('DynamoDBCalls', 1)
+    capacity = parsed.get('ConsumedCapacity')
+    if capacity:
+        entries = capacity if isinstance(capacity, list) else [capacity]
+        metrics.add('ConsumedCapacity', sum(entry.get('CapacityUnits', 0) for entry in entries))
+
+
+def instrument(client):
+    """
+    Have a DynamoDB client request its consumed capacity and record latency and capacity of each call
+    """
+    events = client.meta.events
+    events.register('provide-client-params.dynamodb', _request_capacity)
+    events.register('before-call.dynamodb', _before_call)
+    events.register('after-call.dynamodb', _after_call)
+    return client
+
+
+metrics = Metrics()
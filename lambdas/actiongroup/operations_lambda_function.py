@@ -0,0 +1,200 @@
+import os
+import hr_lambda_function as hr
+import reservation_lambda_function as reservation
+import shortlet_lambda_function as shortlet
+import ticket_lambda_function as ticket
+from availability import AVAILABILITY_TABLE_NAME, CapacityError, net_holds
+from cache import booking_cache
+from connection import get_client
+from decoders import DECODERS, ParameterError
+from helper import TRANSACT_ITEMS_LIMIT, delete_booking_items, new_booking_items, update_booking_items
+from dispatcher import action, dispatch
+from ledger import LEDGER_TABLE_NAME, merge_day_writes
+
+ACTION_GROUP = os.environ.get('OPERATIONS_ACTION_GROUP_NAME', 'BookingOperationsActionGroup')
+ACTIONS = ('create', 'update', 'delete')
+
+# booking_type -> (builder of new bookings, holds mover on update, holds releaser on delete)
+BOOKING_TYPES = {
+    reservation.BOOKING_TYPE: (reservation.new_reservation, reservation.move_covers, reservation.release_covers),
+    shortlet.BOOKING_TYPE: (shortlet.new_shortlet, shortlet.move_nights, shortlet.release_nights),
+    hr.BOOKING_TYPE: (hr.new_time_off, hr.move_ledger_days, hr.release_ledger_days),
+    ticket.BOOKING_TYPE: (ticket.new_ticket, None, None),
+}
+# Key attributes of the tables holding availability, to find the holds of several operations on one item
+HOLD_KEYS = {AVAILABILITY_TABLE_NAME: ('slot_id',), LEDGER_TABLE_NAME: ('staff_key', 'day')}
+
+
+class OperationError(Exception):
+    """
+    Raised when one operation of a batch cannot be applied, so none of them are
+    """
+
+    def __init__(self, index, operation, message):
+        super().__init__(f"Operation {index + 1} ({operation.get('action')} {operation.get('booking_type')}): "
+                         f"{message}")
+
+
+def decode_operation(index, operation):
+    """
+    Check an operation and decode its fields against the schema of the matching function,
+    e.g. an update of a reservation against update_reservation_booking
+    """
+    if not isinstance(operation, dict):
+        raise OperationError(index, {}, 'expected an object with action and booking_type')
+    if operation.get('action') not in ACTIONS:
+        raise OperationError(index, operation, f"action must be one of {', '.join(ACTIONS)}")
+    if operation.get('booking_type') not in BOOKING_TYPES:
+        raise OperationError(index, operation, f"booking_type must be one of {', '.join(BOOKING_TYPES)}")
+    decoder = DECODERS[f"{operation['action']}_{operation['booking_type']}_booking"]
+    try:
+        return decoder([{'name': name, 'value': value} for name, value in operation.items()])
+    except ParameterError as e:
+        raise OperationError(index, operation, str(e))
+
+
+def check_bookings(operations, decoded):
+    """
+    Reject two operations on the same booking, which a transaction cannot apply in turn
+    """
+    changed = {}
+    for index, (operation, params) in enumerate(zip(operations, decoded)):
+        booking_id = params.get('booking_id')
+        if booking_id in changed:
+            raise OperationError(index, operation, f'booking {booking_id} is already changed by operation '
+                                                   f'{changed[booking_id] + 1}, please combine them into one')
+        if booking_id:
+            changed[booking_id] = index
+
+
+def _hold_key(write):
+    body = next(iter(write.values()))
+    key = body.get('Key') or body['Item']
+    return (body['TableName'],) + tuple(key[name]['S'] for name in HOLD_KEYS[body['TableName']])
+
+
+def merge_holds(operations, holds):
+    """
+    Merge the holds of all operations into one transaction item per availability slot or
+    ledger day, since a transaction may not touch an item twice
+
+    Args:
+        operations (list): The operations of the batch
+        holds (list): (operation index, transaction item) pairs, in the order of the operations
+
+    Returns:
+        (operation index, transaction item) pairs; a merged item belongs to the last operation
+        touching it
+    """
+    groups = {}
+    for index, write in holds:
+        groups.setdefault(_hold_key(write), []).append((index, write))
+    merged = []
+    for key, group in groups.items():
+        indexes, writes = zip(*group)
+        if len(writes) == 1:
+            merged.append(group[0])
+            continue
+        try:
+            write = net_holds(writes) if key[0] == AVAILABILITY_TABLE_NAME else merge_day_writes(writes)
+        except (ValueError, CapacityError) as e:
+            raise OperationError(indexes[-1], operations[indexes[-1]], str(e))
+        if write:
+            merged.append((indexes[-1], write))
+    return merged
+
+
+def plan(operation, params):
+    """
+    Build the transaction items of one decoded operation
+
+    Returns:
+        The result to report for it, the booking written or None, and its transaction items
+    """
+    new, reholds, releases = BOOKING_TYPES[operation['booking_type']]
+    booking_type = operation['booking_type']
+    if operation['action'] == 'create':
+        booking, items = new_booking_items(booking_type, *new(**params))
+        return {'booking_id': booking['booking_id']}, booking, items
+    booking_id = params.pop('booking_id')
+    if operation['action'] == 'update':
+        changed, items = update_booking_items(booking_id, booking_type, params, reholds)
+        return {'booking_id': booking_id, 'updated': changed}, None, items
+    items = delete_booking_items(booking_id, booking_type, releases)
+    return {'booking_id': booking_id, 'message': f'Booking with ID {booking_id} deleted successfully'}, None, items
+
+
+def apply_booking_operations(operations, max_attempts=3):
+    """
+    Apply an ordered list of create, update and delete operations across booking types,
+    all in one transaction: either every operation is applied or none is
+
+    Args:
+        operations (list): Operations such as {"action": "update", "booking_type": "reservation",
+            "booking_id": "...", "time": "20:00"}; their fields are those of the matching function
+        max_attempts (int, optional): Attempts when a booking changes concurrently. Defaults to 3.
+    """
+    try:
+        if not operations:
+            raise ValueError('No operations to apply')
+        decoded = [decode_operation(index, operation) for index, operation in enumerate(operations)]
+        check_bookings(operations, decoded)
+        client = get_client()
+        for _ in range(max_attempts):
+            results, created, items, owners, holds = [], [], [], [], []
+            for index, (operation, params) in enumerate(zip(operations, decoded)):
+                try:
+                    result, booking, writes = plan(operation, dict(params))
+                except (LookupError, ValueError, CapacityError) as e:
+                    raise OperationError(index, operation, str(e))
+                results.append(dict(result, action=operation['action']))
+                created += [booking] if booking else []
+                # The booking itself comes first, then its holds
+                items += writes[:1]
+                owners += [(index, True)] * len(writes[:1])
+                holds += [(index, write) for write in writes[1:]]
+            for index, write in merge_holds(operations, holds):
+                items.append(write)
+                owners.append((index, False))
+            if len(items) > TRANSACT_ITEMS_LIMIT:
+                raise ValueError(f'These operations write {len(items)} items, at most {TRANSACT_ITEMS_LIMIT} '
+                                 f'can be written at once, please split them up')
+
+            try:
+                if items:
+                    client.transact_write_items(TransactItems=items)
+            except client.exceptions.TransactionCanceledException as e:
+                reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+                failed = next((position for position, code in enumerate(reasons)
+                               if code not in (None, 'None')), None)
+                if failed is None or reasons[failed] != 'ConditionalCheckFailed':
+                    raise
+                index, is_booking = owners[failed]
+                operation = operations[index]
+                # A booking changed since it was read, or a fresh booking ID was taken: plan again
+                if is_booking or operation['action'] == 'delete':
+                    continue
+                if operation['booking_type'] == hr.BOOKING_TYPE:
+                    raise OperationError(index, operation, 'The time off overlaps time off already booked')
+                raise OperationError(index, operation, 'Not enough availability for this booking')
+            except client.exceptions.ClientError as e:
+                if e.response['Error']['Code'] != 'ValidationException':
+                    raise
+                raise ValueError(f"These operations cannot be applied together: {e.response['Error']['Message']}")
+
+            for result in results:
+                booking_cache.invalidate(result['booking_id'])
+            for booking in created:
+                booking_cache.put(booking['booking_id'], booking)
+            return {'results': results}
+        raise RuntimeError('The bookings kept changing while applying the operations, please try again')
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@action(ACTION_GROUP, 'apply_booking_operations')
+def apply_booking_operations_action(params):
+    return apply_booking_operations(params['operations'])
+
+
+lambda_handler = dispatch
@@ -1,10 +1,35 @@
-import json
-import uuid
-import boto3
-from  helper import get_named_parameter, get_booking_details
+import os
+from availability import SLOT_CAPACITY, get_booked, move_holds, release, reservation_slot, reserve
+from connection import NAME_INDEX, name_key
+from helper import create_booking, delete_booking, get_booking_details, get_bookings, list_bookings, update_booking
+from dispatcher import action, dispatch
+
+ACTION_GROUP = os.environ.get('RESERVATION_ACTION_GROUP_NAME', 'ReservationBookingsActionGroup')
+BOOKING_TYPE = 'reservation'
+LISTED_ATTRIBUTES = ['date', 'time', 'num_guests', 'desired_food']
+# Changing these moves the covers held by the booking
+HELD_ATTRIBUTES = ('date', 'time', 'num_guests')
+
+
+def new_reservation(date, name, time, num_guests, desired_food=None):
+    """
+    The item of a new reservation booking and the covers it holds
+    """
+    item = {
+        'date': date,
+        'name': name,
+        'time': time,
+        'num_guests': num_guests,
+    }
+
+    # Only add desired_food if it's not None or empty
+    if desired_food:
+        item['desired_food'] = desired_food
+
+    # Hold the covers in the same transaction as the booking
+    item['slot_id'] = reservation_slot(date, time)
+    return item, [reserve(item['slot_id'], num_guests, SLOT_CAPACITY)]
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('steakhouse_bookings')
 
 def create_reservation_booking(date, name, time, num_guests, desired_food=None):
     """
@@ -18,26 +43,21 @@ def create_reservation_booking(date, name, time, num_guests, desired_food=None):
         num_guests (integer): The number of guests for the booking
     """
     try:
-        booking_id = str(uuid.uuid4())[:8]
-        item = {
-            'booking_id': booking_id,
-            'date': date,
-            'name': name,
-            'time': time,
-            'num_guests': num_guests,
-        }
-
-        # Only add desired_food if it's not None or empty
-        if desired_food:
-            item['desired_food'] = desired_food
-        
-        table.put_item(Item=item)
-
-        return {'booking_id': booking_id}
+        item, holds = new_reservation(date, name, time, num_guests, desired_food)
+        return {'booking_id': create_booking(BOOKING_TYPE, item, holds)}
     except Exception as e:
         return {'error': str(e)}
 
 
+def release_covers(booking):
+    """
+    Availability updates that give back the covers held by a reservation booking
+    """
+    if 'slot_id' not in booking:
+        return []
+    return [release(booking['slot_id'], int(booking['num_guests']))]
+
+
 def delete_reservation_booking(booking_id):
     """
     Delete an existing steakhouse reservation booking
@@ -46,64 +66,97 @@ def delete_reservation_booking(booking_id):
         booking_id (str): The ID of the booking to delete
     """
     try:
-        response = table.delete_item(Key={'booking_id': booking_id})
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return {'message': f'Booking with ID {booking_id} deleted successfully'}
-        else:
-            return {'message': f'Failed to delete booking with ID {booking_id}'}
+        delete_booking(booking_id, BOOKING_TYPE, releases=release_covers)
+        return {'message': f'Booking with ID {booking_id} deleted successfully'}
     except Exception as e:
         return {'error': str(e)}
 
 
-def lambda_handler(event, context):
-    # get the action group used during the invocation of the lambda function
-    actionGroup = event.get('actionGroup', '')
-
-    # name of the function that should be invoked
-    function = event.get('function', '')
-
-    if function == 'get_reservation_booking_details':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(get_booking_details(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    elif function == 'create_reservation_booking':
-        date = get_named_parameter(event, "date")
-        name = get_named_parameter(event, "name")
-        time = get_named_parameter(event, "time")
-        num_guests = get_named_parameter(event, "num_guests")
-        desired_food = get_named_parameter(event, "desired_food") or ""
-
-        if date and name and time and num_guests:
-            response = str(create_reservation_booking(date, name, time, num_guests, desired_food))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing required parameters'}}
-
-    elif function == 'delete_reservation_booking':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(delete_reservation_booking(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    else:
-        responseBody = {'TEXT': {'body': 'Invalid function'}}
-
-    action_response = {
-        'actionGroup': actionGroup,
-        'function': function,
-        'functionResponse': {
-            'responseBody': responseBody
-        }
-    }
+def move_covers(booking, updated):
+    """
+    Move the covers of a reservation booking to its new time slot and party size
+    """
+    slot = reservation_slot(updated['date'], updated['time'])
+    held = {booking['slot_id']: int(booking['num_guests'])} if 'slot_id' in booking else {}
+    return {'slot_id': slot}, move_holds(held, {slot: int(updated['num_guests'])}, SLOT_CAPACITY)
+
+
+def update_reservation_booking(booking_id, date=None, time=None, num_guests=None, desired_food=None):
+    """
+    Change an existing steakhouse reservation booking
+
+    Args:
+        booking_id (str): The ID of the booking to change
+        date (string, optional): The new date of the booking. Defaults to None.
+        time (string, optional): The new time of the booking. Defaults to None.
+        num_guests (integer, optional): The new number of guests. Defaults to None.
+        desired_food (string, optional): The new menu/desserts/special. Defaults to None.
+    """
+    try:
+        changes = {'date': date, 'time': time, 'num_guests': num_guests, 'desired_food': desired_food}
+        updated = update_booking(booking_id, BOOKING_TYPE, changes, reholds=move_covers, held=HELD_ATTRIBUTES)
+        return {'booking_id': booking_id, 'updated': updated}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def check_reservation_availability(date, time, num_guests=None):
+    """
+    Check how many covers are still free in the time slot of a reservation
+
+    Args:
+        date (string): The date of the booking
+        time (string): The time of the booking
+        num_guests (integer, optional): The party size to check for. Defaults to None.
+    """
+    try:
+        slot = reservation_slot(date, time)
+        available = max(SLOT_CAPACITY - get_booked([slot])[slot], 0)
+        result = {'date': date, 'slot': slot.rsplit('#', 1)[1], 'available_covers': available}
+        if num_guests is not None:
+            result['available'] = num_guests <= available
+        return result
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@action(ACTION_GROUP, 'get_reservation_booking_details')
+def get_reservation_booking_details(params):
+    return get_booking_details(params['booking_id'])
+
+
+@action(ACTION_GROUP, 'get_reservation_bookings')
+def get_reservation_bookings(params):
+    return get_bookings(params['booking_ids'])
+
+
+@action(ACTION_GROUP, 'list_reservation_bookings_by_name')
+def list_reservation_bookings_by_name(params):
+    return list_bookings(NAME_INDEX, 'name_key', name_key(params['name']), LISTED_ATTRIBUTES,
+                         booking_type=BOOKING_TYPE,
+                         limit=params.get('limit', 10), next_token=params.get('next_token'))
+
+
+@action(ACTION_GROUP, 'create_reservation_booking', idempotent=True)
+def create_reservation_booking_action(params):
+    return create_reservation_booking(params['date'], params['name'], params['time'],
+                                      params['num_guests'], params.get('desired_food') or "")
+
+
+@action(ACTION_GROUP, 'check_reservation_availability')
+def check_reservation_availability_action(params):
+    return check_reservation_availability(params['date'], params['time'], params.get('num_guests'))
+
+
+@action(ACTION_GROUP, 'update_reservation_booking')
+def update_reservation_booking_action(params):
+    return update_reservation_booking(params['booking_id'], params.get('date'), params.get('time'),
+                                      params.get('num_guests'), params.get('desired_food'))
+
+
+@action(ACTION_GROUP, 'delete_reservation_booking')
+def delete_reservation_booking_action(params):
+    return delete_reservation_booking(params['booking_id'])
 
-    function_response = {'response': action_response,
-                         'messageVersion': event.get('messageVersion', '1.0')}
-    print("Response: {}".format(function_response))
 
-    return function_response
+lambda_handler = dispatch
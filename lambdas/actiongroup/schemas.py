@@ -0,0 +1,17 @@
+import json
+import os
+
+SCHEMAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'function_schemas.json')
+
+
+def load_function_schemas(path=SCHEMAS_PATH):
+    """
+    Load the function schemas shared with the CDK stack, keyed by function name
+    """
+    with open(path, 'r') as schemas_file:
+        schemas = json.load(schemas_file)
+    return {function['name']: function for functions in schemas.values() for function in functions}
+
+
+# Read once per container, at cold start
+FUNCTION_SCHEMAS = load_function_schemas()
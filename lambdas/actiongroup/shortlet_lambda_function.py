@@ -1,10 +1,33 @@
-import json
-import uuid
-import boto3
-from  helper import get_named_parameter, get_booking_details
+import os
+from availability import get_booked, move_holds, release, reserve, shortlet_nights, shortlet_units
+from connection import NAME_INDEX, name_key
+from helper import create_booking, delete_booking, get_booking_details, get_bookings, list_bookings, update_booking
+from dispatcher import action, dispatch
+
+ACTION_GROUP = os.environ.get('SHORTLET_ACTION_GROUP_NAME', 'ShortletBookingsActionGroup')
+BOOKING_TYPE = 'shortlet'
+LISTED_ATTRIBUTES = ['date', 'number_days', 'shortlet_type', 'num_guests']
+# Changing these moves the nights held by the booking
+HELD_ATTRIBUTES = ('date', 'number_days', 'shortlet_type')
+
+
+def new_shortlet(name, date, number_days, shortlet_type, num_guests):
+    """
+    The item of a new shortlet booking and the nights it holds
+    """
+    item = {
+        'name': name,
+        'date': date,
+        'number_days': number_days,
+        'shortlet_type': shortlet_type,
+        'num_guests': num_guests
+    }
+
+    # Hold every night of the stay in the same transaction as the booking
+    item['slot_ids'] = shortlet_nights(shortlet_type, date, number_days)
+    units = shortlet_units(shortlet_type)
+    return item, [reserve(slot, 1, units) for slot in item['slot_ids']]
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('steakhouse_bookings')
 
 def create_shortlet_booking(name, date, number_days, shortlet_type, num_guests):
     """
@@ -18,23 +41,19 @@ def create_shortlet_booking(name, date, number_days, shortlet_type, num_guests):
         num_guests (integer): Number of guest
     """
     try:
-        booking_id = str(uuid.uuid4())[:8]
-        item = {
-            'booking_id': booking_id,
-            'name': name,
-            'date': date,
-            'number_days': number_days,
-            'shortlet_type': shortlet_type,
-            'num_guests': num_guests
-        }
-
-        table.put_item(Item=item)
-
-        return {'booking_id': booking_id}
+        item, holds = new_shortlet(name, date, number_days, shortlet_type, num_guests)
+        return {'booking_id': create_booking(BOOKING_TYPE, item, holds)}
     except Exception as e:
         return {'error': str(e)}
 
 
+def release_nights(booking):
+    """
+    Availability updates that free the nights held by a shortlet booking
+    """
+    return [release(slot, 1) for slot in booking.get('slot_ids', [])]
+
+
 def delete_shortlet_booking(booking_id):
     """
     Delete an existing steakhouse shortlet booking
@@ -43,64 +62,98 @@ def delete_shortlet_booking(booking_id):
         booking_id (str): The ID of the booking to delete
     """
     try:
-        response = table.delete_item(Key={'booking_id': booking_id})
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return {'message': f'Booking with ID {booking_id} deleted successfully'}
-        else:
-            return {'message': f'Failed to delete booking with ID {booking_id}'}
+        delete_booking(booking_id, BOOKING_TYPE, releases=release_nights)
+        return {'message': f'Booking with ID {booking_id} deleted successfully'}
     except Exception as e:
         return {'error': str(e)}
 
 
-def lambda_handler(event, context):
-    # get the action group used during the invocation of the lambda function
-    actionGroup = event.get('actionGroup', '')
-
-    # name of the function that should be invoked
-    function = event.get('function', '')
-
-    if function == 'get_shortlet_booking_details':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(get_booking_details(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    elif function == 'create_shortlet_booking':
-        name = get_named_parameter(event, "name")
-        date = get_named_parameter(event, "date")
-        number_days = get_named_parameter(event, "number_days")
-        shortlet_type = get_named_parameter(event, "shortlet_type")
-        num_guests = get_named_parameter(event, "num_guests")
-
-        if name and date and number_days and shortlet_type and num_guests:
-            response = str(create_shortlet_booking(name, date, number_days, shortlet_type, num_guests))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing required parameters'}}
-
-    elif function == 'delete_shortlet_booking':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(delete_shortlet_booking(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    else:
-        responseBody = {'TEXT': {'body': 'Invalid function'}}
-
-    action_response = {
-        'actionGroup': actionGroup,
-        'function': function,
-        'functionResponse': {
-            'responseBody': responseBody
-        }
-    }
+def move_nights(booking, updated):
+    """
+    Move the nights held by a shortlet booking to its new stay and apartment type
+    """
+    nights = shortlet_nights(updated['shortlet_type'], updated['date'], int(updated['number_days']))
+    held = dict.fromkeys(booking.get('slot_ids', []), 1)
+    return {'slot_ids': nights}, move_holds(held, dict.fromkeys(nights, 1), shortlet_units(updated['shortlet_type']))
+
+
+def update_shortlet_booking(booking_id, date=None, number_days=None, shortlet_type=None, num_guests=None):
+    """
+    Change an existing steakhouse shortlet booking
+
+    Args:
+        booking_id (str): The ID of the booking to change
+        date (string, optional): The new check in date. Defaults to None.
+        number_days (integer, optional): The new number of days to stay. Defaults to None.
+        shortlet_type (string, optional): The new Shortlet apartment type. Defaults to None.
+        num_guests (integer, optional): The new number of guests. Defaults to None.
+    """
+    try:
+        changes = {'date': date, 'number_days': number_days, 'shortlet_type': shortlet_type,
+                   'num_guests': num_guests}
+        updated = update_booking(booking_id, BOOKING_TYPE, changes, reholds=move_nights, held=HELD_ATTRIBUTES)
+        return {'booking_id': booking_id, 'updated': updated}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def check_shortlet_availability(shortlet_type, date, number_days):
+    """
+    Check whether a shortlet apartment type is free for every night of a stay
+
+    Args:
+        shortlet_type (string): The Shortlet apartment type
+        date (string): The check in date
+        number_days (integer): The number of days to stay
+    """
+    try:
+        nights = shortlet_nights(shortlet_type, date, number_days)
+        units = shortlet_units(shortlet_type)
+        booked = get_booked(nights)
+        unavailable = [slot.rsplit('#', 1)[1] for slot in nights if booked[slot] >= units]
+        return {'shortlet_type': shortlet_type, 'date': date, 'number_days': number_days,
+                'available': not unavailable, 'unavailable_nights': unavailable}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+@action(ACTION_GROUP, 'get_shortlet_booking_details')
+def get_shortlet_booking_details(params):
+    return get_booking_details(params['booking_id'])
+
+
+@action(ACTION_GROUP, 'get_shortlet_bookings')
+def get_shortlet_bookings(params):
+    return get_bookings(params['booking_ids'])
+
+
+@action(ACTION_GROUP, 'list_shortlet_bookings_by_name')
+def list_shortlet_bookings_by_name(params):
+    return list_bookings(NAME_INDEX, 'name_key', name_key(params['name']), LISTED_ATTRIBUTES,
+                         booking_type=BOOKING_TYPE,
+                         limit=params.get('limit', 10), next_token=params.get('next_token'))
+
+
+@action(ACTION_GROUP, 'create_shortlet_booking', idempotent=True)
+def create_shortlet_booking_action(params):
+    return create_shortlet_booking(params['name'], params['date'], params['number_days'],
+                                   params['shortlet_type'], params['num_guests'])
+
+
+@action(ACTION_GROUP, 'check_shortlet_availability')
+def check_shortlet_availability_action(params):
+    return check_shortlet_availability(params['shortlet_type'], params['date'], params['number_days'])
+
+
+@action(ACTION_GROUP, 'update_shortlet_booking')
+def update_shortlet_booking_action(params):
+    return update_shortlet_booking(params['booking_id'], params.get('date'), params.get('number_days'),
+                                   params.get('shortlet_type'), params.get('num_guests'))
+
+
+@action(ACTION_GROUP, 'delete_shortlet_booking')
+def delete_shortlet_booking_action(params):
+    return delete_shortlet_booking(params['booking_id'])
 
-    function_response = {'response': action_response,
-                         'messageVersion': event.get('messageVersion', '1.0')}
-    print("Response: {}".format(function_response))
 
-    return function_response
+lambda_handler = dispatch
@@ -1,11 +1,25 @@
-import json
 from datetime import datetime
-import uuid
-import boto3
-from  helper import get_named_parameter, get_booking_details
+import os
+from connection import NAME_INDEX, name_key
+from helper import create_booking, delete_booking, get_booking_details, get_bookings, list_bookings, update_booking
+from dispatcher import action, dispatch
+
+ACTION_GROUP = os.environ.get('TICKET_ACTION_GROUP_NAME', 'TicketBookingsActionGroup')
+BOOKING_TYPE = 'ticket'
+LISTED_ATTRIBUTES = ['creation_date', 'incident_date', 'reason']
+
+
+def new_ticket(name, incident_date, reason, creation_date=None):
+    """
+    The item of a new ticket, created today unless `creation_date` is given
+    """
+    return {
+        'name': name,
+        'creation_date': creation_date or datetime.today().strftime("%d/%m/%Y"),
+        'incident_date': incident_date,
+        'reason': reason
+    }, []
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('steakhouse_bookings')
 
 def create_ticket_booking(name, creation_date, incident_date, reason):
     """
@@ -18,18 +32,24 @@ def create_ticket_booking(name, creation_date, incident_date, reason):
         reason (string): The reason for raising a ticket
     """
     try:
-        booking_id = str(uuid.uuid4())[:8]
-        item = {
-            'booking_id': booking_id,
-            'name': name,
-            'creation_date': creation_date,
-            'incident_date': incident_date,
-            'reason': reason
-        }
-
-        table.put_item(Item=item)
-
-        return {'booking_id': booking_id}
+        item, _ = new_ticket(name, incident_date, reason, creation_date)
+        return {'booking_id': create_booking(BOOKING_TYPE, item)}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def update_ticket_booking(booking_id, incident_date=None, reason=None):
+    """
+    Change an existing steakhouse ticket booking
+
+    Args:
+        booking_id (str): The ID of the ticket to change
+        incident_date (string, optional): The new date of incident. Defaults to None.
+        reason (string, optional): The new reason for raising the ticket. Defaults to None.
+    """
+    try:
+        updated = update_booking(booking_id, BOOKING_TYPE, {'incident_date': incident_date, 'reason': reason})
+        return {'booking_id': booking_id, 'updated': updated}
     except Exception as e:
         return {'error': str(e)}
 
@@ -42,63 +62,43 @@ def delete_ticket_booking(booking_id):
         booking_id (str): The ID of the booking to delete
     """
     try:
-        response = table.delete_item(Key={'booking_id': booking_id})
-        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
-            return {'message': f'Booking with ID {booking_id} deleted successfully'}
-        else:
-            return {'message': f'Failed to delete booking with ID {booking_id}'}
+        delete_booking(booking_id, BOOKING_TYPE)
+        return {'message': f'Booking with ID {booking_id} deleted successfully'}
     except Exception as e:
         return {'error': str(e)}
 
 
-def lambda_handler(event, context):
-    # get the action group used during the invocation of the lambda function
-    actionGroup = event.get('actionGroup', '')
-
-    # name of the function that should be invoked
-    function = event.get('function', '')
-
-    if function == 'get_ticket_booking_details':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(get_booking_details(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    elif function == 'create_ticket_booking':
-        name = get_named_parameter(event, "name")
-        creation_date = datetime.today().strftime("%d/%m/%Y")
-        incident_date = get_named_parameter(event, "incident_date")
-        reason = get_named_parameter(event, "reason")
-        
-        if name and creation_date and incident_date and reason:
-            response = str(create_ticket_booking(name, creation_date, incident_date, reason))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing required parameters'}}
-
-    elif function == 'delete_ticket_booking':
-        booking_id = get_named_parameter(event, "booking_id")
-        if booking_id:
-            response = str(delete_ticket_booking(booking_id))
-            responseBody = {'TEXT': {'body': json.dumps(response)}}
-        else:
-            responseBody = {'TEXT': {'body': 'Missing booking_id parameter'}}
-
-    else:
-        responseBody = {'TEXT': {'body': 'Invalid function'}}
-
-    action_response = {
-        'actionGroup': actionGroup,
-        'function': function,
-        'functionResponse': {
-            'responseBody': responseBody
-        }
-    }
-
-    function_response = {'response': action_response,
-                         'messageVersion': event.get('messageVersion', '1.0')}
-    print("Response: {}".format(function_response))
-
-    return function_response
+@action(ACTION_GROUP, 'get_ticket_booking_details')
+def get_ticket_booking_details(params):
+    return get_booking_details(params['booking_id'])
+
+
+@action(ACTION_GROUP, 'get_ticket_bookings')
+def get_ticket_bookings(params):
+    return get_bookings(params['booking_ids'])
+
+
+@action(ACTION_GROUP, 'list_ticket_bookings_by_name')
+def list_ticket_bookings_by_name(params):
+    return list_bookings(NAME_INDEX, 'name_key', name_key(params['name']), LISTED_ATTRIBUTES,
+                         booking_type=BOOKING_TYPE,
+                         limit=params.get('limit', 10), next_token=params.get('next_token'))
+
+
+@action(ACTION_GROUP, 'create_ticket_booking', idempotent=True)
+def create_ticket_booking_action(params):
+    creation_date = datetime.today().strftime("%d/%m/%Y")
+    return create_ticket_booking(params['name'], creation_date, params['incident_date'], params['reason'])
+
+
+@action(ACTION_GROUP, 'update_ticket_booking')
+def update_ticket_booking_action(params):
+    return update_ticket_booking(params['booking_id'], params.get('incident_date'), params.get('reason'))
+
+
+@action(ACTION_GROUP, 'delete_ticket_booking')
+def delete_ticket_booking_action(params):
+    return delete_ticket_booking(params['booking_id'])
+
+
+lambda_handler = dispatch
@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+ARCHIVE_BUCKET = os.environ.get('ARCHIVE_BUCKET', '')
+ARCHIVE_PREFIX = os.environ.get('ARCHIVE_PREFIX', 'bookings')
+
+_s3 = None
+_deserializer = TypeDeserializer()
+
+
+def _client():
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client('s3')
+    return _s3
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def expired_bookings(records):
+    """
+    Yield the last image of each booking removed by DynamoDB TTL in a batch of stream records
+    """
+    for record in records:
+        identity = record.get('userIdentity') or {}
+        if record.get('eventName') != 'REMOVE' or identity.get('principalId') != 'dynamodb.amazonaws.com':
+            continue
+        image = record['dynamodb'].get('OldImage')
+        if image:
+            yield {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def handler(event: dict, context: dict):
+    """
+    This function archives the bookings expired from the bookings table, received as
+    a batch of DynamoDB stream records, as one gzipped JSON lines object in S3
+
+    Parameters
+    ----------
+    event : DynamoDB stream records
+    context : Extra event context
+    """
+    bookings = list(expired_bookings(event.get('Records', [])))
+    if not bookings:
+        return {'archived': 0}
+
+    lines = '\n'.join(json.dumps(booking, default=_default, separators=(',', ':')) for booking in bookings)
+    # Keys sort by expiry day; taking both from the first record keeps retried batches idempotent
+    first = event['Records'][0]['dynamodb']
+    expired = datetime.fromtimestamp(float(first.get('ApproximateCreationDateTime', time.time())), timezone.utc)
+    key = f"{ARCHIVE_PREFIX}/{expired:%Y/%m/%d}/{first.get('SequenceNumber', time.time_ns())}-{len(bookings)}.jsonl.gz"
+    _client().put_object(Bucket=ARCHIVE_BUCKET, Key=key, Body=gzip.compress(lines.encode() + b'\n'),
+                         ContentType='application/gzip')
+    print(json.dumps({'timestamp': round(time.time(), 3), 'level': 'INFO', 'message': 'Archived expired bookings',
+                      'key': key, 'count': len(bookings)}, separators=(',', ':')))
+    return {'archived': len(bookings), 'key': key}
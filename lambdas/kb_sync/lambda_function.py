@@ -1,7 +1,21 @@
 import os
+import json
+import time
 import boto3
 import hashlib
 
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+
+def log(level, message, **fields):
+    """
+    Write one JSON log line; debug lines only when LOG_LEVEL is DEBUG
+    """
+    if level == 'DEBUG' and LOG_LEVEL != 'DEBUG':
+        return
+    print(json.dumps(dict(timestamp=round(time.time(), 3), level=level, message=message, **fields),
+                     default=str, separators=(',', ':')))
+
 
 def handler(event: dict, context: dict):
     """
@@ -22,8 +36,9 @@ def handler(event: dict, context: dict):
                                dataSourceId=os.environ['DATA_SOURCE_ID'],
                                knowledgeBaseId=os.environ['KNOWLEDGE_BASE_ID'],
                                description='S3-originated data sync event')
-    # write the event details to the CloudWatch logs
-    print(event)
-    # print value of environment variable
-    print(os.environ['DATA_SOURCE_ID'])
-    print(os.environ['KNOWLEDGE_BASE_ID'])
+    # Log which objects triggered the sync rather than the whole S3 event
+    log('INFO', 'Ingestion job started',
+        knowledge_base_id=os.environ['KNOWLEDGE_BASE_ID'],
+        data_source_id=os.environ['DATA_SOURCE_ID'],
+        objects=[record['s3']['object']['key'] for record in event['Records']])
+    log('DEBUG', 'S3 event', event=event)
@@ -1,7 +1,13 @@
 import boto3
+import codecs
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import os
 import logging
+import threading
+import time
+from traces import TurnTimeline
+from usage import UsageAccumulator
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -15,69 +21,200 @@ except KeyError as e:
     logging.error(f"Missing required environment variable: {e}")
     raise
 
-def askQuestion(question, endSession=False, sessionId=""):
+# Trace events cost bandwidth and parsing on every turn; switch them off when nobody reads them
+TRACE_ENABLED = os.environ.get("BEDROCK_AGENT_TRACE", "true").lower() == "true"
+
+# Client tuning; one pooled client serves every Streamlit session of the task
+CLIENT_CONFIG = Config(
+    region_name=region,
+    # One connection per concurrent turn, so turns never wait for a free connection
+    max_pool_connections=int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+    connect_timeout=int(os.environ.get("BEDROCK_CONNECT_TIMEOUT_SECONDS", "5")),
+    # A supervisor turn can spend minutes between chunks while collaborators work
+    read_timeout=int(os.environ.get("BEDROCK_READ_TIMEOUT_SECONDS", "300")),
+    retries={"mode": "adaptive", "max_attempts": int(os.environ.get("BEDROCK_MAX_ATTEMPTS", "4"))},
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
     """
-    Sends a prompt for the agent to process and respond to.
+    Returns the process-wide bedrock-agent-runtime client, creating it on first use.
+
+    boto3 clients are thread-safe once created, but creating them is not, so the first
+    caller builds it from its own session under a lock. Safe to wrap in st.cache_resource.
+
+    :return: The shared bedrock-agent-runtime client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.session.Session().client("bedrock-agent-runtime", config=CLIENT_CONFIG)
+    return _client
+
+
+def connection_stats(client=None):
+    """
+    Reports how often requests of the client reused a pooled connection.
+
+    :param client: The client to report on. Defaults to the shared client.
+    :return: A dict with the requests sent, the connections opened and the share of reused connections.
+    """
+    client = client or get_client()
+    requests = connections = 0
+    # urllib3 counts both on each connection pool of the client's HTTP session
+    manager = getattr(client._endpoint.http_session, "_manager", None)
+    pools = getattr(manager, "pools", None)
+    for key in list(pools.keys()) if pools is not None else []:
+        pool = pools.get(key)
+        if pool is not None:
+            requests += pool.num_requests
+            connections += pool.num_connections
+    return {
+        "requests": requests,
+        "connections": connections,
+        "reuse_ratio": round(1 - connections / requests, 3) if requests else 0.0,
+    }
+
+def _invokeAgent(client, question, endSession, sessionId, stream):
+    return client.invoke_agent(
+        agentId=agentId,
+        agentAliasId=agentAliasId,
+        sessionId=sessionId,
+        inputText=question,
+        endSession=endSession,
+        enableTrace=TRACE_ENABLED,
+        # Send the final answer as it is generated rather than once it is complete
+        streamingConfigurations={"streamFinalResponse": stream},
+    )
+
+
+def askQuestionStream(question, endSession=False, sessionId="", client=None, timeline=None, usage=None):
+    """
+    Sends a prompt for the agent to process, yielding its response as it arrives.
 
     :param question: The prompt/question to send to the agent.
     :param endSession: Boolean flag to indicate whether the session should be ended.
     :param sessionId: The unique identifier of the session. Use the same value across requests to continue the conversation.
-    :return: The completion response from the agent.
+    :param client: The bedrock-agent-runtime client to use. Defaults to the shared client.
+    :param timeline: The TurnTimeline to rebuild from the trace events. Defaults to a new one when tracing is on.
+    :param usage: The UsageAccumulator to add the token usage of the turn to. Defaults to a new one when tracing is on.
+    :return: A generator of the completion text chunks.
     """
+    client = client or get_client()
+    if timeline is None and TRACE_ENABLED:
+        timeline = TurnTimeline()
+    if usage is None and TRACE_ENABLED:
+        usage = UsageAccumulator()
+    logging.info(f"Invoking agent with question: '{question}' (Session ID: {sessionId}, End Session: {endSession})")
+    started = time.perf_counter()
     try:
-        client = boto3.client('bedrock-agent-runtime', region_name=region)
-        logging.info(f"Invoking agent with question: '{question}' (Session ID: {sessionId}, End Session: {endSession})")
-        
-        # Invoke agent
-        response = client.invoke_agent(
-            agentId=agentId,
-            agentAliasId=agentAliasId,
-            sessionId=sessionId,
-            inputText=question,
-            endSession=endSession,
-            enableTrace=True
-        )
-
-        # Extract completion
-        completion = ""
+        response = _invokeAgent(client, question, endSession, sessionId, stream=True)
+        # A multi-byte character may be split across two chunks
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        first_chunk_ms = None
         for event in response.get("completion", []):
+            if timeline is not None and "trace" in event:
+                timeline.add(event["trace"])
+            if usage is not None and "trace" in event:
+                usage.add(event["trace"])
             chunk = event.get("chunk")
             if chunk:
-                completion += chunk["bytes"].decode()
-
-        logging.info(f"Agent response: {completion}")
-        return completion
-
+                text = decoder.decode(chunk["bytes"])
+                if text:
+                    if first_chunk_ms is None:
+                        first_chunk_ms = (time.perf_counter() - started) * 1000
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
     except ClientError as e:
         logging.error(f"ClientError while invoking agent: {e}")
         raise
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         raise
+    logging.info(f"Agent response streamed (first chunk: {first_chunk_ms and round(first_chunk_ms)} ms, "
+                 f"total: {round((time.perf_counter() - started) * 1000)} ms)")
+    logging.info(f"Bedrock connection stats: {connection_stats(client)}")
+    if timeline is not None:
+        timeline.log(sessionId)
+        logging.info(f"Agent time by step kind: {timeline.totals()}")
+    if usage is not None:
+        usage.emit_metrics(sessionId)
+        usage.log_summary(sessionId)
+
 
-def agent_handler(event, context):
+def askQuestion(question, endSession=False, sessionId="", client=None):
+    """
+    Sends a prompt for the agent to process and respond to.
+
+    :param question: The prompt/question to send to the agent.
+    :param endSession: Boolean flag to indicate whether the session should be ended.
+    :param sessionId: The unique identifier of the session. Use the same value across requests to continue the conversation.
+    :param client: The bedrock-agent-runtime client to use. Defaults to the shared client.
+    :return: The completion response from the agent.
+    """
+    completion = "".join(askQuestionStream(question, endSession, sessionId, client))
+    logging.info(f"Agent response: {completion}")
+    return completion
+
+
+def _readEvent(event):
+    sessionId = event.get("sessionId", "")
+    question = event.get("question", "")
+    endSession = str(event.get("endSession", "false")).lower() == "true"
+
+    if not sessionId:
+        raise ValueError("Missing sessionId in the event data.")
+    if not question:
+        raise ValueError("Missing question in the event data.")
+
+    logging.info(f"Session ID: {sessionId} | Question: {question} | End Session: {endSession}")
+    return question, endSession, sessionId
+
+
+def agent_stream_handler(event, context, client=None, timeline=None, usage=None):
+    """
+    Handles incoming requests like agent_handler, yielding the agent response as it arrives.
+
+    :param event: A dict containing the user prompt and session ID.
+    :param context: The context of the invocation (not used in this implementation).
+    :param client: The bedrock-agent-runtime client to use. Defaults to the shared client.
+    :param timeline: The TurnTimeline to rebuild from the trace events. Defaults to None.
+    :param usage: The UsageAccumulator to add the token usage of the turn to. Defaults to None.
+    :return: A generator of the response text, or of an error message.
+    """
+    try:
+        question, endSession, sessionId = _readEvent(event)
+        yield from askQuestionStream(question, endSession, sessionId, client, timeline, usage)
+    except ValueError as e:
+        logging.error(f"ValueError: {e}")
+        yield str(e)
+    except Exception as e:
+        logging.error(f"Unhandled exception: {e}")
+        yield "An error occurred. Please adjust the question and try again."
+
+
+def agent_handler(event, context, client=None):
     """
     Handles incoming requests, processes the question, and invokes the agent.
 
     :param event: A dict containing the user prompt and session ID.
     :param context: The context of the invocation (not used in this implementation).
+    :param client: The bedrock-agent-runtime client to use. Defaults to the shared client.
     :return: The response from the agent or an error message.
     """
     try:
         # Extract parameters from the event
-        sessionId = event.get("sessionId", "")
-        question = event.get("question", "")
-        endSession = event.get("endSession", "false").lower() == "true"
-
-        if not sessionId:
-            raise ValueError("Missing sessionId in the event data.")
-        if not question:
-            raise ValueError("Missing question in the event data.")
-
-        logging.info(f"Session ID: {sessionId} | Question: {question} | End Session: {endSession}")
+        question, endSession, sessionId = _readEvent(event)
 
         # Invoke the agent
-        response = askQuestion(question, endSession, sessionId)
+        response = askQuestion(question, endSession, sessionId, client)
         return {"status": "success", "response": response}
 
     except ValueError as e:
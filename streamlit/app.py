@@ -1,11 +1,21 @@
 import streamlit as st
 import agent as agenthelper
+from traces import TurnTimeline
+from usage import UsageAccumulator
 import uuid
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+@st.cache_resource
+def bedrock_client():
+    # One pooled client for every session served by this process
+    return agenthelper.get_client()
+
+HUMAN_AVATAR = "https://api.dicebear.com/7.x/notionists-neutral/svg?seed=Felix"
+AI_AVATAR = "https://assets-global.website-files.com/62b1b25a5edaf66f5056b068/62d1345ba688202d5bfa6776_aws-sagemaker-eyecatch-e1614129391121.png"
+
 # Streamlit page configuration
 st.set_page_config(page_title="Steakhouse Agent", page_icon=":robot_face:", layout="wide")
 
@@ -61,6 +71,10 @@ if 'history' not in st.session_state:
 if 'session_ended' not in st.session_state:
     st.session_state['session_ended'] = False
 
+# Token usage and cost of the session, summed over its turns
+if 'usage' not in st.session_state:
+    st.session_state['usage'] = UsageAccumulator()
+
 # Primary buttons
 col1, col2 = st.columns(2)
 with col1:
@@ -68,6 +82,9 @@ with col1:
 with col2:
     end_button = st.button("End Session", type="primary")
 
+# Optional debug panel with the trace timeline of each answer
+show_trace = agenthelper.TRACE_ENABLED and st.sidebar.checkbox("Show trace timeline")
+
 st.divider()
 
 # Handling the "End Session" button
@@ -78,48 +95,71 @@ if end_button:
         "question": "placeholder to end session",
         "endSession": True
     }
-    agenthelper.agent_handler(event, None)
+    agenthelper.agent_handler(event, None, bedrock_client())
+    st.session_state['usage'].log_summary(st.session_state['session_id'], scope="session")
+    st.session_state['usage'] = UsageAccumulator()
     st.session_state['session_id'] = None  # Clear session ID
     st.session_state['session_ended'] = True  # Mark the session as ended
 
+# Display conversation history
+st.write("## Conversation History")
+
+def show_question(question):
+    with st.chat_message(name="human", avatar=HUMAN_AVATAR):
+        st.markdown(question)
+
+def show_timeline(chat):
+    if not show_trace or not chat.get("timeline"):
+        return
+    with st.expander("Trace timeline"):
+        st.caption(" | ".join(f"{kind}: {ms:.0f} ms" for kind, ms in chat["totals"].items()))
+        st.dataframe(chat["timeline"], hide_index=True,
+                     column_order=["start_ms", "duration_ms", "agent", "phase", "kind", "name"])
+
 # Handling user input and responses
+streamed = 0
 if submit_button and prompt:
     # Clear history if session was ended previously
     if st.session_state['session_ended']:
         st.session_state['history'] = []
         st.session_state['session_ended'] = False  # Reset session ended flag
     
-    # Process the new prompt
+    # Process the new prompt, showing the answer as the agent writes it
     event = {
         "sessionId": st.session_state['session_id'],
         "question": prompt
     }
-    response = agenthelper.agent_handler(event, None)
-    logging.info(f"Response from app.py: {response}")
-
-    try:
-        if response and 'response' in response and response['response']:
-            response_data = response['response']
-        else:
-            response_data = None
-    except Exception as e:
-        logging.error(f"Error processing response: {e}")
-        response_data = None
-
-    st.session_state['history'].append({"question": prompt, "answer": response_data or "..."})
+    timeline = TurnTimeline() if agenthelper.TRACE_ENABLED else None
+    turn_usage = UsageAccumulator()
+    show_question(prompt)
+    with st.chat_message(name="ai", avatar=AI_AVATAR):
+        response_data = st.write_stream(agenthelper.agent_stream_handler(event, None, bedrock_client(), timeline, turn_usage))
+    logging.info(f"Response from app.py: {response_data}")
+
+    chat = {"question": prompt, "answer": response_data or "..."}
+    if timeline is not None:
+        chat["timeline"] = timeline.records(st.session_state['session_id'])
+        chat["totals"] = timeline.totals()
+    st.session_state['history'].append(chat)
+    st.session_state['usage'].merge(turn_usage)
+    show_timeline(chat)
+    streamed = 1
 
-# Display conversation history
-st.write("## Conversation History")
 if st.session_state["history"]:
-    for chat in reversed(st.session_state['history']):
-        with st.chat_message(
-            name="human",
-            avatar="https://api.dicebear.com/7.x/notionists-neutral/svg?seed=Felix",
-        ):
-            st.markdown(chat['question'])
-
-        with st.chat_message(
-            name="ai",
-            avatar="https://assets-global.website-files.com/62b1b25a5edaf66f5056b068/62d1345ba688202d5bfa6776_aws-sagemaker-eyecatch-e1614129391121.png",
-        ):
+    for chat in reversed(st.session_state['history'][:len(st.session_state['history']) - streamed]):
+        show_question(chat['question'])
+
+        with st.chat_message(name="ai", avatar=AI_AVATAR):
             st.markdown(chat['answer'])
+        show_timeline(chat)
+
+# Session token usage, by agent
+if agenthelper.TRACE_ENABLED and st.session_state['usage'].agents:
+    session_usage = st.session_state['usage'].summary()
+    st.sidebar.write("### Session usage")
+    st.sidebar.metric("Cost (USD)", f"{session_usage['cost_usd']:.4f}",
+                      help=f"{session_usage['input_tokens']} input and {session_usage['output_tokens']} output tokens")
+    st.sidebar.dataframe([dict(agent=agent, **totals) for agent, totals in session_usage['agents'].items()],
+                         hide_index=True)
+    if st.session_state['usage'].over_budget():
+        st.sidebar.warning("This session is over its token budget.")
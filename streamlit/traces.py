@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+
+SUPERVISOR = "Supervisor"
+
+# Trace parts of one agent step, by the key they come under in the trace event
+STEP_TRACES = {
+    "preProcessingTrace": "pre-processing",
+    "orchestrationTrace": "orchestration",
+    "postProcessingTrace": "post-processing",
+    "routingClassifierTrace": "routing",
+    "customOrchestrationTrace": "orchestration",
+}
+
+# invocationInput / observation type -> kind of step, and the key holding its details
+INVOCATIONS = {
+    "ACTION_GROUP": ("action_group", "actionGroupInvocationInput", "actionGroupInvocationOutput"),
+    "KNOWLEDGE_BASE": ("knowledge_base", "knowledgeBaseLookupInput", "knowledgeBaseLookupOutput"),
+    "AGENT_COLLABORATOR": ("collaborator", "agentCollaboratorInvocationInput", "agentCollaboratorInvocationOutput"),
+}
+
+
+def _duration_ms(metadata):
+    """
+    Returns the duration Bedrock reports for a step, or None when it reports none.
+    """
+    metadata = metadata or {}
+    if metadata.get("totalTimeMs") is not None:
+        return float(metadata["totalTimeMs"])
+    if metadata.get("startTime") and metadata.get("endTime"):
+        return (metadata["endTime"] - metadata["startTime"]).total_seconds() * 1000
+    return None
+
+
+def _invocation_name(kind, details):
+    details = details or {}
+    if kind == "action_group":
+        return f"{details.get('actionGroupName', '')}.{details.get('function') or details.get('apiPath', '')}"
+    if kind == "knowledge_base":
+        return details.get("knowledgeBaseId", "")
+    return details.get("agentCollaboratorName", "")
+
+
+class TurnTimeline:
+    """
+    Rebuilds the timeline of one agent turn from the trace events of invoke_agent.
+
+    Each step is a model invocation, an action group Lambda call, a knowledge base retrieval
+    or a collaborator call of the supervisor or one of its collaborators. Steps start when
+    their input event arrives; they last the time Bedrock reports for them, or else until
+    their output event arrives.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.steps = []
+        self._open = {}
+
+    def add(self, event):
+        """
+        Adds the trace event of an invoke_agent completion stream.
+
+        :param event: The value of the "trace" key of the stream event.
+        """
+        now_ms = (self.clock() - self.started) * 1000
+        agent = event.get("collaboratorName") or SUPERVISOR
+        for trace_key, trace in (event.get("trace") or {}).items():
+            if trace_key == "failureTrace":
+                self._close(self._open_step(agent, "failure", "failure", trace.get("failureReason", ""),
+                                            trace.get("traceId"), now_ms), now_ms, trace.get("metadata"))
+            elif trace_key in STEP_TRACES:
+                self._add_step_trace(agent, STEP_TRACES[trace_key], trace, now_ms)
+
+    def _add_step_trace(self, agent, phase, trace, now_ms):
+        if "modelInvocationInput" in trace:
+            model_input = trace["modelInvocationInput"]
+            self._open_step(agent, phase, "model", model_input.get("type", phase.upper()),
+                            model_input.get("traceId"), now_ms)
+        if "modelInvocationOutput" in trace:
+            model_output = trace["modelInvocationOutput"]
+            step = self._pop(agent, "model", model_output.get("traceId"), phase, now_ms)
+            self._close(step, now_ms, model_output.get("metadata"))
+        if "invocationInput" in trace:
+            invocation = trace["invocationInput"]
+            if invocation.get("invocationType") in INVOCATIONS:
+                kind, input_key, _ = INVOCATIONS[invocation["invocationType"]]
+                self._open_step(agent, phase, kind, _invocation_name(kind, invocation.get(input_key)),
+                                invocation.get("traceId"), now_ms)
+        if "observation" in trace:
+            observation = trace["observation"]
+            if observation.get("type") in INVOCATIONS:
+                kind, _, output_key = INVOCATIONS[observation["type"]]
+                step = self._pop(agent, kind, observation.get("traceId"), phase, now_ms)
+                self._close(step, now_ms, (observation.get(output_key) or {}).get("metadata"))
+
+    def _open_step(self, agent, phase, kind, name, trace_id, now_ms):
+        step = {"agent": agent, "phase": phase, "kind": kind, "name": name, "trace_id": trace_id,
+                "start_ms": round(now_ms, 1), "duration_ms": None}
+        self.steps.append(step)
+        self._open[(agent, kind, trace_id)] = step
+        return step
+
+    def _pop(self, agent, kind, trace_id, phase, now_ms):
+        step = self._open.pop((agent, kind, trace_id), None)
+        # An output without its input, e.g. when tracing started mid-step
+        return step or self._open_step(agent, phase, kind, "", trace_id, now_ms)
+
+    def _close(self, step, now_ms, metadata):
+        self._open.pop((step["agent"], step["kind"], step["trace_id"]), None)
+        reported = _duration_ms(metadata)
+        step["duration_ms"] = round(reported if reported is not None else now_ms - step["start_ms"], 1)
+
+    def totals(self):
+        """
+        Returns the time spent per kind of step, in milliseconds.
+        """
+        totals = {}
+        for step in self.steps:
+            totals[step["kind"]] = round(totals.get(step["kind"], 0) + (step["duration_ms"] or 0), 1)
+        return totals
+
+    def records(self, sessionId=""):
+        """
+        Returns the steps as flat records, ready to be logged or loaded into a table.
+
+        :param sessionId: The session the turn belongs to.
+        """
+        return [dict(step, session_id=sessionId, step=index) for index, step in enumerate(self.steps)]
+
+    def log(self, sessionId=""):
+        """
+        Logs each step of the turn as one JSON record.
+
+        :param sessionId: The session the turn belongs to.
+        """
+        for record in self.records(sessionId):
+            logging.info(json.dumps(dict(record, message="Agent trace step"), default=str))
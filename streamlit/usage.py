@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import sys
+import time
+from traces import STEP_TRACES, SUPERVISOR
+
+# USD per 1,000 tokens, by agent; "default" covers agents without their own entry.
+# Defaults to Claude 3.5 Haiku on-demand pricing, the model the agents are deployed with.
+PRICES = dict({"default": {"input": 0.0008, "output": 0.004}},
+              **json.loads(os.environ.get("BEDROCK_TOKEN_PRICES", "{}")))
+METRICS_NAMESPACE = os.environ.get("USAGE_METRICS_NAMESPACE", "Steakhouse/Agents")
+# Per-session spend past which a warning is logged and shown; 0 disables the check
+SESSION_BUDGET_USD = float(os.environ.get("BEDROCK_SESSION_BUDGET_USD", "0"))
+
+
+class UsageAccumulator:
+    """
+    Sums the model token usage reported in agent traces, per agent, and prices it.
+
+    Use one per turn, and merge the turns of a session into another for its totals.
+    """
+
+    def __init__(self, prices=None):
+        self.prices = prices or PRICES
+        self.agents = {}
+
+    def add(self, event):
+        """
+        Adds the usage of the model invocations in one trace event of invoke_agent.
+
+        :param event: The value of the "trace" key of the stream event.
+        """
+        agent = event.get("collaboratorName") or SUPERVISOR
+        for trace_key, trace in (event.get("trace") or {}).items():
+            if trace_key not in STEP_TRACES:
+                continue
+            usage = ((trace.get("modelInvocationOutput") or {}).get("metadata") or {}).get("usage")
+            if usage:
+                self.add_usage(agent, usage.get("inputTokens", 0), usage.get("outputTokens", 0))
+
+    def add_usage(self, agent, input_tokens, output_tokens, invocations=1):
+        totals = self.agents.setdefault(agent, {"input_tokens": 0, "output_tokens": 0, "invocations": 0})
+        totals["input_tokens"] += input_tokens or 0
+        totals["output_tokens"] += output_tokens or 0
+        totals["invocations"] += invocations
+
+    def merge(self, other):
+        """
+        Adds the usage of another accumulator, e.g. a turn into its session.
+        """
+        for agent, totals in other.agents.items():
+            self.add_usage(agent, totals["input_tokens"], totals["output_tokens"], totals["invocations"])
+        return self
+
+    def cost(self, agent):
+        price = self.prices.get(agent, self.prices["default"])
+        totals = self.agents.get(agent, {"input_tokens": 0, "output_tokens": 0})
+        return (totals["input_tokens"] * price["input"] + totals["output_tokens"] * price["output"]) / 1000
+
+    def summary(self):
+        """
+        Returns the tokens and cost per agent, and their totals.
+        """
+        agents = {agent: dict(totals, cost_usd=round(self.cost(agent), 6)) for agent, totals in self.agents.items()}
+        return {
+            "agents": agents,
+            "input_tokens": sum(totals["input_tokens"] for totals in agents.values()),
+            "output_tokens": sum(totals["output_tokens"] for totals in agents.values()),
+            "cost_usd": round(sum(totals["cost_usd"] for totals in agents.values()), 6),
+        }
+
+    def over_budget(self, budget=None):
+        budget = SESSION_BUDGET_USD if budget is None else budget
+        return bool(budget) and self.summary()["cost_usd"] > budget
+
+    def emit_metrics(self, sessionId="", stream=None):
+        """
+        Writes the usage of each agent as a CloudWatch embedded metric format record.
+
+        The task logs are shipped to CloudWatch Logs, which extracts the metrics, by agent.
+
+        :param sessionId: The session the usage belongs to, kept as a searchable property.
+        :param stream: Where to write the records. Defaults to stdout.
+        """
+        stream = stream or sys.stdout
+        timestamp = int(time.time() * 1000)
+        for agent, totals in self.summary()["agents"].items():
+            record = {
+                "_aws": {"Timestamp": timestamp, "CloudWatchMetrics": [{
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Agent"]],
+                    "Metrics": [{"Name": "InputTokens", "Unit": "Count"},
+                                {"Name": "OutputTokens", "Unit": "Count"},
+                                {"Name": "ModelInvocations", "Unit": "Count"},
+                                {"Name": "CostUSD", "Unit": "None"}],
+                }]},
+                "Agent": agent,
+                "InputTokens": totals["input_tokens"],
+                "OutputTokens": totals["output_tokens"],
+                "ModelInvocations": totals["invocations"],
+                "CostUSD": totals["cost_usd"],
+                "sessionId": sessionId,
+            }
+            stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+        stream.flush()
+
+    def log_summary(self, sessionId="", scope="turn"):
+        """
+        Logs the usage totals as one JSON record, warning when a session is over its budget.
+
+        :param sessionId: The session the usage belongs to.
+        :param scope: What the usage covers, "turn" or "session".
+        """
+        summary = self.summary()
+        logging.info(json.dumps(dict(summary, message="Agent token usage", scope=scope, session_id=sessionId)))
+        if scope == "session" and self.over_budget():
+            logging.warning(f"Session {sessionId} spent ${summary['cost_usd']:.4f}, "
+                            f"over its ${SESSION_BUDGET_USD:.4f} budget")
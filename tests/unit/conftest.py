@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+# The action group Lambdas are deployed as a flat asset directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'lambdas', 'actiongroup'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+def _index(name, partition_key, sort_key):
+    return {
+        'IndexName': name,
+        'KeySchema': [{'AttributeName': partition_key, 'KeyType': 'HASH'},
+                      {'AttributeName': sort_key, 'KeyType': 'RANGE'}],
+        'Projection': {'ProjectionType': 'ALL'},
+    }
+
+
+@pytest.fixture
+def bookings_table(monkeypatch):
+    """
+    A mocked steakhouse_bookings table, with a fresh DynamoDB client bound to it
+    """
+    moto = pytest.importorskip('moto')
+    import boto3
+    import availability
+    import connection
+    import idempotency
+    import ledger
+    from cache import booking_cache
+
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        boto3.client('dynamodb').create_table(
+            TableName=connection.TABLE_NAME,
+            KeySchema=[{'AttributeName': 'booking_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': name, 'AttributeType': 'S'} for name in
+                                  ('booking_id', 'name_key', 'type_booking_id', 'staff_name_key', 'booking_type')],
+            GlobalSecondaryIndexes=[
+                _index(connection.NAME_INDEX, 'name_key', 'type_booking_id'),
+                _index(connection.STAFF_NAME_INDEX, 'staff_name_key', 'booking_id'),
+                _index(connection.BOOKING_TYPE_INDEX, 'booking_type', 'booking_id'),
+            ],
+            BillingMode='PAY_PER_REQUEST')
+        boto3.client('dynamodb').create_table(
+            TableName=availability.AVAILABILITY_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'slot_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'slot_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST')
+        boto3.client('dynamodb').create_table(
+            TableName=ledger.LEDGER_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'staff_key', 'KeyType': 'HASH'},
+                       {'AttributeName': 'day', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'staff_key', 'AttributeType': 'S'},
+                                  {'AttributeName': 'day', 'AttributeType': 'S'}],
+            GlobalSecondaryIndexes=[_index(ledger.LEDGER_DAY_INDEX, 'day', 'staff_key')],
+            BillingMode='PAY_PER_REQUEST')
+        boto3.client('dynamodb').create_table(
+            TableName=idempotency.IDEMPOTENCY_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'idempotency_key', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'idempotency_key', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST')
+        monkeypatch.setattr(connection, '_client', None)
+        booking_cache.clear()
+        yield connection.TABLE_NAME
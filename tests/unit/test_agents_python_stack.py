@@ -1,15 +1,45 @@
-import aws_cdk as core
-import aws_cdk.assertions as assertions
+import os
 
-from agents_python.agents_python_stack import AgentsPythonStack
+import pytest
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in agents_python/agents_python_stack.py
-def test_sqs_queue_created():
-    app = core.App()
-    stack = AgentsPythonStack(app, "agents-python")
-    template = assertions.Template.from_stack(stack)
+core = pytest.importorskip('aws_cdk')
+assertions = pytest.importorskip('aws_cdk.assertions')
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+@pytest.fixture(scope='module')
+def template():
+    if not os.path.exists(os.path.join(ROOT, 'layers', 'requests_aws_auth.zip')):
+        pytest.skip('layers/requests_aws_auth.zip is built separately')
+    from agents_python.agent_stack import AgentStack
+
+    # The stack reads its account and region from the CDK environment
+    os.environ.setdefault('CDK_DEFAULT_ACCOUNT', '123456789012')
+    os.environ.setdefault('CDK_DEFAULT_REGION', 'us-east-1')
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        app = core.App()
+        stack = AgentStack(app, "agents-python")
+        return assertions.Template.from_stack(stack)
+    finally:
+        os.chdir(cwd)
+
+
+def test_action_groups_invoke_the_published_alias(template):
+    aliases = template.find_resources('AWS::Lambda::Alias', {'Properties': {'Name': 'live'}})
+    agents = template.find_resources('AWS::Bedrock::Agent')
+    executors = [group['ActionGroupExecutor']['Lambda'] for agent in agents.values()
+                 for group in agent['Properties'].get('ActionGroups', [])]
+
+    assert len(executors) == 5
+    assert all(executor['Ref'] in aliases for executor in executors)
+
+
+def test_booking_tables(template):
+    template.has_resource_properties('AWS::DynamoDB::Table', {
+        'TableName': 'steakhouse_idempotency',
+        'TimeToLiveSpecification': {'AttributeName': 'expires_at', 'Enabled': True},
+    })
+    template.resource_count_is('AWS::DynamoDB::Table', 4)
@@ -0,0 +1,82 @@
+import csv
+import json
+
+import pytest
+
+import bulk
+import connection
+
+
+def test_import_then_export_round_trip(bookings_table, tmp_path):
+    source = tmp_path / 'bookings.jsonl'
+    with open(source, 'w') as rows:
+        for index in range(60):
+            rows.write(json.dumps({'booking_id': f'legacy{index:04d}', 'name': f'Guest {index}',
+                                   'date': '2024-12-24', 'time': '19:00', 'num_guests': index % 8 + 1}) + '\n')
+        rows.write(json.dumps({'booking_type': 'ticket', 'name': 'Ada', 'reason': 'Cold steak'}) + '\n')
+
+    assert bulk.import_bookings(bulk.read_rows(str(source)), booking_type='reservation', concurrency=3) == 61
+
+    item = connection.deserialize(connection.get_client().get_item(
+        TableName=bookings_table, Key=connection.serialize({'booking_id': 'legacy0007'}))['Item'])
+    assert item['type_booking_id'] == 'reservation#legacy0007'
+    assert item['num_guests'] == 8
+
+    target = tmp_path / 'bookings.csv'
+    assert bulk.export_bookings(str(target), segments=4) == 61
+    with open(target, newline='') as exported:
+        rows = list(csv.DictReader(exported))
+    assert sorted(row['booking_type'] for row in rows).count('reservation') == 60
+    assert {row['name'] for row in rows if row['booking_type'] == 'ticket'} == {'Ada'}
+
+
+def test_upcoming_bookings_take_their_holds(bookings_table, tmp_path):
+    import reservation_lambda_function as reservation
+
+    source = tmp_path / 'upcoming.jsonl'
+    with open(source, 'w') as rows:
+        for index in range(3):
+            rows.write(json.dumps({'booking_id': f'pos{index}', 'booking_type': 'reservation', 'name': 'Ada',
+                                   'date': '14/03/2099', 'time': '19:30', 'num_guests': 15}) + '\n')
+        rows.write(json.dumps({'booking_id': 'pos3', 'booking_type': 'reservation', 'name': 'Bo',
+                               'date': 'someday', 'time': '19:30', 'num_guests': 2}) + '\n')
+
+    rejected = []
+    assert bulk.import_bookings(bulk.read_rows(str(source)), concurrency=1, rejected=rejected) == 2
+    assert [(booking['booking_id'], reason) for booking, reason in rejected] == [
+        ('pos2', 'Not enough availability for this booking'),
+        ('pos3', 'Invalid value for date: expected date such as 2025-03-14')]
+    assert reservation.check_reservation_availability('2099-03-14', '19:30')['available_covers'] == 10
+
+    # Importing them again refreshes them without taking their covers twice
+    assert bulk.import_bookings(bulk.read_rows(str(source)), concurrency=1) == 2
+    assert reservation.check_reservation_availability('2099-03-14', '19:30')['available_covers'] == 10
+
+
+def test_write_batch_retries_unprocessed_items(monkeypatch):
+    responses = [{'UnprocessedItems': {bulk.TABLE_NAME: [{'PutRequest': {}}]}}, {'UnprocessedItems': {}}]
+    requests = []
+
+    class Client:
+        def batch_write_item(self, RequestItems):
+            requests.append(RequestItems)
+            return responses.pop(0)
+
+    monkeypatch.setattr(bulk, 'get_client', Client)
+    monkeypatch.setattr(bulk.time, 'sleep', lambda seconds: None)
+
+    assert bulk.write_batch([{'booking_id': 'a'}, {'booking_id': 'b'}]) == 2
+    assert len(requests) == 2 and requests[1] == {bulk.TABLE_NAME: [{'PutRequest': {}}]}
+
+
+def test_export_stops_scanning_when_the_writer_fails(monkeypatch, tmp_path):
+    class Client:
+        def scan(self, **request):
+            # More rows than the queue holds, one of which cannot be written as JSON
+            return {'Items': [{'booking_id': {'S': f"{request['Segment']}-{index}"}, 'blob': {'B': b'x'}}
+                              for index in range(1500)]}
+
+    monkeypatch.setattr(bulk, 'get_client', Client)
+
+    with pytest.raises(TypeError, match='Binary'):
+        bulk.export_bookings(str(tmp_path / 'bookings.jsonl'), segments=2)
@@ -0,0 +1,42 @@
+from cache import BookingCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_miss_and_ttl_expiry():
+    clock = FakeClock()
+    cache = BookingCache(maxsize=2, ttl=10, clock=clock)
+
+    assert cache.get('a') is None
+    cache.put('a', {'booking_id': 'a'})
+    assert cache.get('a') == {'booking_id': 'a'}
+
+    clock.now = 11
+    assert cache.get('a') is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 0}
+
+
+def test_evicts_least_recently_used():
+    cache = BookingCache(maxsize=2, ttl=10, clock=FakeClock())
+    cache.put('a', {})
+    cache.put('b', {})
+    cache.get('a')
+    cache.put('c', {})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {}
+    assert cache.get('c') == {}
+
+
+def test_invalidate():
+    cache = BookingCache()
+    cache.put('a', {'booking_id': 'a'})
+    cache.invalidate('a')
+
+    assert cache.get('a') is None
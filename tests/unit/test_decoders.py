@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+import pytest
+
+from decoders import DECODERS, Decoder, ParameterError
+
+
+def params(**values):
+    return [{'name': k, 'type': 'string', 'value': v} for k, v in values.items()]
+
+
+def test_create_reservation_coerces_integers():
+    values = DECODERS['create_reservation_booking'](
+        params(date='2025-03-14', name='Ada', time='19:30', num_guests='4'))
+
+    assert values == {'date': '2025-03-14', 'name': 'Ada', 'time': '19:30', 'num_guests': 4}
+
+
+@pytest.mark.parametrize('num_guests', ['four', 'Infinity', '-inf', 'NaN'])
+def test_rejects_non_integer(num_guests):
+    with pytest.raises(ParameterError, match='num_guests: expected integer'):
+        DECODERS['create_reservation_booking'](
+            params(date='2025-03-14', name='Ada', time='19:30', num_guests=num_guests))
+
+
+def test_rejects_below_minimum():
+    with pytest.raises(ParameterError, match='num_guests: must be at least 1'):
+        DECODERS['create_reservation_booking'](
+            params(date='2025-03-14', name='Ada', time='19:30', num_guests='0'))
+
+
+def test_reports_missing_parameters():
+    with pytest.raises(ParameterError, match='Missing required parameters: date, time'):
+        DECODERS['create_reservation_booking'](params(name='Ada', num_guests='2'))
+
+
+def test_number_array_and_boolean():
+    decoder = Decoder({
+        'price': {'type': 'number', 'required': True},
+        'ids': {'type': 'array', 'required': True},
+        'vip': {'type': 'boolean', 'required': False},
+    })
+
+    values = decoder(params(price='12.50', ids='[a1, b2]', vip='true'))
+
+    assert values == {'price': Decimal('12.50'), 'ids': ['a1', 'b2'], 'vip': True}
+
+
+def test_date_and_time_formats_are_normalised():
+    values = DECODERS['create_reservation_booking'](
+        params(date='14/03/2025', name='Ada', time='7:30 pm', num_guests='2'))
+
+    assert values['date'] == '2025-03-14'
+    assert values['time'] == '19:30'
+
+    with pytest.raises(ParameterError, match='time: expected time such as 19:30'):
+        DECODERS['create_reservation_booking'](params(date='2025-03-14', name='Ada', time='soon', num_guests='2'))
@@ -0,0 +1,41 @@
+import dispatcher
+
+
+@dispatcher.action('TestActionGroup', 'echo')
+def echo(params):
+    return {'value': params['value']}
+
+
+@dispatcher.action('TestActionGroup', 'get_reservation_booking_details')
+def get_booking(params):
+    return {'booking_id': params['booking_id']}
+
+
+def make_event(function, **params):
+    return {
+        'actionGroup': 'TestActionGroup',
+        'function': function,
+        'parameters': [{'name': k, 'type': 'string', 'value': v} for k, v in params.items()],
+    }
+
+
+def body_of(response):
+    return response['response']['functionResponse']['responseBody']['TEXT']['body']
+
+
+def test_routes_to_registered_handler():
+    response = dispatcher.dispatch(make_event('echo', value='x'))
+
+    assert body_of(response) == '{"value":"x"}'
+    assert response['response']['function'] == 'echo'
+    assert response['messageVersion'] == '1.0'
+
+
+def test_missing_required_parameter_is_rejected_by_schema():
+    response = dispatcher.dispatch(make_event('get_reservation_booking_details'))
+
+    assert body_of(response) == 'Missing booking_id parameter'
+
+
+def test_unknown_function():
+    assert body_of(dispatcher.dispatch(make_event('nope'))) == 'Invalid function'
@@ -0,0 +1,37 @@
+import json
+from decimal import Decimal
+
+from encoder import encode
+
+
+def test_decimals_and_compact_separators():
+    body = encode('check_reservation_availability', {'remaining': Decimal('36'), 'price': Decimal('12.5')})
+
+    assert body == '{"remaining":36,"price":12.5}'
+
+
+def test_drops_internal_fields():
+    result = {'booking_id': 'a', 'booking_type': 'reservation', 'type_booking_id': 'reservation#a',
+              'slot_id': 'reservation#2025-03-14#19:30', 'name': 'Ada'}
+
+    assert json.loads(encode('create_reservation_booking', result)) == {'booking_id': 'a', 'name': 'Ada'}
+    assert json.loads(encode('update_reservation_booking', {
+        'booking_id': 'a', 'updated': {'date': '2030-03-20', 'expires_at': 1902873600}})) == {
+        'booking_id': 'a', 'updated': {'date': '2030-03-20'}}
+
+
+def test_projects_bookings_on_response_fields():
+    result = {'bookings': [{'booking_id': 'a', 'name': 'Ada', 'notes': 'internal'}], 'not_found': ['b']}
+
+    assert json.loads(encode('get_reservation_bookings', result)) == {
+        'bookings': [{'booking_id': 'a', 'name': 'Ada'}], 'not_found': ['b']}
+
+
+def test_truncates_lists_past_the_size_cap():
+    result = {'bookings': [{'booking_id': f'{index:04d}', 'name': 'Ada'} for index in range(100)]}
+
+    body = json.loads(encode('list_reservation_bookings_by_name', result, max_bytes=500))
+
+    assert body['truncated'] is True
+    assert 0 < len(body['bookings']) < 100
+    assert body['bookings'][0] == {'booking_id': '0000', 'name': 'Ada'}
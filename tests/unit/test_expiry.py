@@ -0,0 +1,55 @@
+import gzip
+import importlib.util
+import json
+import os
+
+import pytest
+
+from expiry import day_expires_at, expires_at
+
+
+def test_expiry_follows_the_last_day_of_each_booking_type():
+    assert expires_at('reservation', {'date': '2025-03-14'}) == day_expires_at('2025-03-14', 30)
+    assert expires_at('shortlet', {'date': '2025-03-14', 'number_days': 3}) == day_expires_at('2025-03-17', 30)
+    assert expires_at('time_off', {'start_date': '2025-03-10', 'end_date': '2025-03-12'}) == \
+        day_expires_at('2025-03-12', 365)
+    assert expires_at('ticket', {'creation_date': '14/03/2025'}) == day_expires_at('2025-03-14', 180)
+    assert expires_at('reservation', {'date': 'next friday'}) is None
+
+
+def load_archiver():
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'lambdas', 'archive', 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location('archive_lambda_function', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def stream_record(event_name, principal, image, sequence):
+    record = {'eventName': event_name,
+              'dynamodb': {'OldImage': image, 'SequenceNumber': sequence, 'ApproximateCreationDateTime': 1742000000}}
+    if principal:
+        record['userIdentity'] = {'type': 'Service', 'principalId': principal}
+    return record
+
+
+def test_archives_only_ttl_removals(monkeypatch):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        boto3.client('s3').create_bucket(Bucket='archive')
+        archiver = load_archiver()
+        monkeypatch.setattr(archiver, 'ARCHIVE_BUCKET', 'archive')
+
+        result = archiver.handler({'Records': [
+            stream_record('REMOVE', 'dynamodb.amazonaws.com', {'booking_id': {'S': 'a'}, 'num_guests': {'N': '4'}}, '100'),
+            stream_record('REMOVE', None, {'booking_id': {'S': 'b'}}, '101'),
+            stream_record('MODIFY', None, {'booking_id': {'S': 'c'}}, '102'),
+        ]}, None)
+
+        body = boto3.client('s3').get_object(Bucket='archive', Key=result['key'])['Body'].read()
+    assert result == {'archived': 1, 'key': 'bookings/2025/03/15/100-1.jsonl.gz'}
+    assert [json.loads(line) for line in gzip.decompress(body).splitlines()] == [{'booking_id': 'a', 'num_guests': 4}]
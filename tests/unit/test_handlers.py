@@ -0,0 +1,335 @@
+import json
+from types import SimpleNamespace
+
+import reservation_lambda_function as reservation
+import hr_lambda_function as hr
+import shortlet_lambda_function as shortlet
+import ticket_lambda_function as ticket
+import operations_lambda_function as operations
+from cache import booking_cache
+
+
+def call(module, function, session_id=None, **params):
+    event = {
+        'messageVersion': '1.0',
+        'sessionId': session_id,
+        'actionGroup': module.ACTION_GROUP,
+        'function': function,
+        'parameters': [{'name': k, 'type': 'string', 'value': v} for k, v in params.items()],
+    }
+    body = module.lambda_handler(event, None)['response']['functionResponse']['responseBody']['TEXT']['body']
+    return json.loads(body)
+
+
+def invoke(function, **params):
+    return call(reservation, function, **params)
+
+
+def test_reservation_round_trip(bookings_table):
+    created = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30', num_guests='4')
+    booking_id = created['booking_id']
+
+    booking = invoke('get_reservation_booking_details', booking_id=booking_id)
+    assert booking['name'] == 'Ada'
+    assert booking['num_guests'] == 4
+
+    invoke('delete_reservation_booking', booking_id=booking_id)
+    assert 'No booking found' in invoke('get_reservation_booking_details', booking_id=booking_id)['message']
+
+
+def test_lookups_after_create_are_served_from_cache(bookings_table):
+    booking_id = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                        num_guests='2')['booking_id']
+
+    invoke('get_reservation_booking_details', booking_id=booking_id)
+    invoke('get_reservation_booking_details', booking_id=booking_id)
+
+    assert booking_cache.stats()['hits'] == 2
+    assert booking_cache.stats()['misses'] == 0
+
+
+def test_batch_lookup(bookings_table):
+    first = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30', num_guests='2')
+    second = invoke('create_reservation_booking', date='2025-03-15', name='Bo', time='20:00', num_guests='3')
+    booking_cache.clear()
+
+    result = invoke('get_reservation_bookings',
+                    booking_ids='["{}", "{}", "missing"]'.format(first['booking_id'], second['booking_id']))
+
+    assert [b['name'] for b in result['bookings']] == ['Ada', 'Bo']
+    assert result['not_found'] == ['missing']
+
+
+def test_create_retries_on_booking_id_collision(bookings_table, monkeypatch):
+    import helper
+
+    generated = iter(['0000000000aaaa', '0000000000aaaa', '0000000000bbbb'])
+    monkeypatch.setattr(helper, 'new_booking_id', lambda: next(generated))
+
+    first = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30', num_guests='2')
+    second = invoke('create_reservation_booking', date='2025-03-14', name='Bo', time='19:30', num_guests='2')
+
+    assert first['booking_id'] == '0000000000aaaa'
+    assert second['booking_id'] == '0000000000bbbb'
+    booking_cache.clear()
+    assert invoke('get_reservation_booking_details', booking_id='0000000000aaaa')['name'] == 'Ada'
+
+
+def test_list_bookings_by_name_pages_newest_first(bookings_table):
+    created = [invoke('create_reservation_booking', date=f'2025-03-1{i}', name='Ada', time='19:30',
+                      num_guests='2')['booking_id'] for i in range(3)]
+    invoke('create_reservation_booking', date='2025-03-14', name='Bo', time='19:30', num_guests='2')
+
+    first = invoke('list_reservation_bookings_by_name', name='ada', limit='2')
+    second = invoke('list_reservation_bookings_by_name', name=' ADA ', limit='2', next_token=first['next_token'])
+
+    listed = [b['booking_id'] for b in first['bookings'] + second['bookings']]
+    assert listed == sorted(created, reverse=True)
+    assert set(first['bookings'][0]) == {'booking_id', 'date', 'time', 'num_guests'}
+
+
+def test_reservations_are_limited_by_slot_capacity(bookings_table, monkeypatch):
+    monkeypatch.setattr(reservation, 'SLOT_CAPACITY', 10)
+
+    first = invoke('create_reservation_booking', date='14/03/2025', name='Ada', time='7pm', num_guests='6')
+    full = invoke('create_reservation_booking', date='2025-03-14', name='Bo', time='19:15', num_guests='5')
+    assert 'booking_id' in first
+    assert full == {'error': 'Not enough availability for this booking'}
+
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:00',
+                  num_guests='5') == {'date': '2025-03-14', 'slot': '19:00', 'available_covers': 4, 'available': False}
+
+    # Deleting it as another kind of booking leaves it, and its covers, alone
+    for module, function in [(ticket, 'delete_ticket_booking'), (shortlet, 'delete_shortlet_booking')]:
+        assert 'No booking found' in call(module, function, booking_id=first['booking_id'])['error']
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:00')['available_covers'] == 4
+
+    invoke('delete_reservation_booking', booking_id=first['booking_id'])
+    invoke('delete_reservation_booking', booking_id=first['booking_id'])
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:00')['available_covers'] == 10
+
+
+def test_overlapping_shortlet_stays_are_rejected(bookings_table):
+    stay = call(shortlet, 'create_shortlet_booking', name='Ada', date='2025-03-14', number_days='3',
+                shortlet_type='Studio', num_guests='2')
+    assert 'booking_id' in stay
+
+    overlap = call(shortlet, 'create_shortlet_booking', name='Bo', date='2025-03-16', number_days='2',
+                   shortlet_type='studio', num_guests='1')
+    assert overlap == {'error': 'Not enough availability for this booking'}
+
+    check = call(shortlet, 'check_shortlet_availability', shortlet_type='Studio', date='2025-03-15', number_days='3')
+    assert check['available'] is False
+    assert check['unavailable_nights'] == ['2025-03-15', '2025-03-16']
+
+    call(shortlet, 'delete_shortlet_booking', booking_id=stay['booking_id'])
+    assert call(shortlet, 'check_shortlet_availability', shortlet_type='Studio', date='2025-03-15',
+                number_days='3')['available'] is True
+
+
+def test_time_off_ledger(bookings_table):
+    leave = call(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-10',
+                 end_date='2025-03-12', reason='Holiday')
+    call(hr, 'create_time_off_booking', staff_name='Bo', start_date='2025-03-12', end_date='2025-03-12',
+         reason='Sick')
+
+    overlap = call(hr, 'create_time_off_booking', staff_name='ada', start_date='2025-03-12',
+                   end_date='2025-03-14', reason='Trip')
+    assert overlap['error'] == 'The time off overlaps time off already booked'
+    assert overlap['conflicts'] == [{'booking_id': leave['booking_id'], 'reason': 'Holiday', 'days': ['2025-03-12']}]
+
+    off = call(hr, 'list_staff_off_on', date='12/03/2025')['staff']
+    assert sorted(entry['staff_name'] for entry in off) == ['Ada', 'Bo']
+
+    call(hr, 'delete_time_off_booking', booking_id=leave['booking_id'])
+    assert call(hr, 'check_time_off_conflicts', staff_name='Ada', start_date='2025-03-01',
+                end_date='2025-03-31')['has_conflicts'] is False
+
+
+def test_update_reservation_moves_its_covers(bookings_table):
+    booking_id = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                        num_guests='4')['booking_id']
+
+    assert invoke('update_reservation_booking', booking_id=booking_id, desired_food='Ribeye') == {
+        'booking_id': booking_id, 'updated': {'desired_food': 'Ribeye'}}
+    moved = invoke('update_reservation_booking', booking_id=booking_id, time='20:00', num_guests='6')
+
+    assert moved['updated'] == {'time': '20:00', 'num_guests': 6}
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:30')['available_covers'] == 40
+    assert invoke('check_reservation_availability', date='2025-03-14', time='20:00')['available_covers'] == 34
+    assert invoke('get_reservation_booking_details', booking_id=booking_id)['desired_food'] == 'Ribeye'
+    assert invoke('update_reservation_booking', booking_id='missing', num_guests='2') == {
+        'error': 'No booking found with ID missing'}
+
+
+def test_bookings_without_a_type_can_still_be_changed(bookings_table):
+    import boto3
+    import connection
+
+    # Written before bookings recorded their type
+    boto3.client('dynamodb').put_item(TableName=connection.TABLE_NAME, Item=connection.serialize(
+        {'booking_id': 'abcd1234', 'name': 'Ada', 'date': '2025-03-14', 'time': '19:30', 'num_guests': 4}))
+
+    assert invoke('update_reservation_booking', booking_id='abcd1234', desired_food='Ribeye')['updated'] == {
+        'desired_food': 'Ribeye'}
+    assert invoke('update_reservation_booking', booking_id='abcd1234', time='20:00')['updated']['time'] == '20:00'
+    assert 'error' not in invoke('delete_reservation_booking', booking_id='abcd1234')
+    assert 'No booking found' in invoke('get_reservation_booking_details', booking_id='abcd1234')['message']
+
+def test_delete_releases_the_holds_a_concurrent_update_moved(bookings_table):
+    import helper
+
+    booking_id = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                        num_guests='4')['booking_id']
+    reads = []
+
+    def releases(booking):
+        # Another call moves the booking between the delete's read and its write
+        if not reads:
+            invoke('update_reservation_booking', booking_id=booking_id, time='21:00', num_guests='6')
+        reads.append(booking['slot_id'])
+        return reservation.release_covers(booking)
+
+    helper.delete_booking(booking_id, reservation.BOOKING_TYPE, releases)
+
+    assert reads == ['reservation#2025-03-14#19:30', 'reservation#2025-03-14#21:00']
+    for time in ('19:30', '21:00'):
+        assert invoke('check_reservation_availability', date='2025-03-14', time=time)['available_covers'] == 40
+
+
+def test_update_time_off_moves_its_ledger_days(bookings_table):
+    leave = call(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-10',
+                 end_date='2025-03-12', reason='Holiday')['booking_id']
+    call(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-14', end_date='2025-03-14',
+         reason='Sick')
+
+    overlap = call(hr, 'update_time_off_booking', booking_id=leave, end_date='2025-03-14')
+    assert overlap['error'] == 'The time off overlaps time off already booked'
+    assert [conflict['days'] for conflict in overlap['conflicts']] == [['2025-03-14']]
+
+    call(hr, 'update_time_off_booking', booking_id=leave, start_date='2025-03-11', end_date='2025-03-13',
+         reason='Trip')
+    days = call(hr, 'check_time_off_conflicts', staff_name='Ada', start_date='2025-03-01', end_date='2025-03-31')
+    assert [(conflict['reason'], conflict['days']) for conflict in days['conflicts']] == [
+        ('Trip', ['2025-03-11', '2025-03-12', '2025-03-13']), ('Sick', ['2025-03-14'])]
+
+
+def test_refused_time_off_update_of_a_deleted_booking(bookings_table, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise hr.CapacityError()
+
+    monkeypatch.setattr(hr, 'update_booking', refuse)
+    assert call(hr, 'update_time_off_booking', booking_id='gone', end_date='2025-03-14') == {
+        'error': 'The time off overlaps time off already booked'}
+
+
+def test_past_bookings_outlive_their_expired_counters_and_ledger_days(bookings_table):
+    import boto3
+    import availability
+    import ledger
+
+    client = boto3.client('dynamodb')
+    dinner = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                    num_guests='4')['booking_id']
+    leave = call(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-10',
+                 end_date='2025-03-11', reason='Holiday')['booking_id']
+    # What the TTL sweep leaves once their days are over
+    client.delete_item(TableName=availability.AVAILABILITY_TABLE_NAME,
+                       Key={'slot_id': {'S': 'reservation#2025-03-14#19:30'}})
+    client.delete_item(TableName=ledger.LEDGER_TABLE_NAME, Key={'staff_key': {'S': 'ada'}, 'day': {'S': '2025-03-10'}})
+
+    assert invoke('update_reservation_booking', booking_id=dinner, time='20:00')['updated']['time'] == '20:00'
+    assert call(hr, 'update_time_off_booking', booking_id=leave, reason='Trip')['updated'] == {'reason': 'Trip'}
+    assert 'error' not in invoke('delete_reservation_booking', booking_id=dinner)
+    assert 'error' not in call(hr, 'delete_time_off_booking', booking_id=leave)
+    assert call(hr, 'check_time_off_conflicts', staff_name='Ada', start_date='2025-03-01',
+                end_date='2025-03-31')['conflicts'] == []
+
+
+def test_booking_operations_apply_all_or_nothing(bookings_table):
+    friday = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                    num_guests='4')['booking_id']
+    swap = [{'action': 'delete', 'booking_type': 'reservation', 'booking_id': friday},
+            {'action': 'create', 'booking_type': 'reservation', 'date': '15/03/2025', 'name': 'Ada',
+             'time': '7.30pm', 'num_guests': 4},
+            {'action': 'create', 'booking_type': 'ticket', 'name': 'Ada', 'incident_date': '2025-03-14',
+             'reason': 'Booked the wrong day'}]
+
+    too_many = call(operations, 'apply_booking_operations', operations=json.dumps(
+        swap[:2] + [dict(swap[1], date='2025-03-16', num_guests=41)]))
+    assert too_many == {'error': 'Operation 3 (create reservation): At most 40 can be booked at once'}
+    assert invoke('get_reservation_booking_details', booking_id=friday)['date'] == '2025-03-14'
+
+    results = call(operations, 'apply_booking_operations', operations=json.dumps(swap))['results']
+    assert [result['action'] for result in results] == ['delete', 'create', 'create']
+    assert 'No booking found' in invoke('get_reservation_booking_details', booking_id=friday)['message']
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:30')['available_covers'] == 40
+    assert invoke('check_reservation_availability', date='2025-03-15', time='19:30')['available_covers'] == 36
+
+
+def test_booking_operations_share_slots_and_ledger_days(bookings_table):
+    table = invoke('create_reservation_booking', date='2025-03-14', name='Ada', time='19:30',
+                   num_guests='4')['booking_id']
+    leave = call(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-10',
+                 end_date='2025-03-11', reason='Holiday')['booking_id']
+    rebook = [{'action': 'delete', 'booking_type': 'reservation', 'booking_id': table},
+              {'action': 'create', 'booking_type': 'reservation', 'date': '2025-03-14', 'name': 'Ada',
+               'time': '19:45', 'num_guests': 6},
+              {'action': 'delete', 'booking_type': 'time_off', 'booking_id': leave},
+              {'action': 'create', 'booking_type': 'time_off', 'staff_name': 'Ada', 'start_date': '2025-03-11',
+               'end_date': '2025-03-12', 'reason': 'Trip'}]
+
+    twice = call(operations, 'apply_booking_operations', operations=json.dumps(
+        rebook[:1] + [{'action': 'update', 'booking_type': 'reservation', 'booking_id': table, 'time': '20:00'}]))
+    assert twice['error'].startswith(f'Operation 2 (update reservation): booking {table} is already changed')
+    overlap = call(operations, 'apply_booking_operations', operations=json.dumps(
+        rebook[3:] + [dict(rebook[3], start_date='2025-03-12', end_date='2025-03-13')]))
+    assert overlap == {'error': 'Operation 2 (create time_off): The time off overlaps time off already booked'}
+
+    assert 'results' in call(operations, 'apply_booking_operations', operations=json.dumps(rebook))
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:30')['available_covers'] == 34
+    days = call(hr, 'check_time_off_conflicts', staff_name='Ada', start_date='2025-03-01', end_date='2025-03-31')
+    assert [(conflict['reason'], conflict['days']) for conflict in days['conflicts']] == [
+        ('Trip', ['2025-03-11', '2025-03-12'])]
+
+
+def test_retried_create_returns_the_original_booking(bookings_table):
+    first = invoke('create_reservation_booking', session_id='s1', date='2025-03-14', name='Ada',
+                   time='19:30', num_guests='4')
+    retry = invoke('create_reservation_booking', session_id='s1', date='14/03/2025', name=' ada ',
+                   time='7.30pm', num_guests='4')
+    other_session = invoke('create_reservation_booking', session_id='s2', date='2025-03-14', name='Ada',
+                           time='19:30', num_guests='4')
+
+    assert retry == first
+    assert other_session['booking_id'] != first['booking_id']
+    assert invoke('check_reservation_availability', date='2025-03-14', time='19:30')['available_covers'] == 32
+
+
+def test_concurrent_retry_keeps_a_single_booking(bookings_table):
+    import idempotency
+
+    params = {'date': '2025-03-10', 'staff_name': 'Ada', 'reason': 'Holiday'}
+    with idempotency.scope(idempotency.idempotency_key('s1', 'create_time_off_booking', params)):
+        # The second call gets past the dispatcher lookup, as if both ran at once
+        first = hr.create_time_off_booking('Ada', '2025-03-10', '2025-03-11', 'Holiday')
+        second = hr.create_time_off_booking('Ada', '2025-03-10', '2025-03-11', 'Holiday')
+
+    assert second == first
+    assert len(call(hr, 'list_time_off_bookings_by_name', staff_name='Ada')['bookings']) == 1
+
+
+def test_consolidated_executor_routes_on_action_group(bookings_table):
+    import executor_lambda_function as executor
+    import ticket_lambda_function as ticket
+
+    def route(module, function, **params):
+        return call(SimpleNamespace(ACTION_GROUP=module.ACTION_GROUP, lambda_handler=executor.lambda_handler),
+                    function, **params)
+
+    created = route(ticket, 'create_ticket_booking', name='Ada', incident_date='2025-03-12', reason='Cold steak')
+    leave = route(hr, 'create_time_off_booking', staff_name='Ada', start_date='2025-03-10', end_date='2025-03-10',
+                  reason='Holiday')
+
+    assert route(ticket, 'get_ticket_booking_details', booking_id=created['booking_id'])['name'] == 'Ada'
+    assert route(hr, 'get_time_off_booking_details', booking_id=leave['booking_id'])['staff_name'] == 'Ada'
@@ -0,0 +1,14 @@
+import ids
+
+
+def test_ids_sort_by_creation_time():
+    earlier = ids.new_booking_id(now=1_700_000_000.000)
+    later = ids.new_booking_id(now=1_700_000_000.001)
+
+    assert len(earlier) == ids.TIME_LENGTH + ids.RANDOM_LENGTH
+    assert earlier < later
+    assert ids.booking_id_bound(1_700_000_000) <= earlier
+
+
+def test_timestamp_round_trip():
+    assert ids.booking_id_time(ids.new_booking_id(now=1_700_000_123.456)) == 1_700_000_123.456
@@ -0,0 +1,46 @@
+import io
+import json
+
+from log import Logger
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_unsampled_invocations_only_log_warnings_and_errors():
+    stream = io.StringIO()
+    logger = Logger(sample_rate=0.01, stream=stream, rng=lambda: 0.5)
+    logger.start('create_reservation_booking', 'req-1')
+
+    logger.info('Invocation')
+    logger.warning('Invalid parameters', error='Missing date parameter')
+
+    assert [(line['level'], line['message'], line['function'], line['request_id']) for line in lines(stream)] == [
+        ('WARNING', 'Invalid parameters', 'create_reservation_booking', 'req-1')]
+
+
+def test_per_function_sample_rate_and_level():
+    stream = io.StringIO()
+    logger = Logger(level='INFO', sample_rate=0.0, sample_rates={'get_reservation_bookings': 1.0},
+                    stream=stream, rng=lambda: 0.5)
+    logger.start('get_reservation_bookings')
+
+    logger.debug('Action result')
+    logger.info('Invocation', duration_ms=1.5)
+
+    assert [line['message'] for line in lines(stream)] == ['Invocation']
+
+
+def test_redacts_names():
+    stream = io.StringIO()
+    logger = Logger(stream=stream)
+    logger.start('create_time_off_booking')
+
+    logger.info('Action result', parameters={'staff_name': 'Grace Hopper', 'reason': 'Vacation'},
+                result={'bookings': [{'name': 'Ada', 'name_key': 'ada'}]})
+
+    line = lines(stream)[0]
+    assert 'Grace' not in stream.getvalue() and 'ada' not in stream.getvalue().lower()
+    assert line['parameters']['staff_name'].startswith('redacted:')
+    assert line['parameters']['reason'] == 'Vacation'
@@ -0,0 +1,41 @@
+import io
+import json
+
+import reservation_lambda_function as reservation
+from metrics import Metrics, metrics
+
+
+def test_emits_embedded_metric_format():
+    stream = io.StringIO()
+    recorder = Metrics(namespace='Test', stream=stream)
+    recorder.start('ReservationBookingsActionGroup', 'get_reservation_booking_details')
+    recorder.add('HandlerDuration', 12.5)
+    recorder.add('DynamoDBCalls', 1)
+    recorder.add('DynamoDBCalls', 1)
+    recorder.flush()
+
+    record = json.loads(stream.getvalue())
+    assert record['_aws']['CloudWatchMetrics'] == [{
+        'Namespace': 'Test',
+        'Dimensions': [['actionGroup', 'function']],
+        'Metrics': [{'Name': 'HandlerDuration', 'Unit': 'Milliseconds'}, {'Name': 'DynamoDBCalls', 'Unit': 'Count'}],
+    }]
+    assert record['function'] == 'get_reservation_booking_details'
+    assert (record['HandlerDuration'], record['DynamoDBCalls']) == (12.5, 2)
+
+
+def test_dispatch_records_dynamodb_latency_and_capacity(bookings_table):
+    event = {
+        'actionGroup': reservation.ACTION_GROUP,
+        'function': 'get_reservation_booking_details',
+        'parameters': [{'name': 'booking_id', 'value': 'missing'}],
+    }
+    with metrics.capture() as records:
+        reservation.lambda_handler(event)
+
+    [record] = records
+    assert (record['actionGroup'], record['function']) == (reservation.ACTION_GROUP, 'get_reservation_booking_details')
+    assert record['DynamoDBCalls'] == 1
+    assert (record['CacheHits'], record['CacheMisses']) == (0, 1)
+    assert record['ConsumedCapacity'] > 0
+    assert 0 < record['DynamoDBLatency'] <= record['HandlerDuration']
@@ -0,0 +1,119 @@
+import importlib.util
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('boto3')
+
+STREAMLIT = os.path.join(os.path.dirname(__file__), '..', '..', 'streamlit')
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv('BEDROCK_AGENT_ID', 'AGENT')
+    monkeypatch.setenv('BEDROCK_AGENT_ALIAS_ID', 'ALIAS')
+    monkeypatch.setenv('AWS_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.syspath_prepend(STREAMLIT)
+    spec = importlib.util.spec_from_file_location('streamlit_agent', os.path.join(STREAMLIT, 'agent.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_one_tuned_client_is_shared_across_threads(agent):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        clients = set(pool.map(lambda _: id(agent.get_client()), range(32)))
+
+    assert len(clients) == 1
+    config = agent.get_client().meta.config
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == 50
+    assert config.retries['mode'] == 'adaptive'
+    assert agent.connection_stats() == {'requests': 0, 'connections': 0, 'reuse_ratio': 0.0}
+
+
+class FakeClient:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def invoke_agent(self, **kwargs):
+        self.calls.append(kwargs)
+        return {'completion': [{'trace': {}}] + [{'chunk': {'bytes': chunk}} for chunk in self.chunks]}
+
+
+def test_answers_stream_chunk_by_chunk(agent, monkeypatch):
+    monkeypatch.setattr(agent, 'connection_stats', lambda client: {})
+    client = FakeClient([b'Your table ', b'is booked \xe2\x9c', b'\x85'])
+
+    chunks = list(agent.agent_stream_handler({'sessionId': 's1', 'question': 'Book a table'}, None, client))
+
+    assert chunks == ['Your table ', 'is booked ', '✅']
+    assert client.calls[0]['streamingConfigurations'] == {'streamFinalResponse': True}
+    assert list(agent.agent_stream_handler({'sessionId': 's1', 'question': ''}, None, client)) == [
+        'Missing question in the event data.']
+
+
+def test_trace_events_rebuild_the_turn_timeline(agent):
+    import traces
+
+    ticks = iter([0, 0.010, 0.020, 0.050, 0.060, 0.300, 0.400])
+    timeline = traces.TurnTimeline(clock=lambda: next(ticks))
+    events = [
+        {'trace': {'orchestrationTrace': {'modelInvocationInput': {'traceId': 't1', 'type': 'ORCHESTRATION'}}}},
+        {'trace': {'orchestrationTrace': {'modelInvocationOutput': {'traceId': 't1', 'metadata': {'totalTimeMs': 8}}}}},
+        {'trace': {'orchestrationTrace': {'invocationInput': {
+            'traceId': 't2', 'invocationType': 'AGENT_COLLABORATOR',
+            'agentCollaboratorInvocationInput': {'agentCollaboratorName': 'ReservationAgent'}}}}},
+        {'collaboratorName': 'ReservationAgent', 'trace': {'orchestrationTrace': {'invocationInput': {
+            'traceId': 't3', 'invocationType': 'ACTION_GROUP',
+            'actionGroupInvocationInput': {'actionGroupName': 'ReservationBookingsActionGroup',
+                                           'function': 'create_reservation_booking'}}}}},
+        {'collaboratorName': 'ReservationAgent', 'trace': {'orchestrationTrace': {'observation': {
+            'traceId': 't3', 'type': 'ACTION_GROUP', 'actionGroupInvocationOutput': {'text': '{}'}}}}},
+        {'trace': {'orchestrationTrace': {'observation': {
+            'traceId': 't2', 'type': 'AGENT_COLLABORATOR',
+            'agentCollaboratorInvocationOutput': {'metadata': {'totalTimeMs': 320}}}}}},
+    ]
+    for event in events:
+        timeline.add(event)
+
+    assert [(step['agent'], step['kind'], step['name'], step['duration_ms']) for step in timeline.steps] == [
+        ('Supervisor', 'model', 'ORCHESTRATION', 8.0),
+        ('Supervisor', 'collaborator', 'ReservationAgent', 320.0),
+        ('ReservationAgent', 'action_group', 'ReservationBookingsActionGroup.create_reservation_booking', 240.0),
+    ]
+    assert timeline.totals() == {'model': 8.0, 'collaborator': 320.0, 'action_group': 240.0}
+
+
+def test_token_usage_is_summed_and_priced_per_agent(agent):
+    import io
+    import json
+    import usage
+
+    def model_output(input_tokens, output_tokens, collaborator=None):
+        event = {'trace': {'orchestrationTrace': {'modelInvocationOutput': {
+            'traceId': 't', 'metadata': {'usage': {'inputTokens': input_tokens, 'outputTokens': output_tokens}}}}}}
+        return dict(event, collaboratorName=collaborator) if collaborator else event
+
+    prices = {'default': {'input': 1.0, 'output': 2.0}, 'TicketAgent': {'input': 0.5, 'output': 1.0}}
+    turn = usage.UsageAccumulator(prices)
+    for event in [model_output(1000, 100), model_output(500, 50, 'TicketAgent'), model_output(2000, 200)]:
+        turn.add(event)
+    session = usage.UsageAccumulator(prices).merge(turn).merge(turn)
+
+    assert turn.summary() == {
+        'agents': {'Supervisor': {'input_tokens': 3000, 'output_tokens': 300, 'invocations': 2, 'cost_usd': 3.6},
+                   'TicketAgent': {'input_tokens': 500, 'output_tokens': 50, 'invocations': 1, 'cost_usd': 0.3}},
+        'input_tokens': 3500, 'output_tokens': 350, 'cost_usd': 3.9}
+    assert session.summary()['cost_usd'] == 7.8
+    assert session.over_budget(5.0) and not turn.over_budget(5.0)
+
+    stream = io.StringIO()
+    turn.emit_metrics('s1', stream)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(record['Agent'], record['InputTokens'], record['CostUSD']) for record in records] == [
+        ('Supervisor', 3000, 3.6), ('TicketAgent', 500, 0.3)]